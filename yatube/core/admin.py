@@ -0,0 +1,190 @@
+import hashlib
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+
+from .models import OutgoingEmail
+
+
+COUNT_KEY = 'admin:count:{}'
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который кеширует COUNT(*) на ADMIN_COUNT_CACHE_TIMEOUT.
+
+    Список изменений считает строки при каждом открытии страницы, на
+    больших таблицах это самый долгий запрос. Ключ — SQL без сортировки,
+    так что число общее для всех страниц и порядков с теми же
+    фильтрами; число может отставать от таблицы на время кеширования.
+    """
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query.clone()
+        query.clear_ordering(force_empty=True)
+        try:
+            sql, params = query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = COUNT_KEY.format(
+            hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        )
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, settings.ADMIN_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Фильтр с полем ввода вместо списка всех возможных значений."""
+
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        # Фильтр без вариантов не отрисовывается.
+        return ((None, None),)
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = [
+            (key, value)
+            for key, value in changelist.get_filters_params().items()
+            if key != self.parameter_name
+        ]
+        yield all_choice
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """AutocompleteSelect, который берёт подпись выбранного объекта из
+    selected, а не отдельным запросом на каждую строку."""
+
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        values = [str(v) for v in value if v not in (None, '')]
+        if self.selected is None or values != [str(self.selected[0])]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        pk, label = self.selected
+        options.append(self.create_option(
+            name, pk, label, True, len(options)
+        ))
+        return [(None, options, 0)]
+
+
+class PreloadedRelationsForm(forms.ModelForm):
+    """Передаёт виджетам автодополнения уже загруженные связанные
+    объекты: строки списка и инлайнов выбираются с select_related."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is None:
+            return
+        for name, field in self.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if not isinstance(widget, PreloadedAutocompleteSelect):
+                continue
+            related = getattr(self.instance, name)
+            if related is not None:
+                widget.selected = (related.pk, str(related))
+
+
+class PreloadedAutocompleteMixin:
+    """autocomplete_fields с PreloadedAutocompleteSelect и
+    PreloadedRelationsForm, в том числе в list_editable."""
+
+    form = PreloadedRelationsForm
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs.setdefault('widget', PreloadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using')
+            ))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', self.form)
+        return super().get_changelist_form(request, **kwargs)
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Формсет инлайна, который показывает одну страницу объектов."""
+
+    per_page = 20
+    params = None
+
+    @property
+    def page_param(self):
+        return f'{self.prefix}-page'
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            paginator = CachedCountPaginator(
+                super().get_queryset(), self.per_page
+            )
+            self.page = paginator.get_page(self.params.get(self.page_param))
+            self._queryset = self.page.object_list
+        return self._queryset
+
+    def page_url(self, number):
+        params = self.params.copy()
+        params[self.page_param] = number
+        return f'?{params.urlencode()}'
+
+    @property
+    def previous_url(self):
+        if self.page.has_previous():
+            return self.page_url(self.page.previous_page_number())
+
+    @property
+    def next_url(self):
+        if self.page.has_next():
+            return self.page_url(self.page.next_page_number())
+
+
+class PaginatedTabularInline(PreloadedAutocompleteMixin,
+                             admin.TabularInline):
+    """Табличный инлайн постранично, по per_page объектов."""
+
+    formset = PaginatedInlineFormSet
+    template = 'admin/edit_inline/tabular_paginated.html'
+    per_page = 20
+    extra = 0
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.params = request.GET
+        formset.per_page = self.per_page
+        return formset
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'subject',
+        'recipients',
+        'status',
+        'attempts',
+        'created',
+        'sent',
+    )
+    list_filter = ('status',)
+    search_fields = ('recipients', 'subject')
+    readonly_fields = (
+        'created', 'subject', 'recipients', 'payload', 'attempts', 'sent',
+        'last_error'
+    )
+    paginator = CachedCountPaginator
+    show_full_result_count = False
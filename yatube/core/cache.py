@@ -0,0 +1,203 @@
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import timing
+
+
+class LocalCache:
+    """Потокобезопасный LRU-кеш процесса с ограничением числа записей."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.time() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TwoTierCache:
+    """Кеш вычисляемых значений: LRU процесса перед общим бэкендом.
+
+    В общем бэкенде значение хранится вместе со сроком годности и
+    временем, которое заняло его вычисление. Это позволяет:
+
+    * пересчитывать значение заранее с вероятностью, растущей к концу
+      срока (алгоритм XFetch), — горячий ключ обновляет один запрос,
+      пока остальные ещё получают старое значение;
+    * при промахе вычислять значение один раз: внутри процесса
+      остальные потоки ждут первый, между процессами — блокировка через
+      cache.add; пока идёт пересчёт, отдаётся устаревшее значение, если
+      оно есть.
+
+    Локальный уровень хранит записи не дольше local_timeout секунд,
+    поэтому удаление из общего бэкенда видно в процессах с этой
+    задержкой. Для значений, зависящих от изменяемых данных, версию
+    лучше включать в ключ.
+    """
+
+    KEY_PREFIX = 'twotier:'
+    LOCK_PREFIX = 'twotier-lock:'
+
+    def __init__(self, alias='default', local_entries=None,
+                 local_timeout=None, lock_timeout=None, beta=None):
+        self.alias = alias
+        self.local = LocalCache(
+            settings.CACHE_LOCAL_ENTRIES if local_entries is None
+            else local_entries
+        )
+        self.local_timeout = (
+            settings.CACHE_LOCAL_TIMEOUT if local_timeout is None
+            else local_timeout
+        )
+        self.lock_timeout = (
+            settings.CACHE_LOCK_TIMEOUT if lock_timeout is None
+            else lock_timeout
+        )
+        self.beta = settings.CACHE_EARLY_BETA if beta is None else beta
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _fresh(self, entry, now):
+        """Не пора ли пересчитать запись; True — можно отдавать как есть."""
+        value, expires, delta = entry
+        if expires is None:
+            return True
+        early = -delta * self.beta * math.log(1.0 - random.random())
+        return now + early < expires
+
+    def _read(self, key):
+        entry = self.local.get(key)
+        if entry is not None:
+            timings = timing.current()
+            if timings is not None:
+                timings.count_reads(1, 1)
+            return entry
+        entry = self.shared.get(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        value, expires, delta = entry
+        timeout = self.local_timeout
+        if expires is not None:
+            timeout = min(timeout, expires - time.time())
+        if timeout > 0:
+            self.local.set(key, entry, timeout)
+
+    def get_or_compute(self, key, compute, timeout):
+        """Значение из кеша или результат compute(), сохранённый на timeout.
+
+        timeout=None — хранить без срока.
+        """
+        key = self.KEY_PREFIX + key
+        entry = self._read(key)
+        if entry is not None and self._fresh(entry, time.time()):
+            return entry[0]
+        return self._refresh(key, compute, timeout, entry)
+
+    def _refresh(self, key, compute, timeout, stale):
+        with self._flights_lock:
+            event = self._flights.get(key)
+            leader = event is None
+            if leader:
+                event = self._flights[key] = threading.Event()
+        if not leader:
+            if stale is not None:
+                return stale[0]
+            event.wait(self.lock_timeout)
+            entry = self._read(key)
+            if entry is not None:
+                return entry[0]
+            return compute()
+        try:
+            return self._compute_once(key, compute, timeout, stale)
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            event.set()
+
+    def _compute_once(self, key, compute, timeout, stale):
+        lock_key = self.LOCK_PREFIX + key
+        locked = self.shared.add(lock_key, 1, self.lock_timeout)
+        if not locked:
+            # Значение уже пересчитывает другой процесс.
+            if stale is not None:
+                return stale[0]
+            entry = self._wait(key)
+            if entry is not None:
+                return entry[0]
+        try:
+            started = time.monotonic()
+            value = compute()
+            delta = time.monotonic() - started
+            expires = None if timeout is None else time.time() + timeout
+            entry = (value, expires, delta)
+            self.shared.set(key, entry, timeout)
+            self._remember(key, entry)
+            return value
+        finally:
+            if locked:
+                self.shared.delete(lock_key)
+
+    def _wait(self, key):
+        deadline = time.monotonic() + self.lock_timeout
+        pause = 0.01
+        while time.monotonic() < deadline:
+            time.sleep(pause)
+            entry = self.shared.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+                return entry
+            if self.shared.get(self.LOCK_PREFIX + key) is None:
+                return None
+            pause = min(pause * 2, 0.2)
+        return None
+
+    def delete(self, key):
+        key = self.KEY_PREFIX + key
+        self.local.delete(key)
+        self.shared.delete(key)
+
+
+fragments = TwoTierCache()
@@ -0,0 +1,6 @@
+from .routers import replica_generation
+
+
+def replica(request):
+    """Поколение реплик для ключей кеша страниц."""
+    return {'replica_generation': replica_generation()}
@@ -0,0 +1,70 @@
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+
+logger = logging.getLogger(__name__)
+
+# Сообщения SQLite о занятой базе: SQLITE_BUSY и SQLITE_LOCKED.
+LOCK_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению с SQLite.
+
+    journal_mode=WAL хранится в самом файле базы, остальные настройки
+    действуют только на соединение, поэтому выполняются каждый раз.
+    Реплики из DATABASE_REPLICAS открываются только на чтение: их
+    обновляет core.routers.sync.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    pragmas = settings.SQLITE_PRAGMAS
+    if connection.alias in settings.DATABASE_REPLICAS:
+        pragmas = {**pragmas, 'query_only': 1}
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_lock_error(error):
+    return any(message in str(error) for message in LOCK_MESSAGES)
+
+
+def retry_on_lock(func):
+    """Повторяет функцию, если SQLite ответил «database is locked».
+
+    busy_timeout сам ждёт освобождения блокировки, но транзакция,
+    которая сначала читала, а потом пишет, получает отказ сразу, если
+    другой писатель успел закоммитить. Поэтому функция выполняется в
+    транзакции: при отказе всё откатывается и запускается заново,
+    до SQLITE_WRITE_RETRIES раз с растущей паузой. Внутри чужой
+    транзакции повторять нельзя — там ошибка просто пробрасывается.
+
+    Повторяется всё, что делает функция, поэтому она не должна писать
+    файлы и вообще иметь побочных эффектов вне БД; view с загрузкой
+    файлов оборачивают только сохранение модели.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            return func(*args, **kwargs)
+        delay = settings.SQLITE_RETRY_DELAY
+        for attempt in range(settings.SQLITE_WRITE_RETRIES + 1):
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if (not is_lock_error(error)
+                        or attempt == settings.SQLITE_WRITE_RETRIES):
+                    raise
+                logger.info(
+                    '%s: база занята, повтор %s', func.__name__, attempt + 1
+                )
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay *= 2
+    return wrapper
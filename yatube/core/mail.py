@@ -0,0 +1,232 @@
+import base64
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних отправленных писем берётся для статистики задержки.
+LATENCY_SAMPLE = 1000
+
+
+def serialize(message):
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise ValueError('Вложения MIMEBase в очереди не поддерживаются')
+        filename, content, mimetype = attachment
+        text = isinstance(content, str)
+        if text:
+            content = content.encode()
+        attachments.append({
+            'filename': filename,
+            'content': base64.b64encode(content).decode(),
+            'text': text,
+            'mimetype': mimetype,
+        })
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'content_subtype': message.content_subtype,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': attachments,
+    }, ensure_ascii=False)
+
+
+def deserialize(payload):
+    data = json.loads(payload)
+    message = EmailMultiAlternatives(
+        subject=data['subject'], body=data['body'],
+        from_email=data['from_email'], to=data['to'], cc=data['cc'],
+        bcc=data['bcc'], reply_to=data['reply_to'], headers=data['headers'],
+        alternatives=[tuple(item) for item in data['alternatives']],
+    )
+    message.content_subtype = data['content_subtype']
+    for attachment in data['attachments']:
+        content = base64.b64decode(attachment['content'])
+        if attachment['text']:
+            content = content.decode()
+        message.attach(
+            attachment['filename'], content, attachment['mimetype']
+        )
+    return message
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Вместо отправки складывает письма в очередь OutgoingEmail.
+
+    Запрос не ждёт SMTP: письма отправляет команда send_queued_mail
+    через OUTBOX_EMAIL_BACKEND. Письма, поставленные в очередь внутри
+    транзакции, уходят только если она закоммичена.
+    """
+
+    def send_messages(self, email_messages):
+        rows = [
+            OutgoingEmail(
+                subject=message.subject[:998],
+                recipients=', '.join(message.recipients()),
+                payload=serialize(message),
+            )
+            for message in email_messages if message.recipients()
+        ]
+        OutgoingEmail.objects.bulk_create(rows)
+        return len(rows)
+
+
+def _backoff(attempts):
+    return timedelta(
+        seconds=settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def claim(batch_size):
+    """Письма, срок отправки которых подошёл, с арендой на OUTBOX_LEASE.
+
+    Аренда — перенос next_attempt условным UPDATE: письмо, уже
+    взятое другим воркером, не обновится и будет пропущено. Если воркер
+    упадёт, письмо снова станет доступно после окончания аренды.
+    """
+    now = timezone.now()
+    due = list(
+        OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING, next_attempt__lte=now
+        ).order_by('next_attempt', 'pk')
+        .values_list('pk', 'next_attempt')[:batch_size]
+    )
+    lease = now + timedelta(seconds=settings.OUTBOX_LEASE)
+    claimed = [
+        pk for pk, next_attempt in due
+        if OutgoingEmail.objects.filter(
+            pk=pk, status=OutgoingEmail.PENDING, next_attempt=next_attempt
+        ).update(next_attempt=lease)
+    ]
+    return list(OutgoingEmail.objects.filter(pk__in=claimed).order_by('pk'))
+
+
+class NotSent(Exception):
+    """Бэкенд не выбросил исключение, но и не отправил письмо."""
+
+
+def _fail(email, error):
+    """Откладывает письмо на повтор или помечает неотправленным."""
+    email.attempts += 1
+    email.last_error = f'{type(error).__name__}: {error}'
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = OutgoingEmail.FAILED
+    else:
+        email.next_attempt = timezone.now() + _backoff(email.attempts)
+    email.save(update_fields=[
+        'attempts', 'last_error', 'status', 'next_attempt'
+    ])
+    logger.warning(
+        'Письмо %s не отправлено (попытка %s): %s',
+        email.pk, email.attempts, email.last_error
+    )
+
+
+def send_batch(batch_size=None):
+    """Отправляет пачку писем через одно соединение.
+
+    Соединение открывается один раз на пачку: иначе SMTP-бэкенд
+    открывал бы и закрывал его на каждое письмо. Возвращает
+    (отправлено, ошибок). Письмо с ошибкой, в том числе принятое
+    бэкендом с результатом 0, повторяется с экспоненциальной паузой от
+    OUTBOX_RETRY_DELAY, после OUTBOX_MAX_ATTEMPTS попыток помечается
+    неотправленным.
+    """
+    emails = claim(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not emails:
+        return 0, 0
+    sent = failed = 0
+    connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            _fail(email, error)
+        return 0, len(emails)
+    try:
+        for email in emails:
+            started = time.perf_counter()
+            try:
+                message = deserialize(email.payload)
+                message.connection = connection
+                if not message.send():
+                    raise NotSent('бэкенд не отправил письмо')
+            except Exception as error:
+                _fail(email, error)
+                failed += 1
+                # Соединение могло оборваться: для следующих писем оно
+                # открывается заново. Если не откроется, каждое письмо
+                # получит ту же ошибку при отправке.
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    logger.exception('Не удалось переоткрыть соединение')
+                continue
+            email.status = OutgoingEmail.SENT
+            email.sent = timezone.now()
+            email.attempts += 1
+            email.save(update_fields=['status', 'sent', 'attempts'])
+            sent += 1
+            logger.debug(
+                'Письмо %s отправлено за %.1f мс', email.pk,
+                (time.perf_counter() - started) * 1000
+            )
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[index]
+
+
+def stats():
+    """Глубина очереди и задержка от постановки в очередь до отправки."""
+    now = timezone.now()
+    pending = OutgoingEmail.objects.filter(status=OutgoingEmail.PENDING)
+    oldest = pending.order_by('created').values_list(
+        'created', flat=True
+    ).first()
+    latencies = [
+        (sent - created).total_seconds()
+        for created, sent in OutgoingEmail.objects.filter(
+            status=OutgoingEmail.SENT
+        ).order_by('-sent').values_list('created', 'sent')[:LATENCY_SAMPLE]
+    ]
+    result = {
+        'pending': pending.count(),
+        'due': pending.filter(next_attempt__lte=now).count(),
+        'retrying': pending.filter(attempts__gt=0).count(),
+        'failed': OutgoingEmail.objects.filter(
+            status=OutgoingEmail.FAILED
+        ).count(),
+        'oldest_pending_s': (
+            round((now - oldest).total_seconds(), 1) if oldest else None
+        ),
+        'latency_sample': len(latencies),
+    }
+    for percent in (50, 95, 99):
+        result[f'latency_p{percent}_s'] = (
+            round(_percentile(latencies, percent), 3) if latencies else None
+        )
+    return result
@@ -0,0 +1,50 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import mail
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из очереди OutgoingEmail через '
+        'OUTBOX_EMAIL_BACKEND.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а проверять очередь каждые --interval с.'
+        )
+        parser.add_argument('--interval', type=float, default=5.0)
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Только вывести состояние очереди в JSON.'
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(mail.stats(), indent=2))
+            return
+        while True:
+            # Очередь разбирается пачками, пока не кончатся письма, срок
+            # которых подошёл.
+            while True:
+                started = time.perf_counter()
+                sent, failed = mail.send_batch(options['batch_size'])
+                if not sent and not failed:
+                    break
+                self.stdout.write(
+                    f'Отправлено {sent}, ошибок {failed} за '
+                    f'{time.perf_counter() - started:.2f} с'
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        if options['verbosity'] > 1:
+            self.stdout.write(json.dumps(mail.stats(), indent=2))
@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import routers
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-базу в файлы реплик из '
+        'DATABASE_REPLICAS через backup API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help=(
+                'Не завершаться, а каждые --interval с копировать базу, '
+                'если она изменилась.'
+            )
+        )
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS пуст.')
+        aliases = [DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS]
+        for alias in aliases:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'База {alias} — не SQLite.')
+        replicas = routers.ReplicaSync(
+            connections[DEFAULT_DB_ALIAS].settings_dict['NAME'],
+            {
+                alias: connections[alias].settings_dict['NAME']
+                for alias in settings.DATABASE_REPLICAS
+            }
+        )
+        try:
+            while True:
+                for alias, seconds in replicas.run():
+                    self.stdout.write(f'{alias}: {seconds:.3f} с')
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            replicas.close()
@@ -0,0 +1,15 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import throttle
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит счётчики ограничения записи: сколько запросов каждого '
+        'scope пропущено и сколько отклонено с 429.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(throttle.stats(), indent=2))
@@ -0,0 +1,171 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+
+# Размер блока, которым файл читается, когда сервер не умеет sendfile.
+BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Файл, из которого читается только диапазон [start, start+length).
+
+    fileno() нарочно не отдаётся: wsgi.file_wrapper некоторых серверов
+    передаёт файл через sendfile до конца, не глядя на Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Диапазон (начало, конец включительно) из заголовка Range.
+
+    None — заголовок не разобран или диапазонов несколько: тогда
+    отдаётся весь файл, это допустимо. ValueError — диапазон вне файла.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # bytes=-N — последние N байт.
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag, mtime):
+    """Совпадает ли If-Range с текущей версией файла."""
+    value = request.META.get('HTTP_IF_RANGE')
+    if value is None:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    date = parse_http_date_safe(value)
+    return date is not None and int(mtime) <= date
+
+
+def cache_control(path):
+    """Миниатюры sorl лежат под именами-хешами и не меняются."""
+    if path.startswith(settings.MEDIA_IMMUTABLE_PREFIXES):
+        return {
+            'public': True, 'max_age': 365 * 24 * 60 * 60, 'immutable': True
+        }
+    return {'public': True, 'max_age': settings.MEDIA_CACHE_MAX_AGE}
+
+
+def _offload(path, fullpath, content_type):
+    """Ответ без тела: файл отдаёт фронтовой прокси."""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = quote(
+            settings.MEDIA_ACCEL_PREFIX + path
+        )
+    else:
+        response['X-Sendfile'] = fullpath
+    return response
+
+
+def _file_response(request, fullpath, size, content_type, etag, mtime):
+    header = request.META.get('HTTP_RANGE')
+    selected = None
+    if header and _if_range_matches(request, etag, mtime):
+        try:
+            selected = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    file = open(fullpath, 'rb')
+    if selected is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = selected
+        response = FileResponse(
+            RangeFile(file, start, end - start + 1),
+            content_type=content_type, status=206
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response.block_size = BLOCK_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve(request, path):
+    """Отдаёт файл из MEDIA_ROOT для развёртываний без веб-сервера.
+
+    Поддерживает условные запросы по ETag и Last-Modified и один
+    диапазон байтов из Range. Файл целиком отдаётся через FileResponse:
+    WSGI-сервер с wsgi.file_wrapper передаёт его через sendfile без
+    копирования. При MEDIA_SENDFILE = 'x-accel-redirect' или
+    'x-sendfile' передача отдаётся фронтовому прокси, он же обрабатывает
+    Range.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(fullpath)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        content_type, encoding = mimetypes.guess_type(fullpath)
+        content_type = content_type or 'application/octet-stream'
+        if settings.MEDIA_SENDFILE:
+            response = _offload(path, fullpath, content_type)
+        else:
+            response = _file_response(
+                request, fullpath, stat.st_size, content_type, etag,
+                stat.st_mtime
+            )
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    patch_cache_control(response, **cache_control(path))
+    return response
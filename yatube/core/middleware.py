@@ -0,0 +1,131 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import timing
+from .routers import replica_reads
+
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Фазы запроса в порядке вывода: имя метрики и описание для DevTools.
+# Значения заголовков должны быть в latin-1, поэтому описания английские.
+PHASES = (
+    ('db', 'SQL'),
+    ('tpl', 'Templates'),
+    ('cache', 'Cache'),
+    ('thumb', 'Thumbnails'),
+    ('throttle', 'Throttle'),
+)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class ServerTimingMiddleware:
+    """Замеряет фазы обработки запроса.
+
+    Время SQL и число запросов собираются обёрткой execute_wrapper,
+    время шаблонов, кеша и миниатюр — инструментированными бэкендами из
+    core.timing (их нужно указать в TEMPLATES, CACHES и
+    THUMBNAIL_BACKEND). Итог отдаётся в заголовке Server-Timing и пишется
+    в лог core.middleware; медленнее SERVER_TIMING_SLOW секунд — с уровнем
+    WARNING.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = timing.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            timing.finish()
+        total = time.perf_counter() - started
+        response['Server-Timing'] = self.header(timings, total)
+        self.log(request, response, timings, total)
+        return response
+
+    def header(self, timings, total):
+        metrics = []
+        for name, description in PHASES:
+            if name not in timings.counts:
+                continue
+            if name == 'db':
+                description = f'{description}: {timings.counts[name]}'
+            elif name == 'cache':
+                description = (
+                    f'{description}: {timings.hits} hits '
+                    f'{timings.misses} misses'
+                )
+            metrics.append(
+                f'{name};dur={_ms(timings.durations[name])};'
+                f'desc="{description}"'
+            )
+        metrics.append(f'total;dur={_ms(total)}')
+        return ', '.join(metrics)
+
+    def log(self, request, response, timings, total):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': _ms(total),
+            'db_queries': timings.counts['db'],
+            'cache_hits': timings.hits,
+            'cache_misses': timings.misses,
+        }
+        for name, description in PHASES:
+            record[f'{name}_ms'] = _ms(timings.durations[name])
+        level = logging.INFO
+        if total >= settings.SERVER_TIMING_SLOW:
+            level = logging.WARNING
+        logger.log(
+            level,
+            ' '.join(f'{key}={value}' for key, value in record.items()),
+            extra={'timing': record}
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает запросам на чтение читать с реплик (core.routers).
+
+    Запрос, который что-то записал или пришёл не безопасным методом,
+    получает cookie REPLICA_STICKY_COOKIE на REPLICA_STICKY_SECONDS:
+    пока она есть, все запросы клиента читают с основной базы и видят
+    его изменения, даже если реплика ещё не синхронизирована.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        sticky = settings.REPLICA_STICKY_COOKIE in request.COOKIES
+        with replica_reads(safe and not sticky) as wrote:
+            response = self.get_response(request)
+            if wrote() or not safe:
+                response.set_cookie(
+                    settings.REPLICA_STICKY_COOKIE, '1',
+                    max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+                    samesite='Lax'
+                )
+        return response
@@ -0,0 +1,51 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку, см. core.mail."""
+
+    PENDING = 0
+    SENT = 1
+    FAILED = 2
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    created = models.DateTimeField(
+        auto_now_add=True, verbose_name='Поставлено в очередь'
+    )
+    subject = models.CharField(max_length=998, verbose_name='Тема')
+    recipients = models.TextField(verbose_name='Получатели')
+    payload = models.TextField(verbose_name='Письмо в JSON')
+    status = models.PositiveSmallIntegerField(
+        choices=STATUSES, default=PENDING, verbose_name='Состояние'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток'
+    )
+    next_attempt = models.DateTimeField(
+        default=timezone.now, verbose_name='Следующая попытка'
+    )
+    sent = models.DateTimeField(
+        null=True, blank=True, verbose_name='Отправлено'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        # Воркер выбирает письма, срок которых подошёл, диапазоном
+        # этого индекса.
+        indexes = [
+            models.Index(
+                fields=['status', 'next_attempt'],
+                name='outgoing_email_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} → {self.recipients}'
@@ -0,0 +1,136 @@
+import os
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Можно ли в текущем запросе читать с реплики. Вне запросов (команды,
+# фоновые потоки) значение по умолчанию — читать с основной базы.
+_replica_reads = ContextVar('replica_reads', default=False)
+# Была ли в текущем запросе запись.
+_wrote = ContextVar('wrote', default=False)
+
+
+@contextmanager
+def replica_reads(allowed):
+    """Разрешает чтение с реплик внутри блока; отдаёт функцию, которая
+    сообщает, была ли в блоке запись."""
+    reads = _replica_reads.set(allowed)
+    wrote = _wrote.set(False)
+    try:
+        yield _wrote.get
+    finally:
+        _replica_reads.reset(reads)
+        _wrote.reset(wrote)
+
+
+class ReplicaRouter:
+    """Чтения — на случайную реплику из DATABASE_REPLICAS, запись — на
+    основную базу.
+
+    С реплики читает только запрос, которому это разрешил
+    ReplicaRoutingMiddleware. После первой записи и внутри транзакции
+    запрос читает с основной базы, чтобы видеть свои изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or not _replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        if _wrote.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты из них совместимы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема попадает на реплики вместе с данными при синхронизации.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def replica_generation():
+    """Меняется после каждой синхронизации SQLite-реплик.
+
+    Входит в ключи кеша страниц: страница, отрисованная по отстающей
+    реплике, живёт в кеше только до следующей синхронизации. Файлы
+    реплик переписываются, только когда менялась основная база (см.
+    ReplicaSync), поэтому без записей кеш страниц не сбрасывается.
+    """
+    generation = []
+    for alias in settings.DATABASE_REPLICAS:
+        name = connections[alias].settings_dict['NAME']
+        # В режиме WAL копия сначала попадает в файл -wal и только при
+        # checkpoint — в основной файл.
+        mtimes = [0]
+        for path in (name, f'{name}-wal'):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except (OSError, TypeError):
+                pass
+        generation.append(max(mtimes))
+    return generation
+
+
+def sync(source, target):
+    """Копирует SQLite-базу source в target через backup API.
+
+    Копия пишется в файл реплики одной транзакцией, так что открытые
+    соединения реплики видят либо старые, либо новые данные. Вместе со
+    страницами копируется и режим журнала: реплика основной базы в WAL
+    тоже в WAL, и читатели не ждут окончания копирования.
+    """
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target, timeout=30)
+    try:
+        source_connection.backup(target_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
+
+
+class ReplicaSync:
+    """Копирует основную базу в реплики, только если она изменилась.
+
+    PRAGMA data_version меняется, когда базу меняет другое соединение,
+    и сравнивать его значения можно только в пределах одного
+    соединения, поэтому соединение с основной базой держится открытым
+    между проверками. Версия читается до копирования: запись, которая
+    пришлась на копирование, попадёт в реплики при следующем вызове.
+    """
+
+    def __init__(self, source, targets):
+        self.source = source
+        self.targets = targets
+        self.watcher = sqlite3.connect(source)
+        self.version = None
+
+    def run(self):
+        """Синхронизирует реплики {alias: путь}, если база менялась.
+
+        Возвращает список (alias, секунды) скопированных реплик.
+        """
+        version = self.watcher.execute('PRAGMA data_version').fetchone()[0]
+        if version == self.version:
+            return []
+        copied = []
+        for alias, target in self.targets.items():
+            started = time.perf_counter()
+            sync(self.source, target)
+            copied.append((alias, time.perf_counter() - started))
+        self.version = version
+        return copied
+
+    def close(self):
+        self.watcher.close()
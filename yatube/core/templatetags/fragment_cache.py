@@ -0,0 +1,56 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.cache import fragments
+
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, name, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        if timeout is not None:
+            try:
+                timeout = int(timeout)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    f'"fragment_cache": неверный таймаут {timeout!r}'
+                )
+        key = make_template_fragment_key(
+            self.name, [var.resolve(context) for var in self.vary_on]
+        )
+        return fragments.get_or_compute(
+            key, lambda: self.nodelist.render(context), timeout
+        )
+
+
+@register.tag('fragment_cache')
+def do_fragment_cache(parser, token):
+    """Как {% cache %}, но через двухуровневый кеш core.cache.
+
+    {% fragment_cache <таймаут> <имя> [переменные...] %} ...
+    {% endfragment_cache %}
+
+    Истёкший фрагмент пересчитывает один запрос, остальные в это время
+    получают прежнюю версию.
+    """
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'"{tokens[0]}" принимает как минимум два аргумента.'
+        )
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
@@ -0,0 +1,114 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase
+
+from ..cache import LocalCache, TwoTierCache, fragments
+
+
+class LocalCacheTests(SimpleTestCase):
+    def test_lru_eviction(self):
+        local = LocalCache(2)
+        local.set('a', 1, 60)
+        local.set('b', 2, 60)
+        local.get('a')
+        local.set('c', 3, 60)
+        self.assertEqual(len(local), 2)
+        self.assertIsNone(local.get('b'))
+        self.assertEqual(local.get('a'), 1)
+
+    def test_expiry(self):
+        local = LocalCache(2)
+        local.set('a', 1, -1)
+        self.assertIsNone(local.get('a'))
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = TwoTierCache(
+            local_entries=10, local_timeout=60, lock_timeout=2, beta=1.0
+        )
+        self.calls = 0
+
+    def compute(self, delay=0):
+        def inner():
+            self.calls += 1
+            time.sleep(delay)
+            return f'значение {self.calls}'
+        return inner
+
+    def test_cached(self):
+        self.assertEqual(
+            self.cache.get_or_compute('key', self.compute(), 60), 'значение 1'
+        )
+        self.assertEqual(
+            self.cache.get_or_compute('key', self.compute(), 60), 'значение 1'
+        )
+        self.cache.local.clear()
+        self.assertEqual(
+            self.cache.get_or_compute('key', self.compute(), 60), 'значение 1'
+        )
+        self.assertEqual(self.calls, 1)
+
+    def test_single_flight(self):
+        results = []
+
+        def worker():
+            results.append(
+                self.cache.get_or_compute('hot', self.compute(0.1), 60)
+            )
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['значение 1'] * 8)
+
+    def test_stale_while_other_process_recomputes(self):
+        key = TwoTierCache.KEY_PREFIX + 'hot'
+        cache.set(key, ('старое', time.time() - 1, 0.0), 60)
+        cache.add(TwoTierCache.LOCK_PREFIX + key, 1, 60)
+        self.assertEqual(
+            self.cache.get_or_compute('hot', self.compute(), 60), 'старое'
+        )
+        self.assertEqual(self.calls, 0)
+
+    def test_early_recompute(self):
+        key = TwoTierCache.KEY_PREFIX + 'hot'
+        # Вычисление «занимало» 10^9 с, до истечения минута: при beta=1
+        # пересчёт практически неизбежен, при beta=0 — невозможен.
+        cache.set(key, ('старое', time.time() + 60, 1e9), 120)
+        lazy = TwoTierCache(local_entries=0, beta=0)
+        self.assertEqual(lazy.get_or_compute('hot', self.compute(), 60),
+                         'старое')
+        self.assertEqual(
+            self.cache.get_or_compute('hot', self.compute(), 60),
+            'значение 1'
+        )
+
+
+class FragmentCacheTagTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        fragments.local.clear()
+
+    def test_tag(self):
+        template = Template(
+            '{% load fragment_cache %}'
+            '{% fragment_cache 60 test_fragment key %}'
+            '{{ value }}{% endfragment_cache %}'
+        )
+        self.assertEqual(
+            template.render(Context({'key': 1, 'value': 'первое'})), 'первое'
+        )
+        self.assertEqual(
+            template.render(Context({'key': 1, 'value': 'второе'})), 'первое'
+        )
+        self.assertEqual(
+            template.render(Context({'key': 2, 'value': 'второе'})), 'второе'
+        )
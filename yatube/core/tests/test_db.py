@@ -0,0 +1,50 @@
+from django.db import OperationalError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+
+from ..db import retry_on_lock
+
+
+class SqlitePragmasTests(TransactionTestCase):
+    def test_pragmas_applied(self):
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+@override_settings(SQLITE_WRITE_RETRIES=2, SQLITE_RETRY_DELAY=0)
+class RetryOnLockTests(TransactionTestCase):
+    def setUp(self):
+        self.calls = 0
+
+    def failing(self, errors, message='database is locked'):
+        @retry_on_lock
+        def view():
+            self.calls += 1
+            self.assertTrue(connection.in_atomic_block)
+            if self.calls <= errors:
+                raise OperationalError(message)
+            return 'ok'
+        return view
+
+    def test_retries(self):
+        self.assertEqual(self.failing(2)(), 'ok')
+        self.assertEqual(self.calls, 3)
+
+    def test_gives_up(self):
+        with self.assertRaises(OperationalError):
+            self.failing(3)()
+        self.assertEqual(self.calls, 3)
+
+    def test_other_errors(self):
+        with self.assertRaises(OperationalError):
+            self.failing(1, 'no such table: posts_post')()
+        self.assertEqual(self.calls, 1)
+
+    def test_inside_transaction(self):
+        with transaction.atomic():
+            with self.assertRaises(OperationalError):
+                self.failing(1)()
+        self.assertEqual(self.calls, 1)
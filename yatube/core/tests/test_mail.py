@@ -0,0 +1,125 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail as django_mail
+from django.core.mail import EmailMultiAlternatives
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import mail
+from ..models import OutgoingEmail
+
+User = get_user_model()
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxBackend',
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_MAX_ATTEMPTS=2,
+    OUTBOX_RETRY_DELAY=60,
+)
+class OutboxTests(TestCase):
+    def test_password_reset_is_queued(self):
+        User.objects.create_user(
+            'reader', email='reader@example.com', password='secret-42'
+        )
+        response = self.client.post(
+            reverse('users:password_reset'), {'email': 'reader@example.com'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(django_mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+        self.assertEqual(mail.send_batch(), (1, 0))
+        self.assertEqual(len(django_mail.outbox), 1)
+        self.assertEqual(django_mail.outbox[0].to, ['reader@example.com'])
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.SENT)
+        self.assertIsNotNone(email.sent)
+        self.assertEqual(mail.send_batch(), (0, 0))
+
+    def test_round_trip(self):
+        message = EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+            cc=['cc@example.com'], headers={'X-Tag': 'reset'}
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach('note.txt', 'заметка', 'text/plain')
+        message.attach('data.bin', b'\x00\xff', 'application/octet-stream')
+        copy = mail.deserialize(mail.serialize(message))
+        self.assertEqual(copy.recipients(), message.recipients())
+        self.assertEqual(copy.extra_headers, {'X-Tag': 'reset'})
+        self.assertEqual(copy.alternatives, message.alternatives)
+        self.assertEqual(copy.attachments, message.attachments)
+
+    def test_retry_and_fail(self):
+        django_mail.send_mail(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com']
+        )
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=OSError('connection refused')
+        ):
+            self.assertEqual(mail.send_batch(), (0, 1))
+            email = OutgoingEmail.objects.get()
+            self.assertEqual(email.status, OutgoingEmail.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertIn('connection refused', email.last_error)
+            self.assertGreater(
+                email.next_attempt, timezone.now() + timedelta(seconds=50)
+            )
+            # Срок следующей попытки ещё не подошёл.
+            self.assertEqual(mail.send_batch(), (0, 0))
+            OutgoingEmail.objects.update(next_attempt=timezone.now())
+            self.assertEqual(mail.send_batch(), (0, 1))
+        self.assertEqual(
+            OutgoingEmail.objects.get().status, OutgoingEmail.FAILED
+        )
+        self.assertEqual(mail.stats()['failed'], 1)
+
+    def test_claimed_email_is_skipped(self):
+        django_mail.send_mail(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com']
+        )
+        self.assertEqual(len(mail.claim(10)), 1)
+        self.assertEqual(mail.claim(10), [])
+
+    def test_stats(self):
+        for index in range(3):
+            django_mail.send_mail(
+                'Тема', 'Текст', 'from@example.com', [f'{index}@example.com']
+            )
+        mail.send_batch(batch_size=2)
+        stats = mail.stats()
+        self.assertEqual(stats['pending'], 1)
+        self.assertEqual(stats['due'], 1)
+        self.assertEqual(stats['latency_sample'], 2)
+        self.assertIsNotNone(stats['latency_p95_s'])
+        self.assertIsNotNone(stats['oldest_pending_s'])
+
+    def test_one_connection_per_batch(self):
+        for index in range(3):
+            django_mail.send_mail(
+                'Тема', 'Текст', 'from@example.com', [f'to{index}@example.com']
+            )
+        backend = 'django.core.mail.backends.locmem.EmailBackend'
+        with mock.patch(f'{backend}.open') as opened, \
+                mock.patch(f'{backend}.close') as closed:
+            self.assertEqual(mail.send_batch(), (3, 0))
+        opened.assert_called_once_with()
+        closed.assert_called_once_with()
+
+    def test_zero_sent_is_retried(self):
+        django_mail.send_mail(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com']
+        )
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            return_value=0
+        ):
+            self.assertEqual(mail.send_batch(), (0, 1))
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('NotSent', email.last_error)
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..media import parse_range, serve
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = bytes(range(256)) * 4
+
+
+def body(response):
+    return b''.join(response.streaming_content)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_SENDFILE=None)
+class MediaServeTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('posts/photo.jpg', 'cache/ab/cd/thumb.jpg'):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, path, **headers):
+        return serve(self.factory.get('/media/' + path, **headers), path)
+
+    def test_full_file(self):
+        response = self.get('posts/photo.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertEqual(body(response), CONTENT)
+
+    def test_thumbnails_immutable(self):
+        response = self.get('cache/ab/cd/thumb.jpg')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_not_modified(self):
+        etag = self.get('posts/photo.jpg')['ETag']
+        response = self.get('posts/photo.jpg', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_range(self):
+        response = self.get('posts/photo.jpg', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(body(response), CONTENT[10:20])
+
+    def test_range_if_range_mismatch(self):
+        response = self.get(
+            'posts/photo.jpg', HTTP_RANGE='bytes=10-19',
+            HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body(response), CONTENT)
+
+    def test_unsatisfiable_range(self):
+        response = self.get('posts/photo.jpg', HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=-100', 1024), (924, 1023))
+        self.assertEqual(parse_range('bytes=1000-2000', 1024), (1000, 1023))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 1024))
+
+    def test_outside_media_root(self):
+        for path in ('../settings.py', 'posts', 'posts/missing.jpg'):
+            with self.subTest(path=path):
+                with self.assertRaises(Http404):
+                    self.get(path)
+
+    @override_settings(
+        MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected/'
+    )
+    def test_accel_redirect(self):
+        response = self.get('posts/photo.jpg')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected/posts/photo.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_sendfile(self):
+        response = self.get('posts/photo.jpg')
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'photo.jpg')
+        )
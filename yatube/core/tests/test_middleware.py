@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+def parse_header(value):
+    metrics = {}
+    for metric in value.split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_header(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('posts:index'))
+        metrics = parse_header(response['Server-Timing'])
+        self.assertEqual(
+            metrics['db']['desc'], f'"SQL: {len(context)}"'
+        )
+        self.assertIn('tpl', metrics)
+        # Из кеша читаются версия ленты, фрагмент страницы и вложенная
+        # карточка поста; из готового фрагмента страницы карточки уже
+        # не читаются.
+        self.assertEqual(metrics['cache']['desc'], '"Cache: 0 hits 3 misses"')
+        for name in ('db', 'tpl', 'cache', 'total'):
+            with self.subTest(metric=name):
+                self.assertGreaterEqual(float(metrics[name]['dur']), 0)
+
+        response = self.client.get(reverse('posts:index'))
+        metrics = parse_header(response['Server-Timing'])
+        self.assertEqual(metrics['cache']['desc'], '"Cache: 2 hits 0 misses"')
+
+    def test_log(self):
+        url = reverse('posts:profile', kwargs={'username': 'TestUser'})
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            self.client.get(url)
+        record = logs.records[0].timing
+        self.assertEqual(record['path'], url)
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_queries'], 0)
+        self.assertIn(f'path={url}', logs.output[0])
+
+    @override_settings(SERVER_TIMING_SLOW=0)
+    def test_slow_request_warning(self):
+        with self.assertLogs('core.middleware', 'WARNING'):
+            self.client.get(reverse('posts:index'))
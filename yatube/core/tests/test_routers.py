@@ -0,0 +1,108 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from ..routers import ReplicaRouter, ReplicaSync, replica_reads, sync
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_read_only_request(self):
+        with replica_reads(True) as wrote:
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertTrue(wrote())
+            # После записи запрос читает свои изменения с основной базы.
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        with replica_reads(False):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_migrations_skip_replicas(self):
+        self.assertIs(self.router.allow_migrate('replica', 'posts'), False)
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.author = User.objects.create_user(username='Author')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_sticky_after_write(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        # Подписка — запись по GET-запросу.
+        response = self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(
+            cookie['max-age'], settings.REPLICA_STICKY_SECONDS
+        )
+
+    def test_unsafe_method(self):
+        response = self.client.post(reverse('posts:post_create'), {})
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+
+
+class SyncTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_sync(self):
+        source = os.path.join(self.directory, 'primary.sqlite3')
+        target = os.path.join(self.directory, 'replica.sqlite3')
+        with sqlite3.connect(source) as connection:
+            connection.execute('PRAGMA journal_mode = wal')
+            connection.execute('CREATE TABLE post (text)')
+            connection.execute("INSERT INTO post VALUES ('первый')")
+        sync(source, target)
+        with sqlite3.connect(source) as connection:
+            connection.execute("INSERT INTO post VALUES ('второй')")
+        sync(source, target)
+        with sqlite3.connect(target) as connection:
+            rows = connection.execute('SELECT text FROM post').fetchall()
+        self.assertEqual(rows, [('первый',), ('второй',)])
+
+    def test_skips_unchanged_source(self):
+        source = os.path.join(self.directory, 'primary.sqlite3')
+        target = os.path.join(self.directory, 'replica.sqlite3')
+        with sqlite3.connect(source) as connection:
+            connection.execute('PRAGMA journal_mode = wal')
+            connection.execute('CREATE TABLE post (text)')
+        replicas = ReplicaSync(source, {'replica': target})
+        self.addCleanup(replicas.close)
+        self.assertEqual(
+            [alias for alias, seconds in replicas.run()], ['replica']
+        )
+        mtime = os.stat(target).st_mtime_ns
+        self.assertEqual(replicas.run(), [])
+        self.assertEqual(os.stat(target).st_mtime_ns, mtime)
+        with sqlite3.connect(source) as connection:
+            connection.execute("INSERT INTO post VALUES ('новый')")
+        self.assertEqual(len(replicas.run()), 1)
+        with sqlite3.connect(target) as connection:
+            rows = connection.execute('SELECT text FROM post').fetchall()
+        self.assertEqual(rows, [('новый',)])
@@ -0,0 +1,104 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import CommentModel, Post
+
+from .. import throttle
+
+User = get_user_model()
+
+
+@override_settings(THROTTLE_RATES={
+    'comment': {'user': '2/m', 'ip': '3/m'},
+})
+class ThrottleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('writer')
+        cls.other = User.objects.create_user('other')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:add_comment', args=(self.post.pk,))
+
+    def comment(self):
+        return self.client.post(self.url, {'text': 'Текст'})
+
+    def at(self, moment):
+        return mock.patch('core.throttle.time.time', return_value=moment)
+
+    def test_user_limit(self):
+        with self.at(1020.0):
+            self.assertEqual(self.comment().status_code, 302)
+            self.assertEqual(self.comment().status_code, 302)
+            response = self.comment()
+        self.assertEqual(response.status_code, 429)
+        # Окно переполнено: ждать, пока оно станет предыдущим и
+        # затухнет наполовину.
+        self.assertEqual(response['Retry-After'], '90')
+        self.assertEqual(CommentModel.objects.count(), 2)
+        self.assertEqual(
+            throttle.stats()['comment'], {'allowed': 2, 'throttled': 1}
+        )
+
+    def test_ip_limit(self):
+        self.comment()
+        self.comment()
+        self.client.force_login(self.other)
+        self.assertEqual(self.comment().status_code, 302)
+        # Лимит IP исчерпан, лимит второго пользователя — нет.
+        self.assertEqual(self.comment().status_code, 429)
+
+    def test_sliding_window(self):
+        with self.at(1020.0):
+            self.comment()
+            self.comment()
+            self.assertEqual(self.comment().status_code, 429)
+        with self.at(1080.0):
+            response = self.comment()
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '30')
+        with self.at(1110.0):
+            self.assertEqual(self.comment().status_code, 302)
+            self.assertEqual(self.comment().status_code, 429)
+
+    def test_limit_below_one(self):
+        for rate in ('0/m', '-1/s'):
+            with self.subTest(rate=rate):
+                with self.assertRaises(ImproperlyConfigured):
+                    throttle.parse_rate(rate)
+        # Даже без проверки настроек ожидание не делит на ноль.
+        self.assertEqual(throttle._wait(0, 60, 20.0, 1, 0), 60)
+        self.assertEqual(throttle._wait(1, 60, 20.0, 2, 0), 100)
+
+    def test_get_not_throttled(self):
+        self.comment()
+        self.comment()
+        response = self.client.get(reverse('posts:post_create'))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(THROTTLE_RATES={'comment': {'user': '5/m'}})
+    def test_parallel_requests_do_not_exceed_limit(self):
+        request = RequestFactory().post(self.url)
+        request.user = self.user
+        barrier = threading.Barrier(20)
+        results = []
+
+        def attempt():
+            barrier.wait()
+            results.append(throttle.take(request, 'comment'))
+
+        threads = [threading.Thread(target=attempt) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(0), 5)
@@ -0,0 +1,172 @@
+import functools
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.shortcuts import render
+
+from . import timing
+
+
+logger = logging.getLogger(__name__)
+
+KEY = 'throttle:{}:{}:{}'
+COUNTER_KEY = 'throttle:count:{}:{}'
+OUTCOMES = ('allowed', 'throttled')
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+# Безопасные методы лимит не расходуют.
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def parse_rate(rate):
+    """'10/m' → (10, 60): сколько запросов разрешено за сколько секунд."""
+    count, period = rate.split('/')
+    count = int(count)
+    if count < 1:
+        raise ImproperlyConfigured(
+            f'THROTTLE_RATES: лимит {rate!r} должен быть не меньше 1.'
+        )
+    return count, PERIODS[period[0]]
+
+
+def _client_ip(request):
+    return request.META.get('REMOTE_ADDR')
+
+
+def buckets(request, scope):
+    """Ключи счётчиков запроса и их (лимит, период) по THROTTLE_RATES."""
+    result = {}
+    for kind, rate in settings.THROTTLE_RATES.get(scope, {}).items():
+        if kind == 'user':
+            if not request.user.is_authenticated:
+                continue
+            ident = request.user.pk
+        else:
+            ident = _client_ip(request)
+            if not ident:
+                continue
+        result[KEY.format(scope, kind, ident)] = parse_rate(rate)
+    return result
+
+
+def _incr(key, timeout):
+    """Атомарно увеличивает счётчик, создавая его при необходимости."""
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Ключ вытеснили между add и incr.
+        if cache.add(key, 1, timeout):
+            return 1
+        return cache.incr(key)
+
+
+def _count(scope, outcome):
+    _incr(COUNTER_KEY.format(scope, outcome), None)
+
+
+def _wait(limit, period, elapsed, current, previous):
+    """Через сколько секунд запрос уложится в скользящее окно.
+
+    current — счётчик текущего окна вместе с этим запросом, previous —
+    счётчик предыдущего; оценка — previous * (1 - elapsed / period) +
+    current.
+    """
+    estimate = previous * (1 - elapsed / period) + current
+    if estimate <= limit:
+        return 0
+    if current <= limit:
+        # Хватит затухания предыдущего окна.
+        return (estimate - limit) * period / previous
+    # Текущее окно уже переполнено: ждать, пока оно станет предыдущим
+    # и затухнет достаточно, чтобы поместился ещё один запрос.
+    stored = current - 1
+    if not stored:
+        # Лимит меньше одного запроса: ждать всё окно.
+        return period
+    return period - elapsed + period * (1 - (limit - 1) / stored)
+
+
+def take(request, scope):
+    """Учитывает запрос в счётчиках scope.
+
+    Возвращает 0, если запрос можно выполнять, иначе — сколько секунд
+    ждать. Лимит — скользящее окно: счётчики текущего и предыдущего
+    окна периода, меняются только атомарными cache.add и cache.incr,
+    блокировок нет. Отклонённый запрос возвращает свои единицы через
+    cache.decr; параллельные запросы за это время видят счётчик
+    больше, то есть ошибаются только в сторону отказа.
+
+    Счётчики лежат в кеше default. LocMemCache у каждого процесса свой:
+    с несколькими процессами лимит действует в каждом отдельно, пока
+    CACHES не указывает на общий бэкенд (memcached, Redis).
+    """
+    limits = buckets(request, scope)
+    if not limits:
+        return 0
+    now = time.time()
+    wait = 0
+    incremented = []
+    for key, (limit, period) in limits.items():
+        window = int(now // period)
+        current_key = f'{key}:{window}'
+        # Счётчик нужен и следующему окну — как предыдущий.
+        current = _incr(current_key, period * 2)
+        incremented.append(current_key)
+        previous = cache.get(f'{key}:{window - 1}', 0)
+        wait = max(wait, _wait(
+            limit, period, now - window * period, current, previous
+        ))
+    if wait:
+        for key in incremented:
+            try:
+                cache.decr(key)
+            except ValueError:
+                pass
+    _count(scope, 'throttled' if wait else 'allowed')
+    return wait
+
+
+def throttle(scope):
+    """Отвечает 429 с Retry-After, когда запрос исчерпал вёдра scope
+    из THROTTLE_RATES."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in SAFE_METHODS:
+                return view(request, *args, **kwargs)
+            with timing.phase('throttle'):
+                wait = take(request, scope)
+            if wait:
+                logger.info(
+                    '%s: %s ограничен на %.1f с',
+                    scope, request.user.pk or _client_ip(request), wait
+                )
+                retry_after = math.ceil(wait)
+                response = render(
+                    request, 'core/429.html', {'retry_after': retry_after},
+                    status=429
+                )
+                response['Retry-After'] = retry_after
+                return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stats():
+    """Счётчики решений по каждому scope из THROTTLE_RATES."""
+    keys = {
+        COUNTER_KEY.format(scope, outcome): (scope, outcome)
+        for scope in settings.THROTTLE_RATES for outcome in OUTCOMES
+    }
+    values = cache.get_many(keys)
+    result = {scope: dict.fromkeys(OUTCOMES, 0)
+              for scope in settings.THROTTLE_RATES}
+    for key, value in values.items():
+        scope, outcome = keys[key]
+        result[scope][outcome] = value
+    return result
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.cache.backends.locmem import LocMemCache as BaseLocMemCache
+from django.template.backends.django import DjangoTemplates as BaseTemplates
+from django.template.backends.django import Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+from sorl.thumbnail.base import ThumbnailBackend as BaseThumbnailBackend
+
+
+_local = threading.local()
+_MISSING = object()
+
+
+class RequestTimings:
+    """Время и число операций по фазам одного запроса."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+        self._active = set()
+
+    @contextmanager
+    def phase(self, name):
+        """Замеряет фазу; отдаёт True, если замер не вложен в такой же.
+
+        Вложенные замеры одной фазы (рендер шаблона из тега, get внутри
+        get_many) не суммируются дважды.
+        """
+        if name in self._active:
+            yield False
+            return
+        self._active.add(name)
+        start = time.perf_counter()
+        try:
+            yield True
+        finally:
+            self.durations[name] += time.perf_counter() - start
+            self.counts[name] += 1
+            self._active.discard(name)
+
+    def count_reads(self, hits, total):
+        self.hits += hits
+        self.misses += total - hits
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper."""
+        with self.phase('db'):
+            return execute(sql, params, many, context)
+
+
+def start():
+    _local.timings = RequestTimings()
+    return _local.timings
+
+
+def finish():
+    _local.timings = None
+
+
+def current():
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def phase(name):
+    timings = current()
+    if timings is None:
+        yield False
+        return
+    with timings.phase(name) as outermost:
+        yield outermost
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with phase('tpl'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(BaseTemplates):
+    """Шаблонный движок Django, замеряющий время рендера страниц.
+
+    Замеряется только шаблон верхнего уровня: include и extends
+    рендерятся внутри него и в общее время уже входят.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class CacheTimingMixin:
+    """Считает попадания и промахи чтений из кеша в рамках запроса."""
+
+    def get(self, key, default=None, version=None):
+        with phase('cache') as outermost:
+            value = super().get(key, _MISSING, version)
+        if outermost:
+            current().count_reads(value is not _MISSING, 1)
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with phase('cache') as outermost:
+            values = super().get_many(keys, version)
+        if outermost:
+            current().count_reads(len(values), len(keys))
+        return values
+
+
+class LocMemCache(CacheTimingMixin, BaseLocMemCache):
+    pass
+
+
+class ThumbnailBackend(BaseThumbnailBackend):
+    """Бэкенд sorl-thumbnail, замеряющий поиск и генерацию миниатюр."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with phase('thumb'):
+            return super().get_thumbnail(file_, geometry_string, **options)
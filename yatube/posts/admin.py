@@ -1,15 +1,61 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, SEARCH_VAR
+from django.db.models import Case, IntegerField, When
 
+from . import search
+from .forms import NormalizedImageMixin
 from .models import CommentModel, Group, Post
+from core.admin import (
+    CachedCountPaginator, InputFilter, PaginatedTabularInline,
+    PreloadedAutocompleteMixin, PreloadedRelationsForm
+)
 
 
-class CommentInline(admin.TabularInline):
+class PostAdminForm(NormalizedImageMixin, PreloadedRelationsForm):
+    """Форма поста в админке и в инлайне группы."""
+
+
+class AuthorFilter(InputFilter):
+    title = 'автору'
+    parameter_name = 'author'
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(author__username=self.value())
+
+
+class GroupFilter(InputFilter):
+    title = 'группе (slug)'
+    parameter_name = 'group'
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(group__slug=self.value())
+
+
+class PostFilter(InputFilter):
+    title = 'посту (id)'
+    parameter_name = 'post'
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return None
+        if not self.value().isdigit():
+            return queryset.none()
+        return queryset.filter(post_id=self.value())
+
+
+class CommentInline(PaginatedTabularInline):
     model = CommentModel
-    extra = 0
+    autocomplete_fields = ('author',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('author')
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(PreloadedAutocompleteMixin, admin.ModelAdmin):
+    form = PostAdminForm
     list_display = (
         'pk',
         'text',
@@ -18,15 +64,49 @@ class PostAdmin(admin.ModelAdmin):
         'group'
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('author', 'pub_date', 'group')
+    list_filter = (AuthorFilter, GroupFilter, 'pub_date')
+    autocomplete_fields = ('author', 'group')
     inlines = (CommentInline,)
     empty_value_display = '-пусто-'
+    search_results_limit = 1000
+    paginator = CachedCountPaginator
+    show_full_result_count = False
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.is_available():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        post_ids = search.search_post_ids(
+            search_term, self.search_results_limit
+        )
+        rank = Case(
+            *(When(pk=pk, then=position)
+              for position, pk in enumerate(post_ids)),
+            output_field=IntegerField()
+        )
+        queryset = queryset.filter(pk__in=post_ids).annotate(search_rank=rank)
+        return queryset, False
 
-class PostInline(admin.TabularInline):
+    def get_ordering(self, request):
+        # Найденные полнотекстовым поиском посты идут по релевантности,
+        # пока пользователь не выбрал сортировку по колонке.
+        if (request.GET.get(SEARCH_VAR) and search.is_available()
+                and ORDER_VAR not in request.GET):
+            return ('search_rank',)
+        return super().get_ordering(request)
+
+
+class PostInline(PaginatedTabularInline):
     model = Post
-    extra = 0
+    form = PostAdminForm
+    autocomplete_fields = ('author',)
+    show_change_link = True
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('author')
 
 
 @admin.register(Group)
@@ -40,15 +120,21 @@ class GroupAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description')
     sortable_by = ('title',)
     inlines = (PostInline,)
+    paginator = CachedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(CommentModel)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(PreloadedAutocompleteMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
         'post',
         'author'
     )
+    list_select_related = ('post', 'author')
     search_fields = ('text',)
-    list_filter = ('post', 'author', 'created')
+    list_filter = (PostFilter, AuthorFilter, 'created')
+    autocomplete_fields = ('post', 'author')
+    paginator = CachedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,167 @@
+import hashlib
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .models import CommentModel, Group, Post
+from .paginators import CURSOR_PARAM, CursorPaginator
+from yatube.settings import COMMENTS_PAGINATOR, POST_PAGINATOR
+
+User = get_user_model()
+
+POST_VALUES = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+GROUP_VALUES = {
+    'id': 'id',
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+    'posts_count': 'posts_count',
+}
+COMMENT_VALUES = {
+    'id': 'id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+def _values(queryset, fields):
+    return queryset.order_by().values(*fields.values())
+
+
+def _record(row, fields):
+    record = {name: row[column] for name, column in fields.items()}
+    if record.get('image'):
+        record['image'] = default_storage.url(record['image'])
+    elif 'image' in record:
+        record['image'] = None
+    return record
+
+
+def _etag(*parts):
+    raw = json.dumps(parts, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def conditional_json(request, data, etag, modified=None):
+    """JSON-ответ с валидаторами; 304 — если у клиента та же версия.
+
+    Проверка выполняется до сериализации, так что опрос неизменившейся
+    ленты стоит только запроса страницы к БД. If-Modified-Since
+    сверяется с датой самой новой записи, только если клиент не
+    прислал If-None-Match: удаление постов эту дату не меняет, и
+    точный ответ даёт лишь ETag.
+    """
+    last_modified = int(modified.timestamp()) if modified else None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = JsonResponse(data(), json_dumps_params={
+            'ensure_ascii': False
+        })
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def page_response(request, queryset, fields, per_page, ordering):
+    """Страница keyset-пагинации в JSON.
+
+    ETag строится только из содержимого страницы: строк, её курсора и
+    курсоров соседних страниц. Поэтому он одинаков во всех процессах и
+    после перезапуска, а удаление поста или новый комментарий меняют
+    его, только если затрагивают эту страницу.
+    """
+    paginator = CursorPaginator(_values(queryset, fields), per_page, ordering)
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    date = (
+        fields.get('updated') or fields.get('pub_date')
+        or fields.get('created')
+    )
+    rows = list(page)
+    newest = max((row[date] for row in rows), default=None) if date else None
+    etag = _etag(
+        page.cursor_key, page.next_cursor, page.previous_cursor, rows
+    )
+
+    def data():
+        return {
+            'results': [_record(row, fields) for row in rows],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        }
+
+    return conditional_json(request, data, etag, newest)
+
+
+@require_safe
+def post_list(request):
+    return page_response(
+        request, Post.objects.all(), POST_VALUES, POST_PAGINATOR,
+        ('-pub_date', '-id')
+    )
+
+
+@require_safe
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return page_response(
+        request, Post.objects.filter(group=group), POST_VALUES,
+        POST_PAGINATOR, ('-pub_date', '-id')
+    )
+
+
+@require_safe
+def author_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return page_response(
+        request, Post.objects.filter(author=author), POST_VALUES,
+        POST_PAGINATOR, ('-pub_date', '-id')
+    )
+
+
+@require_safe
+def group_list(request):
+    return page_response(
+        request, Group.objects.all(), GROUP_VALUES, POST_PAGINATOR, ('id',)
+    )
+
+
+@require_safe
+def post_detail(request, post_id):
+    row = Post.objects.filter(pk=post_id).values(
+        *POST_VALUES.values()
+    ).first()
+    if row is None:
+        raise Http404
+    etag = _etag(row)
+    return conditional_json(
+        request, lambda: _record(row, POST_VALUES), etag, row['updated']
+    )
+
+
+@require_safe
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    return page_response(
+        request, CommentModel.objects.filter(post=post), COMMENT_VALUES,
+        COMMENTS_PAGINATOR, ('created', 'id')
+    )
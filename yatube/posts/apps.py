@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'Управление постами'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import ensure_triggers
+        post_migrate.connect(ensure_triggers, sender=self)
@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS,
+            thread_name_prefix='posts-background'
+        )
+    return _executor
+
+
+def _run(func, args):
+    try:
+        func(*args)
+    finally:
+        close_old_connections()
+
+
+def submit_on_commit(func, *args):
+    """Выполняет func(*args) в пуле потоков после коммита транзакции.
+
+    Нужен для работы, которую нельзя делать в запросе, но которой
+    не нужен отдельный процесс-воркер.
+    """
+    transaction.on_commit(lambda: _pool().submit(_run, func, args))
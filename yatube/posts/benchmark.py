@@ -0,0 +1,335 @@
+import math
+import platform
+import re
+import subprocess
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from . import urls
+from .models import CommentModel, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+PERCENTILES = (50, 95, 99)
+# Метрики, по которым сравниваются два прогона.
+COMPARED = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_memory_kib')
+
+# Настройки SQLite по умолчанию — профиль, с которым сравнивается
+# SQLITE_PRAGMAS в замере конкурентного доступа.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'mmap_size': 0,
+    'cache_size': -2000,
+    'temp_store': 'default',
+}
+# Текст комментариев, которые пишет замер; после замера они удаляются.
+WRITE_MARKER = 'benchmark-concurrency'
+# Страницы, которые пишут в БД: каждый их запрос выполняется в
+# транзакции, которая затем откатывается.
+WRITE_VIEWS = ('profile_follow', 'profile_unfollow')
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(0, math.ceil(len(ordered) * percent / 100) - 1)
+    return ordered[index]
+
+
+def targets():
+    """Объекты, на которых меряются страницы: самые тяжёлые в наборе.
+
+    Пользователь — автор самого обсуждаемого поста, чтобы страница
+    редактирования отдавала форму, а не редирект. Подписка меряется на
+    авторе, на которого он не подписан, отписка — на том, на кого
+    подписан: обе действительно пишут, а откат транзакции оставляет
+    подписки как были.
+    """
+    post = Post.objects.select_related('author').order_by(
+        '-comments_count', '-pk'
+    ).first()
+    if post is None:
+        return None
+    user = post.author
+    stranger = (
+        User.objects.exclude(pk=user.pk).exclude(following__user=user)
+        .order_by('pk').first()
+    ) or user
+    followed = (
+        User.objects.filter(following__user=user).order_by('pk').first()
+    ) or stranger
+    group = Group.objects.order_by('-posts_count', 'pk').first()
+    words = re.findall(r'\w+', post.text)
+    return {
+        'user': user,
+        'post_id': post.pk,
+        'username': user.username,
+        'slug': group.slug if group else None,
+        'stranger': stranger.username,
+        'followed': followed.username,
+        'query': words[0] if words else 'a',
+    }
+
+
+def view_urls(found):
+    """URL каждой страницы из posts/urls.py с подставленными аргументами."""
+    result = {}
+    for pattern in urls.urlpatterns:
+        kwargs = {
+            name: found[name] for name in pattern.pattern.converters
+        }
+        if pattern.name == 'profile_follow':
+            kwargs['username'] = found['stranger']
+        if pattern.name == 'profile_unfollow':
+            kwargs['username'] = found['followed']
+        if None in kwargs.values():
+            continue
+        url = reverse(f'{urls.app_name}:{pattern.name}', kwargs=kwargs)
+        if pattern.name == 'search':
+            url += f'?q={found["query"]}'
+        result[pattern.name] = url
+    return result
+
+
+def fetch(client, url, rollback=False):
+    """Запрос к странице; потоковый ответ читается до конца.
+
+    С rollback всё, что запрос записал в БД, откатывается, а
+    отложенные до коммита действия не выполняются.
+    """
+    if rollback:
+        with transaction.atomic():
+            response = fetch(client, url)
+            transaction.set_rollback(True)
+        return response
+    response = client.get(url)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def measure(client, url, runs, warmup=1, cold=False, rollback=False):
+    for _ in range(warmup):
+        fetch(client, url, rollback)
+    timings, queries = [], []
+    for _ in range(runs):
+        if cold:
+            cache.clear()
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            response = fetch(client, url, rollback)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+    # Память меряется отдельным запросом: tracemalloc сильно замедляет
+    # выполнение и исказил бы время.
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        fetch(client, url, rollback)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    result = {
+        'url': url,
+        'status': response.status_code,
+        'runs': runs,
+        'mean_ms': round(sum(timings) / runs, 3),
+        'max_ms': round(max(timings), 3),
+        'queries': percentile(queries, 50),
+        'queries_max': max(queries),
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}_ms'] = round(percentile(timings, percent), 3)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            stderr=subprocess.DEVNULL, universal_newlines=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset():
+    return {
+        model._meta.model_name: model.objects.count()
+        for model in (User, Group, Post, CommentModel, Follow, TimelineEntry)
+    }
+
+
+def run(runs, warmup=1, cold=False, names=None):
+    """Прогоняет страницы через тестовый клиент, возвращает отчёт."""
+    found = targets()
+    if found is None:
+        raise ValueError('В базе нет постов, сначала заполните её.')
+    client = Client()
+    client.force_login(found['user'])
+    results = {}
+    for name, url in view_urls(found).items():
+        if names and name not in names:
+            continue
+        results[name] = measure(
+            client, url, runs, warmup, cold, name in WRITE_VIEWS
+        )
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'debug': settings.DEBUG,
+        'cold_cache': cold,
+        'dataset': dataset(),
+        'results': results,
+    }
+
+
+def compare(before, after):
+    """Строки (страница, метрика, было, стало, изменение в %)."""
+    rows = []
+    for name, current in after['results'].items():
+        previous = before['results'].get(name)
+        if previous is None:
+            continue
+        for metric in COMPARED:
+            old, new = previous.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            rows.append((name, metric, old, new, round(change, 1)))
+    return rows
+
+
+@contextmanager
+def sqlite_profile(name):
+    """Профиль 'tuned' — SQLITE_PRAGMAS и постоянные соединения,
+    'default' — настройки SQLite по умолчанию и соединение на запрос.
+
+    journal_mode хранится в файле базы, поэтому на время замера к ней
+    не должны быть подключены другие процессы.
+    """
+    pragmas = settings.SQLITE_PRAGMAS if name == 'tuned' else DEFAULT_PRAGMAS
+    connections.close_all()
+    try:
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            yield name == 'tuned'
+    finally:
+        connections.close_all()
+
+
+def concurrency(duration, readers, writers, url=None, profile='tuned'):
+    """Пропускная способность чтения, пока другие потоки пишут.
+
+    Читатели запрашивают url (по умолчанию главную), писатели
+    комментируют самый обсуждаемый пост через add_comment; ограничение
+    записи на время замера отключено.
+    """
+    found = targets()
+    if found is None:
+        raise ValueError('В базе нет постов, сначала заполните её.')
+    url = url or reverse('posts:index')
+    comment_url = reverse('posts:add_comment', args=[found['post_id']])
+    stop = threading.Event()
+    lock = threading.Lock()
+    timings, counts = [], {'writes': 0, 'errors': 0}
+
+    def count(name):
+        with lock:
+            counts[name] += 1
+
+    def loop(client, request, persistent):
+        try:
+            while not stop.is_set():
+                try:
+                    response = request(client)
+                except Exception:
+                    count('errors')
+                    continue
+                finally:
+                    if not persistent:
+                        connection.close()
+                if response.status_code >= 400:
+                    count('errors')
+        finally:
+            connection.close()
+
+    def read(client):
+        start = time.perf_counter()
+        response = fetch(client, url)
+        with lock:
+            timings.append((time.perf_counter() - start) * 1000)
+        return response
+
+    def write(client):
+        response = client.post(comment_url, {'text': WRITE_MARKER})
+        # Комментарий сохранён, только если view перенаправил на пост.
+        if response.status_code == 302:
+            count('writes')
+        return response
+
+    # Писатели — один пользователь в плотном цикле: с ограничением
+    # записи почти все их запросы получили бы 429.
+    with sqlite_profile(profile) as persistent, \
+            override_settings(THROTTLE_RATES={}):
+        threads = []
+        for _ in range(readers):
+            threads.append(threading.Thread(
+                target=loop, args=(Client(), read, persistent)
+            ))
+        for _ in range(writers):
+            client = Client()
+            client.force_login(found['user'])
+            threads.append(threading.Thread(
+                target=loop, args=(client, write, persistent)
+            ))
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        CommentModel.objects.filter(text=WRITE_MARKER).delete()
+    result = {
+        'profile': profile,
+        'url': url,
+        'readers': readers,
+        'writers': writers,
+        'duration_s': duration,
+        'reads': len(timings),
+        'reads_per_s': round(len(timings) / duration, 1),
+        'writes': counts['writes'],
+        'writes_per_s': round(counts['writes'] / duration, 1),
+        'errors': counts['errors'],
+    }
+    for percent in PERCENTILES:
+        result[f'read_p{percent}_ms'] = (
+            round(percentile(timings, percent), 3) if timings else None
+        )
+    return result
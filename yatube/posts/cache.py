@@ -0,0 +1,60 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+VERSION_KEY = 'posts:feed_version:{}'
+INDEX_FEED = 'index'
+TRENDING_FEED = 'trending'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def post_feeds(author_id, group_id=None):
+    """Ленты, в которых показывается пост с такими автором и группой."""
+    feeds = [INDEX_FEED, author_feed(author_id)]
+    if group_id is not None:
+        feeds.append(group_feed(group_id))
+    return feeds
+
+
+def _new_version():
+    # Начальная версия растёт со временем: если ключ версии вытеснен из
+    # кеша, новая версия не совпадёт с версиями старых фрагментов.
+    return int(time.time() * 1000)
+
+
+def get_feed_version(feed):
+    key = VERSION_KEY.format(feed)
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_feed_version(*feeds):
+    for feed in set(feeds):
+        key = VERSION_KEY.format(feed)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def bump_on_commit(*feeds):
+    """Сбрасывает версии лент после коммита текущей транзакции.
+
+    Читатель, пришедший между сбросом и коммитом, увидел бы старые
+    строки и сохранил бы их в кеш уже под новой версией. Вне
+    транзакции версии сбрасываются сразу.
+    """
+    transaction.on_commit(lambda: bump_feed_version(*feeds))
@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, CommentModel, Follow, Group, Post
+
+User = get_user_model()
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def _change_author(author_id, field, delta):
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if _change(stats, field, delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(author_id=author_id, **{field: delta})
+    except IntegrityError:
+        _change(stats, field, delta)
+
+
+def change_author_posts(author_id, delta):
+    _change_author(author_id, 'posts_count', delta)
+
+
+def change_author_followers(author_id, delta):
+    _change_author(author_id, 'followers_count', delta)
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def author_posts_count(author):
+    try:
+        return author.post_stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+def author_followers_count(author_id):
+    return (
+        AuthorStats.objects.filter(author_id=author_id)
+        .values_list('followers_count', flat=True).first()
+    ) or 0
+
+
+def _batches(queryset, batch_size):
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def _counts(queryset, field, pks):
+    return dict(
+        queryset.filter(**{f'{field}__in': pks}).order_by()
+        .values_list(field).annotate(total=Count('pk'))
+    )
+
+
+def recount_authors(batch_size):
+    fixed = 0
+    for pks in _batches(User.objects.all(), batch_size):
+        with transaction.atomic():
+            posts = _counts(Post.objects.all(), 'author_id', pks)
+            followers = _counts(Follow.objects.all(), 'author_id', pks)
+            stats = AuthorStats.objects.select_for_update().in_bulk(pks)
+            created, changed = [], []
+            for pk in pks:
+                actual = {
+                    'posts_count': posts.get(pk, 0),
+                    'followers_count': followers.get(pk, 0),
+                }
+                if pk not in stats:
+                    if any(actual.values()):
+                        created.append(AuthorStats(author_id=pk, **actual))
+                    continue
+                row = stats[pk]
+                if any(getattr(row, f) != v for f, v in actual.items()):
+                    for field, value in actual.items():
+                        setattr(row, field, value)
+                    changed.append(row)
+            AuthorStats.objects.bulk_create(created)
+            AuthorStats.objects.bulk_update(
+                changed, ['posts_count', 'followers_count']
+            )
+        fixed += len(created) + len(changed)
+    return fixed
+
+
+def _recount(model, field, related, related_field, batch_size):
+    fixed = 0
+    for pks in _batches(model.objects.all(), batch_size):
+        with transaction.atomic():
+            counts = _counts(related.objects.all(), related_field, pks)
+            changed = []
+            rows = (
+                model.objects.select_for_update().filter(pk__in=pks)
+                .only('pk', field)
+            )
+            for obj in rows:
+                actual = counts.get(obj.pk, 0)
+                if getattr(obj, field) != actual:
+                    setattr(obj, field, actual)
+                    changed.append(obj)
+            model.objects.bulk_update(changed, [field])
+        fixed += len(changed)
+    return fixed
+
+
+def recount_groups(batch_size):
+    return _recount(Group, 'posts_count', Post, 'group_id', batch_size)
+
+
+def recount_posts(batch_size):
+    return _recount(
+        Post, 'comments_count', CommentModel, 'post_id', batch_size
+    )
@@ -0,0 +1,223 @@
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from . import counters, search
+from .cache import INDEX_FEED, bump_feed_version
+from .models import CommentModel, Follow, Group, Post, TimelineEntry
+from .timelines import is_celebrity, mark_pulled
+
+User = get_user_model()
+
+WORDS = (
+    'город река утро вечер дорога книга музыка кофе море лес поезд '
+    'работа проект друг семья праздник погода зима весна лето осень '
+    'фотография прогулка кино театр выставка рецепт ужин завтрак '
+    'новость история путешествие горы озеро парк велосипед спорт '
+    'футбол концерт песня сад дом окно кошка собака солнце дождь снег '
+    'встреча разговор идея план мечта вопрос ответ сегодня завтра '
+    'вчера долго быстро красиво интересно наконец снова очень'
+).split()
+
+# Доля постов без группы.
+NO_GROUP_SHARE = 0.1
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Временно отключает auto_now_add у полей.
+
+    Иначе bulk_create проставит всем строкам текущее время вместо
+    сгенерированных дат публикации.
+    """
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+def zipf_weights(size, skew):
+    """Накопленные веса, при которых k-й элемент выбирается в ~1/k^skew."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, size + 1)))
+
+
+def sentence(rng, low, high):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize() + '.'
+
+
+def _bulk_create(model, objects, batch_size):
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return
+        with transaction.atomic():
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def _images(rng, prefix, count):
+    names = []
+    for i in range(count):
+        color = tuple(rng.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 800), color).save(buffer, 'JPEG')
+        names.append(default_storage.save(
+            f'posts/{prefix}_{i}.jpg', ContentFile(buffer.getvalue())
+        ))
+    return names
+
+
+def generate(prefix='bench', users=1000, groups=20, posts=10000,
+             comments=20000, follows=20, images=10, image_share=0.2,
+             skew=1.1, hot_posts=0.01, hot_share=0.5, days=365,
+             batch_size=1000, seed=None):
+    """Заполняет БД синтетическими данными для нагрузочных замеров.
+
+    Авторство постов, выбор групп и подписки распределены по Ципфу с
+    показателем skew: немногие авторы пишут большую часть постов и
+    собирают большую часть подписчиков. Доля hot_share комментариев
+    приходится на долю hot_posts постов. Возвращает число строк по
+    моделям.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(None)
+
+    _bulk_create(User, [
+        User(
+            username=f'{prefix}{i}',
+            first_name=rng.choice(WORDS).capitalize(),
+            last_name=rng.choice(WORDS).capitalize(),
+            password=password,
+        )
+        for i in range(users)
+    ], batch_size)
+    user_ids = list(
+        User.objects.filter(username__startswith=prefix)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    user_weights = zipf_weights(len(user_ids), skew)
+
+    _bulk_create(Group, [
+        Group(
+            title=sentence(rng, 1, 3)[:-1],
+            slug=f'{prefix}-{i}',
+            description=sentence(rng, 5, 20),
+        )
+        for i in range(groups)
+    ], batch_size)
+    group_ids = list(
+        Group.objects.filter(slug__startswith=f'{prefix}-')
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    group_weights = zipf_weights(len(group_ids), skew)
+
+    image_names = _images(rng, prefix, images) if images else []
+    post_authors = rng.choices(user_ids, cum_weights=user_weights, k=posts)
+    post_rows = []
+    for author_id in post_authors:
+        group_id = None
+        if group_ids and rng.random() >= NO_GROUP_SHARE:
+            group_id = rng.choices(group_ids, cum_weights=group_weights)[0]
+        image = ''
+        if image_names and rng.random() < image_share:
+            image = rng.choice(image_names)
+        post_rows.append(Post(
+            text=sentence(rng, 5, 60),
+            author_id=author_id,
+            group_id=group_id,
+            image=image,
+            thumbnail_state=Post.thumbnail_state_for(image),
+            pub_date=now - timedelta(seconds=rng.uniform(0, days * 86400)),
+        ))
+    with explicit_dates(Post._meta.get_field('pub_date')):
+        _bulk_create(Post, post_rows, batch_size)
+    post_list = list(
+        Post.objects.filter(author__username__startswith=prefix)
+        .order_by('pk').values_list('pk', 'author_id', 'pub_date')
+    )
+
+    comment_rows = []
+    if post_list:
+        hot = rng.sample(post_list, max(1, int(len(post_list) * hot_posts)))
+        for _ in range(comments):
+            pool = hot if rng.random() < hot_share else post_list
+            post_id, _author, pub_date = rng.choice(pool)
+            comment_rows.append(CommentModel(
+                post_id=post_id,
+                author_id=rng.choices(user_ids, cum_weights=user_weights)[0],
+                text=sentence(rng, 2, 30),
+                created=pub_date + (now - pub_date) * rng.random(),
+            ))
+    with explicit_dates(CommentModel._meta.get_field('created')):
+        _bulk_create(CommentModel, comment_rows, batch_size)
+
+    followed = {}
+    for user_id in user_ids:
+        wanted = min(rng.randint(0, follows * 2), len(user_ids) - 1)
+        authors = set(
+            rng.choices(user_ids, cum_weights=user_weights, k=wanted)
+        )
+        authors.discard(user_id)
+        for author_id in authors:
+            followed.setdefault(author_id, []).append(user_id)
+    _bulk_create(Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for author_id, readers in followed.items() for user_id in readers
+    ), batch_size)
+
+    # Сигналы при bulk_create не срабатывают, поэтому ленты подписок
+    # заполняются здесь так же, как это сделал бы backfill.
+    recent = {}
+    for post_id, author_id, pub_date in sorted(
+        post_list, key=lambda row: row[2], reverse=True
+    ):
+        author_posts = recent.setdefault(author_id, [])
+        if len(author_posts) < settings.FOLLOW_BACKFILL:
+            author_posts.append((post_id, pub_date))
+    _bulk_create(TimelineEntry, (
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for author_id, readers in followed.items()
+        if not is_celebrity(len(readers))
+        for user_id in readers
+        for post_id, pub_date in recent.get(author_id, ())
+    ), batch_size)
+
+    counters.recount_authors(batch_size)
+    counters.recount_groups(batch_size)
+    counters.recount_posts(batch_size)
+    # Посты знаменитостей подмешиваются при чтении; отметки ставятся
+    # после пересчёта, когда строки AuthorStats уже созданы.
+    for author_id, readers in followed.items():
+        if is_celebrity(len(readers)):
+            mark_pulled(author_id, [
+                post_id for post_id, post_author, _ in post_list
+                if post_author == author_id
+            ])
+    if search.is_available():
+        search.rebuild()
+    bump_feed_version(INDEX_FEED)
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_list),
+        'comments': len(comment_rows),
+        'follows': sum(len(readers) for readers in followed.values()),
+        'images': len(image_names),
+    }
@@ -0,0 +1,86 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .paginators import CursorPaginator
+
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+FIELDS = (
+    'id', 'pub_date', 'author', 'group', 'text', 'image', 'comments_count'
+)
+COLUMNS = {
+    'author': 'author__username',
+    'group': 'group__slug',
+}
+
+
+class Echo:
+    """Буфер для csv.writer, который просто возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def rows(queryset, chunk_size=None):
+    """Все посты набора словарями FIELDS, от новых к старым.
+
+    Набор читается серией keyset-запросов по chunk_size строк, так что
+    ни один запрос не держит курсор на всю выгрузку, а каждая страница —
+    это диапазон индекса (автор или группа, -pub_date, -id).
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    queryset = queryset.order_by().values(
+        *(COLUMNS.get(name, name) for name in FIELDS)
+    )
+    paginator = CursorPaginator(queryset, chunk_size)
+    last = None
+    while True:
+        count = 0
+        batch = paginator.fetch('next', last, chunk_size)
+        for row in batch.iterator(chunk_size=chunk_size):
+            count += 1
+            last = paginator.key(row)
+            yield {name: row[COLUMNS.get(name, name)] for name in FIELDS}
+        if count < chunk_size:
+            return
+
+
+def _csv_lines(records):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for record in records:
+        yield writer.writerow([record[name] for name in FIELDS])
+
+
+def _ndjson_lines(records):
+    for record in records:
+        yield json.dumps(
+            record, cls=DjangoJSONEncoder, ensure_ascii=False
+        ) + '\n'
+
+
+def stream(queryset, fmt, chunk_size=None):
+    """Выгрузка постов кусками текста в формате csv или ndjson.
+
+    Строки склеиваются по chunk_size, чтобы не отдавать серверу по
+    одному маленькому куску на каждый пост. Первая строка (для CSV —
+    заголовок, до первого запроса к БД) отдаётся сразу.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    lines = _csv_lines if fmt == 'csv' else _ndjson_lines
+    lines = lines(rows(queryset, chunk_size))
+    yield next(lines, '')
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
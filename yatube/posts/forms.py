@@ -1,9 +1,42 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import CommentModel, Post
 
 
-class PostForm(forms.ModelForm):
+class NormalizedImageMixin:
+    """Нормализует загруженное в поле image изображение поста.
+
+    Общая часть формы на сайте и форм админки (posts.admin): пост из
+    любой из них хранит уже обработанный файл и его размеры.
+    """
+
+    image_size = None
+
+    def clean_image(self):
+        """Нормализует загруженное изображение, см. posts.images."""
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            content, width, height = images.normalize(image, image.name)
+        except images.InvalidImage:
+            raise forms.ValidationError('Не удалось прочитать изображение.')
+        self.image_size = (width, height)
+        return content
+
+    def save(self, commit=True):
+        if self.image_size is not None:
+            self.instance.image_width, self.instance.image_height = (
+                self.image_size
+            )
+        elif not self.instance.image:
+            self.instance.image_width = self.instance.image_height = None
+        return super().save(commit)
+
+
+class PostForm(NormalizedImageMixin, forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
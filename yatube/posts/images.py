@@ -0,0 +1,181 @@
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageCms, ImageOps
+from sorl.thumbnail import delete as delete_thumbnails
+
+from . import thumbnails
+from .cache import bump_feed_version, post_feeds
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+# Форматы, которые сохраняются как есть; остальные пересохраняются в
+# JPEG, а с прозрачностью — в PNG.
+KEPT_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif'}
+# Режимы, в которых изображение можно записать в каждый формат.
+MODES = {
+    'JPEG': ('RGB', 'L'),
+    'PNG': ('RGB', 'RGBA', 'L', 'LA', 'P'),
+    'GIF': ('P', 'L'),
+}
+
+SRGB = ImageCms.createProfile('sRGB')
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def _to_srgb(image):
+    """Переводит изображение с ICC-профилем в sRGB."""
+    icc = image.info.get('icc_profile')
+    if not icc:
+        return image
+    mode = 'RGBA' if 'A' in image.getbands() else 'RGB'
+    try:
+        return ImageCms.profileToProfile(
+            image, ImageCms.ImageCmsProfile(io.BytesIO(icc)), SRGB,
+            outputMode=mode
+        )
+    except (ImageCms.PyCMSError, OSError, ValueError):
+        # Битый или неподдерживаемый профиль: цвета будут как без него.
+        return image
+
+
+def _output_format(image):
+    if image.format in KEPT_FORMATS:
+        return image.format
+    if 'A' in image.getbands() or 'transparency' in image.info:
+        return 'PNG'
+    return 'JPEG'
+
+
+def normalize(content, name):
+    """Готовит загруженное изображение к хранению.
+
+    Поворачивает по EXIF-ориентации, переводит в sRGB, уменьшает до
+    IMAGE_MAX_SIZE по большей стороне и пересохраняет без метаданных:
+    JPEG — с качеством IMAGE_QUALITY. GIF, PNG и JPEG сохраняют формат
+    и имя, прочие форматы переводятся в JPEG или PNG. Анимированные
+    изображения не перекодируются. Возвращает (файл, ширина, высота).
+    """
+    try:
+        image = Image.open(content)
+        image.load()
+    except (OSError, SyntaxError, Image.DecompressionBombError) as error:
+        raise InvalidImage(name) from error
+    if getattr(image, 'is_animated', False):
+        content.seek(0)
+        width, height = image.size
+        return ContentFile(content.read(), name=name), width, height
+    fmt = _output_format(image)
+    # exif_transpose возвращает копию, у которой уже нет формата.
+    image = _to_srgb(ImageOps.exif_transpose(image))
+    if image.mode not in MODES[fmt]:
+        if fmt == 'JPEG':
+            image = image.convert('RGB')
+        elif fmt == 'PNG':
+            image = image.convert(
+                'RGBA' if 'A' in image.getbands() else 'RGB'
+            )
+        else:
+            image = image.convert('P', palette=Image.ADAPTIVE)
+    limit = settings.IMAGE_MAX_SIZE
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    # PNG записывает ICC-профиль и EXIF из info, поэтому метаданные
+    # убираются явно; прозрачность палитры — не метаданные.
+    image.info = {
+        key: value for key, value in image.info.items()
+        if key == 'transparency'
+    }
+    buffer = io.BytesIO()
+    options = {'optimize': True}
+    if fmt == 'JPEG':
+        options.update(quality=settings.IMAGE_QUALITY, progressive=True)
+    image.save(buffer, fmt, **options)
+    base, extension = os.path.splitext(os.path.basename(name))
+    if extension.lower() not in (KEPT_FORMATS[fmt], '.jpeg'):
+        extension = KEPT_FORMATS[fmt]
+    width, height = image.size
+    content = ContentFile(buffer.getvalue(), name=base + extension)
+    return content, width, height
+
+
+def process(name):
+    """Нормализует сохранённое изображение; выполняется в воркере.
+
+    Результат записывается рядом под новым именем, исходный файл
+    удаляется только после обновления поста. Возвращает
+    (новое имя, ширина, высота) или None при ошибке.
+    """
+    try:
+        with default_storage.open(name) as original:
+            content, width, height = normalize(original, name)
+        new_name = default_storage.save(
+            os.path.join(os.path.dirname(name), content.name), content
+        )
+    except (OSError, InvalidImage):
+        logger.exception('Не удалось обработать изображение %s', name)
+        return None
+    return new_name, width, height
+
+
+def complete(pk, name, result):
+    """Переключает пост на нормализованный файл."""
+    if result is None:
+        return False
+    new_name, width, height = result
+    # Условие на имя не даёт затереть изображение, загруженное к посту
+    # за время обработки.
+    updated = Post.objects.filter(pk=pk, image=name).update(
+        image=new_name, image_width=width, image_height=height,
+        thumbnail_state=Post.THUMBNAIL_PENDING, updated=timezone.now()
+    )
+    if not updated:
+        default_storage.delete(new_name)
+        return False
+    delete_thumbnails(name)
+    post = Post.objects.only('pk', 'image', 'author', 'group').get(pk=pk)
+    thumbnails.enqueue(post)
+    bump_feed_version(*post_feeds(post.author_id, post.group_id))
+    return True
+
+
+def unprocessed(batch_size, after=0):
+    return list(
+        Post.objects.filter(image_width__isnull=True, pk__gt=after)
+        .exclude(image='').order_by('pk')
+        .values_list('pk', 'image')[:batch_size]
+    )
+
+
+def backfill(batch_size, workers):
+    """Нормализует изображения существующих постов пулом процессов.
+
+    Возвращает пару (обработано, ошибок).
+    """
+    processed = failed = 0
+    batch = unprocessed(batch_size)
+    if not batch:
+        return processed, failed
+    # Дочерние процессы не должны наследовать открытые соединения с БД.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while batch:
+            results = pool.map(process, [name for pk, name in batch])
+            for (pk, name), result in zip(batch, results):
+                if complete(pk, name, result):
+                    processed += 1
+                else:
+                    failed += 1
+            batch = unprocessed(batch_size, after=batch[-1][0])
+    return processed, failed
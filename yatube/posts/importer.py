@@ -0,0 +1,375 @@
+import csv
+import json
+import logging
+import os
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters
+from .cache import bump_feed_version, post_feeds
+from .dataset import explicit_dates
+from .models import (
+    AuthorStats, CommentModel, Group, ImportedPost, ImportSource, Post
+)
+from .timelines import fan_out, is_celebrity, mark_pulled
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'csv')
+# Запас до лимита SQLite на число параметров в одном запросе.
+LOOKUP_CHUNK = 500
+
+
+class RecordError(ValueError):
+    pass
+
+
+class LookupCache(OrderedDict):
+    """Словарь с вытеснением давно не использованных ключей (LRU)."""
+
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.size:
+            self.popitem(last=False)
+
+
+def _jsonl(lines):
+    for line in lines:
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def read_records(path, fmt=None):
+    """Построчно читает файл импорта, отдаёт словари записей.
+
+    Битая строка JSONL отдаётся как None, чтобы номера записей
+    совпадали с номерами строк.
+    """
+    if fmt is None:
+        fmt = 'csv' if path.endswith('.csv') else 'jsonl'
+    with open(path, newline='', encoding='utf-8') as source:
+        if fmt == 'csv':
+            yield from csv.DictReader(source)
+        else:
+            yield from _jsonl(source)
+
+
+def _chunks(items, size=LOOKUP_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _parse_date(value, now):
+    if not value:
+        return now
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise RecordError(f'неверная дата «{value}»')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _inserted_pks(model, objects):
+    """Первичные ключи строк, только что вставленных bulk_create.
+
+    Бэкенды, которые не возвращают id из INSERT (SQLite), получают их
+    как последние id таблицы: до конца транзакции другие процессы писать
+    в неё не могут, а AUTOINCREMENT выдаёт id по возрастанию.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return [obj.pk for obj in objects]
+    pks = model.objects.order_by('-pk').values_list('pk', flat=True)
+    return list(pks[:len(objects)])[::-1]
+
+
+class Importer:
+    """Потоковый импорт постов и комментариев пакетами.
+
+    Записи читаются генератором и обрабатываются пакетами по batch_size
+    в отдельной транзакции; в той же транзакции сохраняется позиция в
+    источнике, так что прерванный импорт продолжается с первой
+    незагруженной записи. Авторы, группы и внешние id постов ищутся
+    через LRU-кеши ограниченного размера, поэтому потребление памяти не
+    зависит от размера файла.
+    """
+
+    def __init__(self, source, batch_size=1000, image_root=None,
+                 image_workers=4, create_missing=False, cache_size=10000):
+        self.source, _ = ImportSource.objects.get_or_create(name=source)
+        self.batch_size = batch_size
+        self.image_root = image_root
+        self.image_workers = image_workers
+        self.create_missing = create_missing
+        # Все значения одного пакета должны поместиться в кеш, иначе
+        # найденный id вытеснится до того, как будет использован.
+        cache_size = max(cache_size, 2 * batch_size)
+        self.users = LookupCache(cache_size)
+        self.groups = LookupCache(cache_size)
+        self.posts = LookupCache(cache_size)
+        self.stats = Counter()
+
+    def run(self, records, restart=False):
+        if restart:
+            self.source.position = 0
+        position = self.source.position
+        records = islice(enumerate(records, 1), position, None)
+        with ThreadPoolExecutor(max_workers=self.image_workers) as pool:
+            while True:
+                batch = list(islice(records, self.batch_size))
+                if not batch:
+                    break
+                self.import_batch(batch, pool)
+        return self.stats
+
+    def skip(self, number, reason):
+        self.stats['skipped'] += 1
+        logger.warning('Запись %s пропущена: %s', number, reason)
+
+    def parse(self, batch, now):
+        posts, comments = [], []
+        for number, record in batch:
+            try:
+                if not isinstance(record, dict):
+                    raise RecordError('не удалось разобрать запись')
+                kind = record.get('type') or 'post'
+                if kind not in ('post', 'comment'):
+                    raise RecordError(f'неизвестный тип «{kind}»')
+                required = ('id', 'author', 'text')
+                if kind == 'comment':
+                    required = ('post', 'author', 'text')
+                missing = [name for name in required if not record.get(name)]
+                if missing:
+                    raise RecordError(f'нет полей {", ".join(missing)}')
+                for name in ('id', 'post', 'author', 'group'):
+                    if record.get(name) is not None:
+                        record[name] = str(record[name])
+                record['date'] = _parse_date(record.get('date'), now)
+            except RecordError as error:
+                self.skip(number, error)
+                continue
+            target = posts if kind == 'post' else comments
+            target.append((number, record))
+        return posts, comments
+
+    def lookup(self, cache, model, field, values):
+        """Заполняет кеш id объектов по значениям поля; отдаёт ненайденные."""
+        missing = {value for value in values if cache.get(value) is None}
+        for chunk in _chunks(missing):
+            found = model.objects.filter(**{f'{field}__in': chunk})
+            for value, pk in found.values_list(field, 'pk'):
+                cache[value] = pk
+        return {value for value in missing if cache.get(value) is None}
+
+    def resolve(self, cache, model, field, values, create):
+        missing = self.lookup(cache, model, field, values)
+        if missing and self.create_missing:
+            model.objects.bulk_create(
+                [create(value) for value in missing], ignore_conflicts=True
+            )
+            missing = self.lookup(cache, model, field, missing)
+        return missing
+
+    def resolve_authors(self, records):
+        password = make_password(None)
+        return self.resolve(
+            self.users, User, 'username',
+            {record['author'] for number, record in records},
+            lambda name: User(username=name, password=password)
+        )
+
+    def resolve_groups(self, records):
+        return self.resolve(
+            self.groups, Group, 'slug',
+            {record['group'] for number, record in records
+             if record.get('group')},
+            lambda slug: Group(title=slug, slug=slug, description='')
+        )
+
+    def resolve_posts(self, records):
+        missing = {
+            record['post'] for number, record in records
+            if self.posts.get(record['post']) is None
+        }
+        imported = ImportedPost.objects.filter(source=self.source)
+        for chunk in _chunks(missing):
+            found = imported.filter(external_id__in=chunk)
+            for external_id, pk in found.values_list('external_id', 'post'):
+                self.posts[external_id] = pk
+
+    def copy_image(self, name):
+        root = os.path.realpath(self.image_root)
+        path = os.path.realpath(os.path.join(root, name))
+        if not path.startswith(root + os.sep):
+            raise RecordError(f'путь «{name}» вне каталога изображений')
+        with open(path, 'rb') as image:
+            return default_storage.save(
+                f'posts/{os.path.basename(path)}', File(image)
+            )
+
+    def copy_images(self, records, pool):
+        """Копирует изображения пакета параллельно, до начала транзакции."""
+        names = {}
+        if self.image_root is None:
+            return names
+        futures = {
+            number: pool.submit(self.copy_image, record['image'])
+            for number, record in records if record.get('image')
+        }
+        for number, future in futures.items():
+            try:
+                names[number] = future.result()
+            except (OSError, RecordError) as error:
+                self.stats['image_errors'] += 1
+                logger.warning(
+                    'Запись %s: изображение не скопировано: %s',
+                    number, error
+                )
+        return names
+
+    def build_posts(self, records, pool):
+        missing_users = self.resolve_authors(records)
+        missing_groups = self.resolve_groups(records)
+        seen = set()
+        imported = ImportedPost.objects.filter(source=self.source)
+        for chunk in _chunks({record['id'] for number, record in records}):
+            seen.update(
+                imported.filter(external_id__in=chunk)
+                .values_list('external_id', flat=True)
+            )
+        accepted = []
+        for number, record in records:
+            if record['author'] in missing_users:
+                self.skip(number, f'нет автора «{record["author"]}»')
+            elif record.get('group') in missing_groups:
+                self.skip(number, f'нет группы «{record["group"]}»')
+            elif record['id'] in seen:
+                self.stats['duplicates'] += 1
+            else:
+                seen.add(record['id'])
+                accepted.append((number, record))
+        images = self.copy_images(accepted, pool)
+        posts = []
+        for number, record in accepted:
+            image = images.get(number, '')
+            posts.append((record['id'], Post(
+                text=record['text'],
+                author_id=self.users.get(record['author']),
+                group_id=self.groups.get(record.get('group')),
+                pub_date=record['date'],
+                image=image,
+                thumbnail_state=Post.thumbnail_state_for(image),
+            )))
+        self.stats['images'] += len(images)
+        return posts
+
+    def build_comments(self, records):
+        missing_users = self.resolve_authors(records)
+        self.resolve_posts(records)
+        comments = []
+        for number, record in records:
+            post_id = self.posts.get(record['post'])
+            if record['author'] in missing_users:
+                self.skip(number, f'нет автора «{record["author"]}»')
+            elif post_id is None:
+                self.skip(number, f'нет поста «{record["post"]}»')
+            else:
+                comments.append(CommentModel(
+                    post_id=post_id,
+                    author_id=self.users.get(record['author']),
+                    text=record['text'],
+                    created=record['date'],
+                ))
+        return comments
+
+    def import_batch(self, batch, pool):
+        post_records, comment_records = self.parse(batch, timezone.now())
+        posts = self.build_posts(post_records, pool)
+        with transaction.atomic(), explicit_dates(
+            Post._meta.get_field('pub_date'),
+            CommentModel._meta.get_field('created'),
+        ):
+            objects = [post for external_id, post in posts]
+            Post.objects.bulk_create(objects)
+            pks = _inserted_pks(Post, objects) if objects else []
+            for (external_id, post), pk in zip(posts, pks):
+                post.pk = pk
+                self.posts[external_id] = pk
+            ImportedPost.objects.bulk_create([
+                ImportedPost(
+                    source=self.source, external_id=external_id, post_id=pk
+                )
+                for (external_id, post), pk in zip(posts, pks)
+            ])
+            # Комментарии разбираются после постов: они могут ссылаться
+            # на посты из этого же пакета.
+            comments = self.build_comments(comment_records)
+            CommentModel.objects.bulk_create(comments)
+            self.update_counters(objects, comments)
+            self.source.position = batch[-1][0]
+            self.source.save(update_fields=['position', 'updated'])
+        self.stats['posts'] += len(objects)
+        self.stats['comments'] += len(comments)
+        self.publish(objects)
+
+    def update_counters(self, posts, comments):
+        # bulk_create не отправляет сигналы, поэтому счётчики
+        # увеличиваются здесь, одним UPDATE на автора, группу и пост.
+        for author_id, delta in Counter(p.author_id for p in posts).items():
+            counters.change_author_posts(author_id, delta)
+        for group_id, delta in Counter(p.group_id for p in posts).items():
+            counters.change_group_posts(group_id, delta)
+        for post_id, delta in Counter(c.post_id for c in comments).items():
+            counters.change_post_comments(post_id, delta)
+
+    def publish(self, posts):
+        """Раскладывает посты по лентам подписчиков и сбрасывает кеш лент."""
+        if not posts:
+            return
+        authors = {post.author_id for post in posts}
+        followed = {}
+        for chunk in _chunks(authors):
+            followed.update(
+                AuthorStats.objects.filter(
+                    author_id__in=chunk, followers_count__gt=0
+                ).values_list('author_id', 'followers_count')
+            )
+        feeds = set()
+        pulled = {}
+        for post in posts:
+            feeds.update(post_feeds(post.author_id, post.group_id))
+            followers = followed.get(post.author_id)
+            if not followers:
+                continue
+            if is_celebrity(followers):
+                pulled.setdefault(post.author_id, []).append(post.pk)
+            else:
+                fan_out(post.pk, post.author_id, post.pub_date)
+        for author_id, post_ids in pulled.items():
+            mark_pulled(author_id, post_ids)
+        bump_feed_version(*feeds)
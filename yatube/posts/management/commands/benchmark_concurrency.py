@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет пропускную способность чтения страницы, пока другие '
+        'потоки пишут комментарии: с настройками SQLite по умолчанию и '
+        'с профилем SQLITE_PRAGMAS. Запускайте на копии базы при '
+        'остановленном сервере.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--duration', type=float, default=10.0,
+            help='Длительность замера каждого профиля в секундах.'
+        )
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--url', help='Страница для чтения, по умолчанию главная.'
+        )
+        parser.add_argument(
+            '--profile', choices=('default', 'tuned', 'both'),
+            default='both'
+        )
+        parser.add_argument('--output', help='Файл для отчёта в JSON.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер рассчитан на SQLite.')
+        profiles = (
+            ('default', 'tuned') if options['profile'] == 'both'
+            else (options['profile'],)
+        )
+        results = []
+        for profile in profiles:
+            try:
+                result = benchmark.concurrency(
+                    options['duration'], options['readers'],
+                    options['writers'], options['url'], profile
+                )
+            except ValueError as error:
+                raise CommandError(error)
+            results.append(result)
+            self.stdout.write(
+                f'{profile:8} чтений/с {result["reads_per_s"]:8.1f}  '
+                f'p95 {result["read_p95_ms"] or 0:8.2f} мс  '
+                f'записей/с {result["writes_per_s"]:6.1f}  '
+                f'ошибок {result["errors"]}'
+            )
+        if len(results) == 2 and results[0]['reads_per_s']:
+            gain = results[1]['reads_per_s'] / results[0]['reads_per_s']
+            self.stdout.write(f'Чтение быстрее в {gain:.2f} раза')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
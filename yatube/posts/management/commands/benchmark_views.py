@@ -0,0 +1,70 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет страницы из posts/urls.py тестовым клиентом на текущей '
+        'базе: перцентили времени ответа, число запросов и пик памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Сколько запросов к странице сделать до замеров.'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            help='Мерить только эту страницу (имя из posts/urls.py).'
+        )
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Файл для отчёта в JSON.'
+        )
+        parser.add_argument(
+            '--compare', metavar='BASELINE',
+            help='Отчёт предыдущего прогона для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs должен быть положительным.')
+        if settings.DEBUG:
+            self.stderr.write(
+                'DEBUG включён: Django пишет журнал запросов, '
+                'время ответа будет завышено.'
+            )
+        try:
+            report = benchmark.run(
+                options['runs'], options['warmup'], options['cold'],
+                options['views']
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        for name, result in report['results'].items():
+            self.stdout.write(
+                f'{name:18} p50 {result["p50_ms"]:8.2f} мс  '
+                f'p95 {result["p95_ms"]:8.2f} мс  '
+                f'p99 {result["p99_ms"]:8.2f} мс  '
+                f'запросов {result["queries"]:3}  '
+                f'память {result["peak_memory_kib"]:8.1f} КиБ'
+            )
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                rows = benchmark.compare(json.load(baseline), report)
+            for name, metric, old, new, change in rows:
+                self.stdout.write(
+                    f'{name:18} {metric:16} {old:>10} -> {new:>10} '
+                    f'({change:+.1f}%)'
+                )
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты автора или группы в CSV или NDJSON.'
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--author', help='username автора.')
+        target.add_argument('--group', help='slug группы.')
+        parser.add_argument(
+            '--format', choices=export.FORMATS, default='csv'
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию — stdout.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Сколько постов читать одним запросом.'
+        )
+
+    def handle(self, *args, **options):
+        if options['author']:
+            author = User.objects.filter(username=options['author']).first()
+            if author is None:
+                raise CommandError(f'Автор {options["author"]} не найден.')
+            posts = Post.objects.filter(author=author)
+        else:
+            group = Group.objects.filter(slug=options['group']).first()
+            if group is None:
+                raise CommandError(f'Группа {options["group"]} не найдена.')
+            posts = Post.objects.filter(group=group)
+        chunks = export.stream(
+            posts, options['format'], options['chunk_size']
+        )
+        if options['output']:
+            with open(options['output'], 'w', newline='',
+                      encoding='utf-8') as output:
+                output.writelines(chunks)
+            return
+        for chunk in chunks:
+            self.stdout.write(chunk, ending='')
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import dataset
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prefix', default='bench',
+            help='Префикс имён пользователей и адресов групп.'
+        )
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--images', type=int, default=10,
+            help='Сколько разных изображений создать для постов.'
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.2,
+            help='Доля постов с изображением.'
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа для авторов и групп.'
+        )
+        parser.add_argument(
+            '--hot-posts', type=float, default=0.01,
+            help='Доля «горячих» постов.'
+        )
+        parser.add_argument(
+            '--hot-share', type=float, default=0.5,
+            help='Доля комментариев, приходящихся на горячие посты.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты публикации.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом «{prefix}» уже есть, '
+                f'укажите другой --prefix.'
+            )
+        created = dataset.generate(
+            prefix=prefix,
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+            image_share=options['image_share'],
+            skew=options['skew'],
+            hot_posts=options['hot_posts'],
+            hot_share=options['hot_share'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+        )
+        for name, count in created.items():
+            self.stdout.write(f'{name}: {count}')
+        if created['images']:
+            self.stdout.write(
+                'Миниатюры изображений строит команда generate_thumbnails.'
+            )
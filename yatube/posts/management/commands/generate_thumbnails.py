@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер очереди миниатюр: заранее генерирует миниатюры '
+        'изображений постов в пуле процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число процессов для генерации.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько постов забирать из очереди за раз.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а опрашивать очередь каждые --interval с.'
+        )
+        parser.add_argument('--interval', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        while True:
+            processed = thumbnails.process_pending(
+                options['batch_size'], options['workers']
+            )
+            if processed:
+                self.stdout.write(f'Обработано постов: {processed}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,75 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует посты и комментарии из JSONL или CSV. '
+        'Поля записи: type (post или comment), id (внешний id поста), '
+        'post (внешний id поста комментария), author (username), '
+        'group (slug), text, date (ISO 8601), image (путь относительно '
+        '--images). Прерванный импорт продолжается с места остановки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с записями.')
+        parser.add_argument(
+            '--format', choices=importer.FORMATS,
+            help='Формат файла; по умолчанию — по расширению.'
+        )
+        parser.add_argument(
+            '--source',
+            help='Имя источника для позиции и внешних id; '
+                 'по умолчанию — имя файла.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--images', help='Каталог, из которого копируются изображения.'
+        )
+        parser.add_argument(
+            '--image-workers', type=int, default=4,
+            help='Сколько изображений копировать одновременно.'
+        )
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать ненайденных авторов и группы.'
+        )
+        parser.add_argument(
+            '--cache-size', type=int, default=10000,
+            help='Размер кешей авторов, групп и id постов.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать файл сначала, а не с сохранённой позиции. '
+                 'Посты с уже загруженными id не дублируются, '
+                 'комментарии — дублируются.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'Файл {path} не найден.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        loader = importer.Importer(
+            options['source'] or os.path.basename(path),
+            batch_size=options['batch_size'],
+            image_root=options['images'],
+            image_workers=options['image_workers'],
+            create_missing=options['create_missing'],
+            cache_size=options['cache_size'],
+        )
+        if loader.source.position and not options['restart']:
+            self.stdout.write(
+                f'Продолжение с записи {loader.source.position + 1}.'
+            )
+        stats = loader.run(
+            importer.read_records(path, options['format']),
+            restart=options['restart']
+        )
+        for name in ('posts', 'comments', 'images', 'image_errors',
+                     'duplicates', 'skipped'):
+            self.stdout.write(f'{name}: {stats[name]}')
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import images
+
+
+class Command(BaseCommand):
+    help = (
+        'Нормализует изображения постов, загруженные до появления '
+        'обработки при загрузке, и записывает их размеры.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.IMAGE_WORKERS,
+            help='Число процессов для обработки.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько постов обрабатывать за раз.'
+        )
+
+    def handle(self, *args, **options):
+        processed, failed = images.backfill(
+            options['batch_size'], options['workers']
+        )
+        self.stdout.write(
+            f'Обработано изображений: {processed}, ошибок: {failed}'
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-optimize', action='store_true',
+            help='Не объединять сегменты индекса после перестройки.'
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError(
+                'Полнотекстовый индекс доступен только на SQLite с FTS5.'
+            )
+        total = search.rebuild(optimize=not options['no_optimize'])
+        self.stdout.write(f'Проиндексировано документов: {total}')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов авторов и групп и комментариев '
+        'постов, исправляя расхождения пакетами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк пересчитывать в одной транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for name, recount in (
+            ('авторы', counters.recount_authors),
+            ('группы', counters.recount_groups),
+            ('посты', counters.recount_posts),
+        ):
+            fixed = recount(batch_size)
+            self.stdout.write(f'{name}: исправлено счётчиков — {fixed}')
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Добавляет новые комментарии к рейтингам ленты популярного и '
+        'удаляет устаревшие рейтинги.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.TRENDING_BATCH_SIZE,
+            help='Сколько комментариев учитывать одной транзакцией.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а пересчитывать каждые --interval с.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=settings.TRENDING_INTERVAL
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            report = trending.update(options['batch_size'])
+            self.stdout.write(
+                f'Учтено комментариев: {report["comments"]}, удалено '
+                f'рейтингов: {report["pruned"]} за '
+                f'{time.perf_counter() - started:.2f} с'
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
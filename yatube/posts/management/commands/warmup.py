@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import warmup
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кеши после деплоя или перезапуска: рендерит первые '
+        'страницы главной, крупнейших групп и самых активных авторов и '
+        'разрешает их миниатюры. Завершается с ошибкой, если что-то '
+        'прогреть не удалось, поэтому годится как проверка готовности. '
+        'Нужен общий для процессов кеш; с LocMemCache прогревайте каждый '
+        'процесс при старте (WARMUP_ON_START).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=settings.WARMUP_PAGES,
+            help='Сколько страниц главной прогреть.'
+        )
+        parser.add_argument(
+            '--groups', type=int, default=settings.WARMUP_GROUPS,
+            help='Сколько крупнейших групп прогреть.'
+        )
+        parser.add_argument(
+            '--profiles', type=int, default=settings.WARMUP_PROFILES,
+            help='Сколько профилей самых активных авторов прогреть.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=settings.WARMUP_WORKERS,
+            help='Число потоков.'
+        )
+
+    def handle(self, *args, **options):
+        if not warmup.shared_cache():
+            raise CommandError(
+                'Кеш по умолчанию локален для процесса: команда заполнила '
+                'бы только собственную память. Настройте общий кеш или '
+                'включите WARMUP_ON_START.'
+            )
+        report = warmup.run(
+            options['pages'], options['groups'], options['profiles'],
+            options['workers']
+        )
+        if options['verbosity'] > 1:
+            for name, result in report['thumbnails'].items():
+                self.stdout.write(f'{result["ms"]:9.2f} мс  {name}')
+            for url, result in report['pages'].items():
+                self.stdout.write(
+                    f'{result["ms"]:9.2f} мс  {result["status"]}  {url}'
+                )
+        self.stdout.write(
+            f'Прогрето страниц: {len(report["pages"])}, '
+            f'миниатюр: {len(report["thumbnails"])} '
+            f'за {report["seconds"]:.3f} с'
+        )
+        failed = warmup.failures(report)
+        if failed:
+            raise CommandError('Не удалось прогреть: ' + ', '.join(failed))
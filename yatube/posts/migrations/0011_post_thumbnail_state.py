@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:06
+
+from django.db import migrations, models
+
+
+def mark_images_pending(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.exclude(image='').update(thumbnail_state=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_state',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Ожидает генерации'), (1, 'Готова'), (2, 'Ошибка генерации')], db_index=True, default=1, editable=False, verbose_name='Миниатюра'),
+        ),
+        migrations.RunPython(mark_images_pending, migrations.RunPython.noop),
+    ]
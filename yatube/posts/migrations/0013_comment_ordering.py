@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='commentmodel',
+            options={'ordering': ('created', 'id'), 'verbose_name': 'Комментарий', 'verbose_name_plural': 'Комментарии'},
+        ),
+    ]
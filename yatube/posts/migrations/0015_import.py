@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportSource',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True, verbose_name='Источник')),
+                ('position', models.PositiveIntegerField(default=0, verbose_name='Обработано записей')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлён')),
+            ],
+            options={
+                'verbose_name': 'Источник импорта',
+                'verbose_name_plural': 'Источники импорта',
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportedPost',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(max_length=100, verbose_name='Внешний id')),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='import_record', to='posts.Post', verbose_name='Пост')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='posts', to='posts.ImportSource', verbose_name='Источник')),
+            ],
+            options={
+                'verbose_name': 'Импортированный пост',
+                'verbose_name_plural': 'Импортированные посты',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importedpost',
+            constraint=models.UniqueConstraint(fields=('source', 'external_id'), name='unique_imported_post'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pulled(apps, schema_editor):
+    # До этой миграции посты подмешивались по текущему числу подписчиков
+    # автора: отмечаются посты тех, кто сейчас знаменитость.
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Post = apps.get_model('posts', 'Post')
+    celebrities = AuthorStats.objects.filter(
+        followers_count__gte=settings.FOLLOW_CELEBRITY_THRESHOLD
+    )
+    Post.objects.filter(
+        author_id__in=celebrities.values('author_id')
+    ).update(pulled=True)
+    celebrities.update(has_pulled_posts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='has_pulled_posts',
+            field=models.BooleanField(default=False, verbose_name='Есть посты, подмешиваемые при чтении'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='pulled',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Подмешивается в ленты при чтении'),
+        ),
+        migrations.RunPython(mark_pulled, migrations.RunPython.noop),
+    ]
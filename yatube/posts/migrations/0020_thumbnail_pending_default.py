@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_pulled_posts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='thumbnail_state',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Ожидает генерации'), (1, 'Готова'), (2, 'Ошибка генерации')], db_index=True, default=0, editable=False, verbose_name='Миниатюра'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def mark_imageless(apps, schema_editor):
+    # Посты без изображения, созданные после 0020, остались в очереди
+    # миниатюр, хотя строить им нечего.
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.filter(image='', thumbnail_state=0).update(
+        thumbnail_state=1
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_thumbnail_pending_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_imageless, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_imageless_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pulled', 'author', '-pub_date', '-id'], name='post_pulled_author_date_idx'),
+        ),
+    ]
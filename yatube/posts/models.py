@@ -5,10 +5,38 @@ from django.db import models
 User = get_user_model()
 
 
-class Group(models.Model):
+class CounterFieldsMixin:
+    """Не перезаписывает счётчики при сохранении загруженного объекта.
+
+    Счётчики меняются только атомарными UPDATE с F-выражениями, поэтому
+    значение в памяти может быть устаревшим и не должно попадать в БД.
+    """
+
+    counter_fields = ()
+
+    def get_skipped_fields(self):
+        """Поля, которые сохранение загруженного объекта не пишет."""
+        return self.get_deferred_fields().union(self.counter_fields)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = self.get_skipped_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(CounterFieldsMixin, models.Model):
     title = models.CharField(max_length=200, verbose_name='Название')
     slug = models.SlugField(unique=True, verbose_name='Ссылка')
     description = models.TextField(verbose_name='Описание')
+    posts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество постов'
+    )
+
+    counter_fields = ('posts_count',)
 
     class Meta:
         verbose_name = 'Группа'
@@ -18,7 +46,56 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+FEED_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'updated',
+    'image',
+    'image_width',
+    'image_height',
+    'thumbnail_state',
+    'author',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group',
+    'group__slug',
+    'group__title',
+)
+
+AUTHOR_STATS_FIELDS = (
+    'author__post_stats',
+    'author__post_stats__posts_count',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты со всеми данными, которые выводят шаблоны лент.
+
+        Автор и группа подтягиваются одним JOIN, из таблиц читаются
+        только колонки, используемые в карточке поста.
+        """
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def for_detail(self):
+        """Как for_feed, но вместе со счётчиком постов автора."""
+        return self.select_related(
+            'author__post_stats', 'group'
+        ).only(*FEED_FIELDS, *AUTHOR_STATS_FIELDS)
+
+
+class Post(CounterFieldsMixin, models.Model):
+    THUMBNAIL_PENDING = 0
+    THUMBNAIL_READY = 1
+    THUMBNAIL_FAILED = 2
+    THUMBNAIL_STATES = (
+        (THUMBNAIL_PENDING, 'Ожидает генерации'),
+        (THUMBNAIL_READY, 'Готова'),
+        (THUMBNAIL_FAILED, 'Ошибка генерации'),
+    )
+
     text = models.TextField(
         verbose_name='Текст поста', help_text='Текст нового поста'
     )
@@ -26,11 +103,15 @@ class Post(models.Model):
         auto_now_add=True, verbose_name='Дата публикации',
         db_index=True
     )
+    updated = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='author_posts',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False
     )
     group = models.ForeignKey(
         Group,
@@ -39,6 +120,7 @@ class Post(models.Model):
         null=True,
         related_name='group_posts',
         verbose_name='Группа',
+        db_index=False,
         help_text='Группа, к которой будет относиться пост'
     )
     image = models.ImageField(
@@ -47,15 +129,140 @@ class Post(models.Model):
         verbose_name='Изображение',
         help_text='Изображение поста'
     )
+    image_width = models.PositiveIntegerField(
+        null=True, editable=False, verbose_name='Ширина изображения'
+    )
+    image_height = models.PositiveIntegerField(
+        null=True, editable=False, verbose_name='Высота изображения'
+    )
+    thumbnail_state = models.PositiveSmallIntegerField(
+        choices=THUMBNAIL_STATES,
+        default=THUMBNAIL_PENDING,
+        editable=False,
+        db_index=True,
+        verbose_name='Миниатюра'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество комментариев'
+    )
+    # Пост знаменитости не рассылается по лентам подписчиков, а
+    # подмешивается при чтении, см. posts.timelines.
+    pulled = models.BooleanField(
+        default=False, editable=False,
+        verbose_name='Подмешивается в ленты при чтении'
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    counter_fields = ('comments_count',)
+    # Поля, изменения которых отслеживают сигналы сохранения.
+    tracked_fields = ('image', 'group')
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Ленты автора и группы читаются диапазоном этих индексов уже
+        # в нужном порядке; отдельные индексы по FK они заменяют.
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx'
+            ),
+            # Подмешиваемые посты знаменитости в ленте подписок.
+            models.Index(
+                fields=['pulled', 'author', '-pub_date', '-id'],
+                name='post_pulled_author_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def get_skipped_fields(self):
+        skipped = super().get_skipped_fields()
+        # Готовность миниатюры пишет thumbnails.complete() условным
+        # UPDATE, и значение в памяти может быть устаревшим. Поле
+        # сохраняется, только когда сменилось изображение.
+        if not self.image_changed():
+            skipped = skipped | {'thumbnail_state'}
+        return skipped
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.remember_loaded(kwargs.get('update_fields'))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        # Через этот метод догружаются и отложенные поля.
+        super().refresh_from_db(using, fields)
+        self.remember_loaded(fields)
+
+    def remember_loaded(self, fields=None):
+        """Запоминает значения tracked_fields, которые сейчас лежат в БД.
+
+        По ним сигналы сохранения узнают, что поменялось, без
+        дополнительного SELECT. Отложенные поля не запоминаются.
+        """
+        if fields is None or not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        for name in self.tracked_fields:
+            attname = self._meta.get_field(name).attname
+            if fields is not None and not {name, attname} & set(fields):
+                continue
+            if attname not in self.__dict__:
+                continue
+            # Пока к изображению не обращались, в поле лежит строка,
+            # потом — FieldFile, который меняется на месте при
+            # сохранении файла.
+            value = self.__dict__[attname]
+            self._loaded_values[name] = getattr(value, 'name', value)
+
+    def image_changed(self):
+        """Отличается ли изображение от сохранённого в БД."""
+        if self._state.adding:
+            return bool(self.image)
+        if 'image' in self.get_deferred_fields():
+            return False
+        loaded = getattr(self, '_loaded_values', {})
+        if 'image' not in loaded:
+            return True
+        return (self.image.name or '') != (loaded['image'] or '')
+
+    @classmethod
+    def thumbnail_state_for(cls, image):
+        """Начальное состояние миниатюры поста с таким изображением."""
+        return cls.THUMBNAIL_PENDING if image else cls.THUMBNAIL_READY
+
+    @property
+    def thumbnail_ready(self):
+        return self.thumbnail_state == self.THUMBNAIL_READY
+
+
+COMMENT_FIELDS = (
+    'id',
+    'text',
+    'created',
+    'post',
+    'author',
+    'author__username',
+)
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_thread(self):
+        """Комментарии вместе с именами авторов для ленты обсуждения."""
+        return self.select_related('author').only(*COMMENT_FIELDS)
+
 
 class CommentModel(models.Model):
     post = models.ForeignKey(
@@ -63,7 +270,8 @@ class CommentModel(models.Model):
         on_delete=models.CASCADE,
         related_name='comments',
         verbose_name='Пост',
-        help_text='Текст комментария'
+        help_text='Текст комментария',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
@@ -77,9 +285,221 @@ class CommentModel(models.Model):
         db_index=True
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
+        ordering = ('created', 'id')
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество подписчиков'
+    )
+    has_pulled_posts = models.BooleanField(
+        default=False, verbose_name='Есть посты, подмешиваемые при чтении'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.author_id}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата подписки'
+    )
+
+    class Meta:
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.author_id}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи лент подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class ImportSource(models.Model):
+    """Источник импорта и позиция, до которой он уже загружен."""
+
+    name = models.CharField(
+        max_length=200, unique=True, verbose_name='Источник'
+    )
+    position = models.PositiveIntegerField(
+        default=0, verbose_name='Обработано записей'
+    )
+    updated = models.DateTimeField(auto_now=True, verbose_name='Обновлён')
+
+    class Meta:
+        verbose_name = 'Источник импорта'
+        verbose_name_plural = 'Источники импорта'
+
+    def __str__(self):
+        return f'{self.name}: {self.position}'
+
+
+class ImportedPost(models.Model):
+    """Соответствие id поста во внешней системе посту Yatube."""
+
+    source = models.ForeignKey(
+        ImportSource,
+        on_delete=models.CASCADE,
+        related_name='posts',
+        verbose_name='Источник'
+    )
+    external_id = models.CharField(max_length=100, verbose_name='Внешний id')
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='import_record',
+        verbose_name='Пост'
+    )
+
+    class Meta:
+        verbose_name = 'Импортированный пост'
+        verbose_name_plural = 'Импортированные посты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'external_id'], name='unique_imported_post'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.source_id}: {self.external_id}'
+
+
+class TrendingScoreQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Рейтинги вместе с постами в объёме PostQuerySet.for_feed."""
+        return self.select_related('post__author', 'post__group').only(
+            'score', 'post', *(f'post__{name}' for name in FEED_FIELDS)
+        )
+
+
+class TrendingScore(models.Model):
+    """Рейтинг поста в ленте популярного, см. posts.trending.
+
+    score — сумма 2 ** ((created - epoch) / half_life) по комментариям
+    поста. Затухание у всех постов одинаковое, поэтому порядок по score
+    совпадает с порядком по затухшему рейтингу без пересчёта строк.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост'
+    )
+    score = models.FloatField(default=0, verbose_name='Рейтинг')
+
+    objects = TrendingScoreQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Рейтинг поста'
+        verbose_name_plural = 'Рейтинги постов'
+        # Лента популярного читается диапазоном этого индекса.
+        indexes = [
+            models.Index(
+                fields=['-score', '-post'], name='trending_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score}'
+
+
+class TrendingState(models.Model):
+    """Состояние расчёта рейтингов: учтённые комментарии и эпоха."""
+
+    epoch = models.DateTimeField(verbose_name='Начало отсчёта')
+    last_comment_id = models.PositiveIntegerField(
+        default=0, verbose_name='Последний учтённый комментарий'
+    )
+    updated = models.DateTimeField(auto_now=True, verbose_name='Обновлён')
+
+    class Meta:
+        verbose_name = 'Состояние рейтингов'
+        verbose_name_plural = 'Состояние рейтингов'
+
+    def __str__(self):
+        return f'{self.epoch}: {self.last_comment_id}'
@@ -0,0 +1,260 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import Http404
+
+
+CURSOR_PARAM = 'cursor'
+PAGE_PARAM = 'page'
+
+
+# Целые в SQLite — знаковые 64-битные; большее число в условии
+# запроса вызывает OverflowError.
+SQLITE_INT_MIN, SQLITE_INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_token(direction, values):
+    raw = json.dumps([direction, values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_token(token, size):
+    """Разбирает токен в пару (направление, сырые значения ключа)."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(
+            base64.urlsafe_b64decode(padded.encode()).decode()
+        )
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise InvalidCursor(token) from e
+    if not isinstance(payload, list) or len(payload) != 2:
+        raise InvalidCursor(token)
+    direction, values = payload
+    if direction not in ('next', 'prev'):
+        raise InvalidCursor(token)
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor(token)
+    return direction, values
+
+
+def check_int(value, token):
+    """Проверяет, что значение ключа — целое, которое примет SQLite."""
+    if (isinstance(value, bool) or not isinstance(value, int)
+            or not SQLITE_INT_MIN <= value <= SQLITE_INT_MAX):
+        raise InvalidCursor(token)
+    return value
+
+
+class CursorPage:
+    """Страница keyset-пагинации.
+
+    Повторяет ту часть интерфейса django.core.paginator.Page, которую
+    используют шаблоны, но вместо номеров страниц отдаёт непрозрачные
+    токены соседних страниц. Запрос к БД выполняется лениво — при первом
+    обращении к объектам страницы.
+    """
+
+    is_cursor = True
+
+    def __init__(self, paginator, cursor=None):
+        self.paginator = paginator
+        self.cursor = cursor
+        self._object_list = None
+        self._has_next = False
+        self._has_previous = False
+
+    def _fetch(self):
+        if self._object_list is not None:
+            return
+        per_page = self.paginator.per_page
+        if self.cursor is None:
+            direction, values = 'next', None
+        else:
+            direction, values = self.cursor
+        rows = list(self.paginator.fetch(direction, values, per_page + 1))
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction == 'next':
+            self._has_next = has_more
+            self._has_previous = values is not None
+            self._object_list = rows
+        else:
+            self._has_previous = has_more
+            self._has_next = True
+            self._object_list = rows[::-1]
+
+    @property
+    def object_list(self):
+        self._fetch()
+        return self._object_list
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __contains__(self, item):
+        return item in self.object_list
+
+    def __repr__(self):
+        return '<Cursor page of %s>' % self.paginator.per_page
+
+    def has_next(self):
+        self._fetch()
+        return self._has_next and bool(self._object_list)
+
+    def has_previous(self):
+        self._fetch()
+        return self._has_previous and bool(self._object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.encode('next', self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return self.paginator.encode('prev', self.object_list[0])
+
+    @property
+    def cursor_key(self):
+        """Стабильный идентификатор страницы для ключей кеша."""
+        if self.cursor is None:
+            return 'first'
+        direction, values = self.cursor
+        return self.paginator.encode(direction, values)
+
+
+class CursorPaginator:
+    """Keyset-пагинация по упорядоченному набору полей.
+
+    Страница выбирается условием по ключу последней записи предыдущей
+    страницы, поэтому стоимость любой страницы одинакова: нет ни OFFSET,
+    ни COUNT(*). По умолчанию ключ — (pub_date, id) в порядке убывания.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-pub_date', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.descending = self.ordering[0].startswith('-')
+        self.fields = tuple(name.lstrip('-') for name in self.ordering)
+
+    def ordered(self, reverse=False):
+        if reverse:
+            ordering = [
+                name[1:] if name.startswith('-') else '-' + name
+                for name in self.ordering
+            ]
+        else:
+            ordering = self.ordering
+        return self.queryset.order_by(*ordering)
+
+    def _boundary(self, values, forward):
+        strict = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        equal = {}
+        for name, value in zip(self.fields, values):
+            condition |= Q(**equal, **{f'{name}__{strict}': value})
+            equal[name] = value
+        # Избыточное условие на первое поле превращает OR-цепочку в поиск
+        # по диапазону индекса вместо просмотра с начала ленты.
+        first = {f'{self.fields[0]}__{strict}e': values[0]}
+        return Q(**first) & condition
+
+    def fetch(self, direction, values, limit):
+        """Строки страницы; для direction='prev' — в обратном порядке."""
+        forward = direction == 'next'
+        queryset = self.ordered(reverse=not forward)
+        if values is not None:
+            queryset = queryset.filter(self._boundary(values, forward))
+        return queryset[:limit]
+
+    def key(self, item):
+        if isinstance(item, (list, tuple)):
+            return list(item)
+        if isinstance(item, dict):
+            return [item[name] for name in self.fields]
+        return [getattr(item, name) for name in self.fields]
+
+    def encode(self, direction, item):
+        opts = self.queryset.model._meta
+        values = []
+        for name, value in zip(self.fields, self.key(item)):
+            field = opts.get_field(name)
+            values.append(
+                field.value_to_string(_Holder(field.attname, value))
+            )
+        return encode_token(direction, values)
+
+    def decode(self, token):
+        direction, raw_values = decode_token(token, len(self.fields))
+        opts = self.queryset.model._meta
+        values = []
+        for name, raw in zip(self.fields, raw_values):
+            field = opts.get_field(name)
+            # encode кладёт в токен строки; значения других типов —
+            # подделка, на которой to_python падает с TypeError.
+            if not isinstance(raw, str):
+                raise InvalidCursor(token)
+            try:
+                value = field.to_python(raw)
+            except (ValidationError, TypeError, ValueError,
+                    OverflowError) as error:
+                raise InvalidCursor(token) from error
+            if value is None:
+                raise InvalidCursor(token)
+            if isinstance(value, int):
+                check_int(value, token)
+            values.append(value)
+        return direction, values
+
+    def get_page(self, token=None):
+        """Страница по токену; на подделанный токен — 404."""
+        if not token:
+            return CursorPage(self)
+        try:
+            return CursorPage(self, self.decode(token))
+        except InvalidCursor:
+            raise Http404('Неверный курсор страницы.')
+
+
+class _Holder:
+    """Обёртка для Field.value_to_string, ожидающего объект модели."""
+
+    def __init__(self, name, value):
+        setattr(self, name, value)
+
+
+def paginate(request, queryset, per_page, ordering=('-pub_date', '-id')):
+    """Возвращает страницу ленты для шаблона posts/includes/paginator.html.
+
+    Основной режим — keyset-пагинация по параметру ?cursor=. Старые ссылки
+    вида ?page=N продолжают работать через обычный Paginator: для коротких
+    лент это удобнее, а стоимость OFFSET и COUNT(*) там невелика.
+    """
+    page_number = request.GET.get(PAGE_PARAM)
+    if page_number and CURSOR_PARAM not in request.GET:
+        return Paginator(
+            queryset.order_by(*ordering), per_page
+        ).get_page(page_number)
+    paginator = CursorPaginator(queryset, per_page, ordering)
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
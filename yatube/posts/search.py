@@ -0,0 +1,217 @@
+import math
+import re
+
+from django.db import (
+    DEFAULT_DB_ALIAS, connection, connections, transaction
+)
+from django.http import Http404
+
+from .models import Post
+from .paginators import (
+    CursorPage, InvalidCursor, check_int, decode_token, encode_token
+)
+
+
+SEARCH_TABLE = 'posts_search'
+MAX_TERMS = 10
+# Сколько лучших документов читается для одного запроса, не больше.
+MAX_DOCUMENTS = 10000
+
+# Документ поста хранится под rowid = id * 2, комментария — id * 2 + 1.
+TRIGGERS_SQL = (
+    'CREATE TRIGGER IF NOT EXISTS posts_search_post_insert '
+    'AFTER INSERT ON posts_post BEGIN '
+    'INSERT INTO posts_search(rowid, body, post_id) '
+    'VALUES (new.id * 2, new.text, new.id); END',
+    'CREATE TRIGGER IF NOT EXISTS posts_search_post_update '
+    'AFTER UPDATE OF text ON posts_post BEGIN '
+    'UPDATE posts_search SET body = new.text WHERE rowid = new.id * 2; END',
+    'CREATE TRIGGER IF NOT EXISTS posts_search_post_delete '
+    'AFTER DELETE ON posts_post BEGIN '
+    'DELETE FROM posts_search WHERE rowid = old.id * 2; END',
+    'CREATE TRIGGER IF NOT EXISTS posts_search_comment_insert '
+    'AFTER INSERT ON posts_commentmodel BEGIN '
+    'INSERT INTO posts_search(rowid, body, post_id) '
+    'VALUES (new.id * 2 + 1, new.text, new.post_id); END',
+    'CREATE TRIGGER IF NOT EXISTS posts_search_comment_update '
+    'AFTER UPDATE OF text ON posts_commentmodel BEGIN '
+    'UPDATE posts_search SET body = new.text '
+    'WHERE rowid = new.id * 2 + 1; END',
+    'CREATE TRIGGER IF NOT EXISTS posts_search_comment_delete '
+    'AFTER DELETE ON posts_commentmodel BEGIN '
+    'DELETE FROM posts_search WHERE rowid = old.id * 2 + 1; END',
+)
+
+_available = None
+
+
+def is_available():
+    """Есть ли в текущей БД FTS5-индекс (создаётся миграцией на SQLite)."""
+    global _available
+    if _available is None:
+        _available = (
+            connection.vendor == 'sqlite'
+            and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _available
+
+
+def ensure_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Восстанавливает триггеры синхронизации индекса.
+
+    SQLite не умеет ALTER TABLE для большинства операций, и Django
+    пересоздаёт таблицу при изменении полей — вместе с ней пропадают
+    триггеры. Поэтому они проверяются после каждого migrate.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if SEARCH_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for sql in TRIGGERS_SQL:
+            cursor.execute(sql)
+
+
+def build_match(query):
+    """Превращает пользовательский запрос в безопасное выражение MATCH.
+
+    Каждое слово берётся в кавычки и ищется по префиксу, слова
+    объединяются через AND. Операторы FTS5 из запроса не передаются.
+    """
+    terms = re.findall(r'\w+', query.lower())[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _documents(match, limit):
+    """Документы (id поста, оценка) от лучших, не больше limit.
+
+    ORDER BY rank с LIMIT прямо по FTS-таблице FTS5 выполняет без
+    группировки и полной сортировки совпадений.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT post_id, rank FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+            [match, limit]
+        )
+        return cursor.fetchall()
+
+
+def _ranked(match, limit, forward=True, after=None):
+    """Пары (id поста, оценка) по возрастанию bm25, т.е. от лучших.
+
+    Оценка поста — лучшая среди его документов, то есть оценка его
+    первого документа в выдаче. Документы читаются с запасом, запас
+    удваивается, пока после курсора (или до него для direction='prev')
+    не наберётся limit постов; глубина выдачи ограничена
+    MAX_DOCUMENTS. Пост, чья оценка равна оценке последнего
+    прочитанного документа, не окончателен: у следующих документов та
+    же оценка, и порядок среди них задаёт id поста.
+    """
+    size = limit * 3
+    while True:
+        documents = _documents(match, size)
+        exhausted = len(documents) < size or size >= MAX_DOCUMENTS
+        best = {}
+        for post_id, score in documents:
+            best.setdefault(post_id, score)
+        ranked = sorted(
+            (score, post_id) for post_id, score in best.items()
+            if exhausted or score < documents[-1][1]
+        )
+        if after is None:
+            selected = ranked[:limit]
+        elif forward:
+            selected = [key for key in ranked if key > tuple(after)][:limit]
+        else:
+            selected = [
+                key for key in ranked if key < tuple(after)
+            ][-limit:][::-1]
+        if forward or after is None:
+            done = len(selected) == limit
+        else:
+            # Все посты до курсора окончательны.
+            done = bool(ranked) and ranked[-1] >= tuple(after)
+        if exhausted or done:
+            return [(post_id, score) for score, post_id in selected]
+        size = min(size * 2, MAX_DOCUMENTS)
+
+
+class SearchPaginator:
+    """Keyset-пагинация результатов поиска по (релевантность, id поста).
+
+    Пост находится и по своему тексту, и по тексту комментариев;
+    релевантность поста — лучшая оценка bm25 среди его документов.
+    """
+
+    def __init__(self, query, per_page):
+        self.match = build_match(query)
+        self.per_page = per_page
+
+    def fetch(self, direction, values, limit):
+        if not self.match:
+            return []
+        rows = _ranked(self.match, limit, direction == 'next', values)
+        posts = Post.objects.for_feed().in_bulk(
+            [post_id for post_id, score in rows]
+        )
+        page = []
+        for post_id, score in rows:
+            if post_id in posts:
+                post = posts[post_id]
+                post.search_score = score
+                page.append(post)
+        return page
+
+    def key(self, item):
+        if isinstance(item, (list, tuple)):
+            return list(item)
+        return [item.search_score, item.pk]
+
+    def encode(self, direction, item):
+        return encode_token(direction, self.key(item))
+
+    def decode(self, token):
+        direction, (score, pk) = decode_token(token, 2)
+        if (isinstance(score, bool) or not isinstance(score, (int, float))
+                or not math.isfinite(score)):
+            raise InvalidCursor(token)
+        return direction, [float(score), check_int(pk, token)]
+
+    def get_page(self, token=None):
+        if not token:
+            return CursorPage(self)
+        try:
+            return CursorPage(self, self.decode(token))
+        except InvalidCursor:
+            raise Http404('Неверный курсор страницы.')
+
+
+def search_post_ids(query, limit):
+    """Id постов по убыванию релевантности — для админки."""
+    match = build_match(query)
+    if not match:
+        return []
+    return [post_id for post_id, score in _ranked(match, limit)]
+
+
+def rebuild(optimize=True):
+    """Полностью перестраивает индекс по таблицам постов и комментариев."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, body, post_id) '
+            f'SELECT id * 2, text, id FROM posts_post'
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, body, post_id) '
+            f'SELECT id * 2 + 1, text, post_id FROM posts_commentmodel'
+        )
+        if optimize:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) "
+                f"VALUES('optimize')"
+            )
+        cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
@@ -0,0 +1,164 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import counters, thumbnails, timelines
+from .cache import (
+    INDEX_FEED, TRENDING_FEED, author_feed, bump_on_commit, group_feed,
+    post_feeds
+)
+from .models import CommentModel, Follow, Group, Post, User
+
+
+def group_authors(group_id):
+    return list(
+        Post.objects.filter(group_id=group_id).order_by()
+        .values_list('author_id', flat=True).distinct()
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._previous_group_id = None
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    if 'group' in loaded:
+        instance._previous_group_id = loaded['group']
+        return
+    # Пост собран в памяти, а не загружен из БД.
+    instance._previous_group_id = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('group_id', flat=True).first()
+    )
+
+
+@receiver(pre_save, sender=Post)
+def prepare_timelines(sender, instance, **kwargs):
+    if instance.pk is None:
+        timelines.prepare(instance)
+
+
+@receiver(pre_save, sender=Post)
+def reset_thumbnail(sender, instance, **kwargs):
+    # Состояние пишется тем же INSERT или UPDATE, что и изображение,
+    # поэтому пост никогда не бывает в БД с чужой готовой миниатюрой.
+    # Посту без изображения миниатюра не нужна, и в очередь он не
+    # попадает.
+    if instance.image_changed() or instance._state.adding:
+        instance.thumbnail_state = Post.thumbnail_state_for(instance.image)
+
+
+@receiver(post_save, sender=Post)
+def enqueue_thumbnail(sender, instance, **kwargs):
+    if instance.image_changed() and instance.image:
+        thumbnails.enqueue(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    feeds = post_feeds(instance.author_id, instance.group_id)
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id is not None:
+        feeds.append(group_feed(previous_group_id))
+    bump_on_commit(*feeds)
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_authors(sender, instance, **kwargs):
+    # После удаления группы её посты уже без группы (SET_NULL).
+    instance._author_ids = group_authors(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, created=False, **kwargs):
+    """Название и ссылка группы выводятся и в лентах её авторов."""
+    author_ids = getattr(instance, '_author_ids', None)
+    if author_ids is None:
+        author_ids = [] if created else group_authors(instance.pk)
+    bump_on_commit(
+        INDEX_FEED, group_feed(instance.pk),
+        *(author_feed(author_id) for author_id in author_ids)
+    )
+
+
+# Поля пользователя, которые выводятся в карточках постов.
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance, created, update_fields,
+                            **kwargs):
+    """Имя автора выводится во всех лентах с его постами.
+
+    Вход на сайт сохраняет только last_login, такие сохранения ленты
+    не трогают.
+    """
+    if created or (update_fields and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    group_ids = (
+        Post.objects.filter(author_id=instance.pk, group__isnull=False)
+        .order_by().values_list('group_id', flat=True).distinct()
+    )
+    bump_on_commit(
+        INDEX_FEED, TRENDING_FEED, author_feed(instance.pk),
+        *(group_feed(group_id) for group_id in group_ids)
+    )
+
+
+@receiver(post_save, sender=CommentModel)
+@receiver(post_delete, sender=CommentModel)
+def invalidate_comment_feeds(sender, instance, **kwargs):
+    post = (
+        Post.objects.filter(pk=instance.post_id)
+        .values('author_id', 'group_id').first()
+    )
+    if post is not None:
+        bump_on_commit(*post_feeds(post['author_id'], post['group_id']))
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_posts(instance.author_id, 1)
+        counters.change_group_posts(instance.group_id, 1)
+        timelines.schedule_fan_out(instance)
+        return
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        counters.change_group_posts(previous_group_id, -1)
+        counters.change_group_posts(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_author_posts(instance.author_id, -1)
+    counters.change_group_posts(instance.group_id, -1)
+
+
+@receiver(post_save, sender=CommentModel)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=CommentModel)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_post_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def start_following(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_followers(instance.author_id, 1)
+        timelines.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def stop_following(sender, instance, **kwargs):
+    counters.change_author_followers(instance.author_id, -1)
+    timelines.remove_author(instance.user_id, instance.author_id)
+    timelines.followers_decreased(instance.author_id)
@@ -0,0 +1,155 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from ..models import CommentModel, Group, Post
+from .test_images import phone_photo
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def upload():
+    return SimpleUploadedFile(
+        'photo.jpg', phone_photo().getvalue(), 'image/jpeg'
+    )
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.author = User.objects.create_user('author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def add_posts(self, count, start=0):
+        for index in range(start, start + count):
+            author = User.objects.create_user(f'user{index}')
+            group = Group.objects.create(
+                title=f'Группа {index}', slug=f'group-{index}'
+            )
+            post = Post.objects.create(
+                author=author, group=group, text=f'Пост {index}'
+            )
+            CommentModel.objects.create(post=post, author=author, text='К')
+
+    def test_changelists_do_not_query_per_row(self):
+        urls = (
+            reverse('admin:posts_post_changelist'),
+            reverse('admin:posts_commentmodel_changelist'),
+        )
+        self.add_posts(1)
+        before = [self.queries(url) for url in urls]
+        self.add_posts(5, start=1)
+        cache.clear()
+        self.assertEqual([self.queries(url) for url in urls], before)
+
+    def test_count_is_cached(self):
+        url = reverse('admin:posts_post_changelist')
+        first = self.queries(url)
+        self.assertEqual(self.queries(url), first - 1)
+
+    def test_input_filters(self):
+        self.add_posts(2)
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url, {'author': 'user1'})
+        self.assertEqual(
+            [post.text for post in response.context['cl'].result_list],
+            ['Пост 1']
+        )
+        response = self.client.get(url, {'group': 'group'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post]
+        )
+        response = self.client.get(
+            reverse('admin:posts_commentmodel_changelist'), {'post': 'x'}
+        )
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    def test_inline_is_paginated(self):
+        for index in range(25):
+            Post.objects.create(
+                author=self.author, group=self.group, text=f'Ещё {index}'
+            )
+        url = reverse('admin:posts_group_change', args=(self.group.pk,))
+        response = self.client.get(url)
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(len(formset.forms), 20)
+        self.assertEqual(formset.next_url, '?group_posts-page=2')
+        response = self.client.get(url, {'group_posts-page': 2})
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(len(formset.forms), 6)
+        self.assertIsNone(formset.next_url)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=100)
+class AdminUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def assertNormalized(self, post):
+        self.assertEqual((post.image_width, post.image_height), (67, 100))
+        self.assertEqual(Image.open(post.image).size, (67, 100))
+
+    def test_post_admin(self):
+        response = self.client.post(reverse('admin:posts_post_add'), {
+            'text': 'Из админки',
+            'author': self.admin.pk,
+            'image': upload(),
+            'comments-TOTAL_FORMS': 0,
+            'comments-INITIAL_FORMS': 0,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertNormalized(Post.objects.get(text='Из админки'))
+
+    def test_group_inline(self):
+        group = Group.objects.create(title='Группа', slug='group')
+        url = reverse('admin:posts_group_change', args=(group.pk,))
+        response = self.client.post(url, {
+            'title': group.title,
+            'slug': group.slug,
+            'description': 'Описание',
+            'group_posts-TOTAL_FORMS': 1,
+            'group_posts-INITIAL_FORMS': 0,
+            'group_posts-0-text': 'Из инлайна',
+            'group_posts-0-author': self.admin.pk,
+            'group_posts-0-image': upload(),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertNormalized(Post.objects.get(text='Из инлайна'))
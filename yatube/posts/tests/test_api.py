@@ -0,0 +1,128 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import CommentModel, Group, Post
+from yatube.settings import POST_PAGINATOR
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы'
+        )
+        for i in range(POST_PAGINATOR + 3):
+            cls.post = Post.objects.create(
+                text=f'Пост {i}', author=cls.user, group=cls.group
+            )
+        CommentModel.objects.create(
+            text='Комментарий', post=cls.post, author=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_pagination(self):
+        url = reverse('posts:api_group_posts', args=[self.group.slug])
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['results']), POST_PAGINATOR)
+        self.assertIsNone(first['previous'])
+        self.assertEqual(first['results'][0], {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': first['results'][0]['pub_date'],
+            'updated': first['results'][0]['updated'],
+            'author': self.user.username,
+            'group': self.group.slug,
+            'image': None,
+            'comments_count': 1,
+        })
+        second = self.client.get(url, {'cursor': first['next']}).json()
+        self.assertEqual(len(second['results']), 3)
+        self.assertIsNone(second['next'])
+
+    def test_not_modified(self):
+        urls = (
+            reverse('posts:api_posts'),
+            reverse('posts:api_author_posts', args=[self.user.username]),
+            reverse('posts:api_post', args=[self.post.pk]),
+            reverse('posts:api_post_comments', args=[self.post.pk]),
+            reverse('posts:api_groups'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        url = reverse('posts:api_posts')
+        modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Last-Modified'], modified)
+        # Дата самой новой записи изменилась — ответ отдаётся заново.
+        # Last-Modified точен до секунды, поэтому дата сдвигается явно.
+        Post.objects.filter(pk=self.post.pk).update(
+            updated=F('updated') + timedelta(seconds=5)
+        )
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_only_on_content(self):
+        url = reverse('posts:api_posts')
+        etag = self.client.get(url)['ETag']
+        # Другой процесс или перезапуск: версии лент в кеше другие.
+        cache.clear()
+        self.assertEqual(self.client.get(url)['ETag'], etag)
+        other = Post.objects.create(text='Другой пост', author=self.user)
+        etag = self.client.get(url)['ETag']
+        detail = reverse('posts:api_post', args=[self.post.pk])
+        detail_etag = self.client.get(detail)['ETag']
+        cache.clear()
+        self.assertEqual(self.client.get(detail)['ETag'], detail_etag)
+        other.delete()
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_edit_changes_etag(self):
+        url = reverse('posts:api_posts')
+        etag = self.client.get(url)['ETag']
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Отредактированный пост'
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['results'][0]['text'], 'Отредактированный пост'
+        )
+
+    def test_query_count(self):
+        url = reverse('posts:api_posts')
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(context), 1)
+
+    def test_read_only(self):
+        response = self.client.post(reverse('posts:api_posts'))
+        self.assertEqual(response.status_code, 405)
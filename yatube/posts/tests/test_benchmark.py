@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .. import benchmark, counters, urls
+from ..models import CommentModel, Follow, Post, TimelineEntry
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'generate_dataset', users=20, groups=3, posts=60, comments=80,
+            follows=3, images=2, image_share=0.5, hot_posts=0.05,
+            hot_share=0.8, seed=1, batch_size=7, stdout=StringIO()
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generated_dataset(self):
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(CommentModel.objects.count(), 80)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1
+        )
+        self.assertTrue(
+            Post.objects.filter(thumbnail_state=Post.THUMBNAIL_PENDING)
+            .exclude(image='').exists()
+        )
+        hottest = Post.objects.order_by('-comments_count').first()
+        self.assertGreater(hottest.comments_count, 80 / 60)
+        # Счётчики уже пересчитаны после bulk_create.
+        self.assertEqual(counters.recount_authors(100), 0)
+        self.assertEqual(counters.recount_groups(100), 0)
+        self.assertEqual(counters.recount_posts(100), 0)
+
+    def test_benchmark_report(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        baseline = os.path.join(directory, 'baseline.json')
+        # Отписка должна действительно удалять подписку.
+        user = benchmark.targets()['user']
+        Follow.objects.get_or_create(
+            user=user, author=User.objects.exclude(pk=user.pk).first()
+        )
+        self.assertNotEqual(
+            benchmark.targets()['followed'], benchmark.targets()['stranger']
+        )
+        follows = set(Follow.objects.values_list('user', 'author'))
+        call_command(
+            'benchmark_views', runs=3, warmup=0, output=baseline,
+            stdout=StringIO(), stderr=StringIO()
+        )
+        with open(baseline) as report_file:
+            report = json.load(report_file)
+        self.assertEqual(
+            set(report['results']),
+            {pattern.name for pattern in urls.urlpatterns}
+        )
+        self.assertEqual(report['dataset']['post'], 60)
+        # Подписка и отписка мерялись в откатываемых транзакциях.
+        self.assertEqual(
+            set(Follow.objects.values_list('user', 'author')), follows
+        )
+        for name, result in report['results'].items():
+            with self.subTest(view=name):
+                self.assertIn(result['status'], (200, 302))
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['queries'], 0)
+
+        out = StringIO()
+        call_command(
+            'benchmark_views', runs=2, warmup=0, views=['index'],
+            output=os.path.join(directory, 'index.json'),
+            compare=baseline, stdout=out, stderr=StringIO()
+        )
+        self.assertIn('p95_ms', out.getvalue())
+
+
+@override_settings(THROTTLE_RATES={'comment': {'user': '2/m'}})
+class ConcurrencyBenchmarkTests(TransactionTestCase):
+    def test_writes_are_not_throttled(self):
+        author = User.objects.create_user('author')
+        Post.objects.create(author=author, text='Пост')
+        # Тестовая база в памяти блокирует таблицы целиком, без
+        # busy_timeout, поэтому пишет один поток и никто не читает.
+        result = benchmark.concurrency(0.5, readers=0, writers=1)
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['writes'], 2)
+        self.assertFalse(
+            CommentModel.objects.filter(text=benchmark.WRITE_MARKER).exists()
+        )
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import CommentModel, Post
+from yatube.settings import COMMENTS_PAGINATOR
+
+User = get_user_model()
+
+
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+        cls.comments = [
+            CommentModel.objects.create(
+                text=f'Комментарий {i}', post=cls.post, author=cls.user
+            )
+            for i in range(COMMENTS_PAGINATOR + 5)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_detail_shows_first_page(self):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(list(comments),
+                         self.comments[:COMMENTS_PAGINATOR])
+        self.assertTrue(comments.has_next())
+        self.assertContains(
+            response,
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        )
+
+    def test_fragment_and_json_pages(self):
+        url = reverse('posts:post_comments',
+                      kwargs={'post_id': self.post.pk})
+        response = self.client.get(url)
+        cursor = response.context['comments'].next_cursor
+        response = self.client.get(url, {'cursor': cursor})
+        self.assertEqual(list(response.context['comments']),
+                         self.comments[COMMENTS_PAGINATOR:])
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+
+        data = self.client.get(url, {'cursor': cursor,
+                                     'format': 'json'}).json()
+        self.assertEqual([item['id'] for item in data['comments']],
+                         [c.pk for c in self.comments[COMMENTS_PAGINATOR:]])
+        self.assertIsNone(data['next'])
+
+    def test_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 10 ** 6})
+        )
+        self.assertEqual(response.status_code, 404)
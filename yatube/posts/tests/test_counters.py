@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+
+from ..counters import author_posts_count
+from ..models import AuthorStats, CommentModel, Group, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_group',
+            description='Тестовое описание группы'
+        )
+
+    def refresh(self, obj):
+        obj.refresh_from_db()
+        return obj
+
+    def test_post_counters(self):
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        Post.objects.create(text='Без группы', author=self.user)
+        self.assertEqual(author_posts_count(self.refresh(self.user)), 2)
+        self.assertEqual(self.refresh(self.group).posts_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.refresh(self.group).posts_count, 0)
+        self.assertEqual(self.refresh(self.other_group).posts_count, 1)
+
+        post.delete()
+        self.assertEqual(author_posts_count(self.refresh(self.user)), 1)
+        self.assertEqual(self.refresh(self.other_group).posts_count, 0)
+
+    def test_group_change_reads_no_post(self):
+        Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        post = Post.objects.get()
+        post.group = self.other_group
+        with CaptureQueriesContext(connection) as context:
+            post.save()
+        self.assertFalse([
+            query['sql'] for query in context
+            if query['sql'].startswith('SELECT')
+        ])
+        # Второе сохранение того же объекта сравнивает с новой группой.
+        post.group = None
+        post.save()
+        self.assertEqual(self.refresh(self.group).posts_count, 0)
+        self.assertEqual(self.refresh(self.other_group).posts_count, 0)
+
+    def test_comment_counters(self):
+        post = Post.objects.create(text='Тестовый пост', author=self.user)
+        comment = CommentModel.objects.create(
+            text='Комментарий', post=post, author=self.user
+        )
+        CommentModel.objects.create(
+            text='Ещё комментарий', post=post, author=self.user
+        )
+        self.assertEqual(self.refresh(post).comments_count, 2)
+        comment.delete()
+        self.assertEqual(self.refresh(post).comments_count, 1)
+
+    def test_save_keeps_counters(self):
+        post = Post.objects.create(text='Тестовый пост', author=self.user)
+        stale = Post.objects.get(pk=post.pk)
+        CommentModel.objects.create(
+            text='Комментарий', post=post, author=self.user
+        )
+        stale.text = 'Отредактированный пост'
+        stale.save()
+        self.assertEqual(self.refresh(post).comments_count, 1)
+
+    def test_recount_command(self):
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        CommentModel.objects.create(
+            text='Комментарий', post=post, author=self.user
+        )
+        AuthorStats.objects.filter(author=self.user).update(posts_count=7)
+        Group.objects.filter(pk=self.group.pk).update(posts_count=0)
+        Post.objects.filter(pk=post.pk).update(comments_count=5)
+        call_command('recount_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(author_posts_count(self.refresh(self.user)), 1)
+        self.assertEqual(self.refresh(self.group).posts_count, 1)
+        self.assertEqual(self.refresh(post).comments_count, 1)
@@ -0,0 +1,76 @@
+import csv
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(EXPORT_CHUNK_SIZE=3)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы'
+        )
+        for i in range(7):
+            Post.objects.create(
+                text=f'Пост, "с кавычками"\nи переводом строки {i}',
+                author=cls.user,
+                group=cls.group if i % 2 else None
+            )
+        cls.expected = list(
+            Post.objects.filter(author=cls.user).values_list('pk', flat=True)
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_profile_csv(self):
+        url = reverse('posts:profile_export', args=[self.user.username])
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        with CaptureQueriesContext(connection) as context:
+            content = b''.join(response.streaming_content).decode()
+        # Три keyset-запроса по три поста, последний неполный.
+        self.assertEqual(len(context), 3)
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([int(row['id']) for row in rows], self.expected)
+        self.assertEqual(rows[0]['author'], self.user.username)
+        self.assertIn('"с кавычками"\nи', rows[0]['text'])
+
+    def test_group_ndjson(self):
+        url = reverse('posts:group_export', args=[self.group.slug])
+        response = self.client.get(url, {'format': 'ndjson'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), 3)
+        self.assertEqual({record['group'] for record in records},
+                         {self.group.slug})
+
+    def test_unknown_format(self):
+        url = reverse('posts:group_export', args=[self.group.slug])
+        response = self.client.get(url, {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'export_posts', '--author', self.user.username,
+            format='ndjson', stdout=out
+        )
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([record['id'] for record in records], self.expected)
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..counters import author_followers_count
+from ..models import AuthorStats, Follow, Post, TimelineEntry
+from ..timelines import fan_out
+
+User = get_user_model()
+
+
+class FollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.stranger = User.objects.create_user(username='Stranger')
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки', author=cls.author
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow(self, author):
+        self.reader_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': author.username})
+        )
+
+    def feed(self, **params):
+        response = self.reader_client.get(
+            reverse('posts:follow_index'), params
+        )
+        return response.context['page_obj']
+
+    def test_follow_and_unfollow(self):
+        self.follow(self.author)
+        self.follow(self.author)
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 1)
+        self.assertEqual(author_followers_count(self.author.pk), 1)
+        self.assertIn(self.old_post, self.feed())
+
+        self.reader_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username})
+        )
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
+        self.assertEqual(author_followers_count(self.author.pk), 0)
+        self.assertEqual(list(self.feed()), [])
+
+    def test_cannot_follow_self(self):
+        self.follow(self.reader)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_new_post_fans_out(self):
+        self.follow(self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        Post.objects.create(text='Чужой пост', author=self.stranger)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(list(self.feed()), [post, self.old_post])
+
+    def test_fan_out_batches(self):
+        followers = [
+            User.objects.create_user(username=f'follower{i}')
+            for i in range(5)
+        ]
+        for follower in followers:
+            Follow.objects.create(user=follower, author=self.stranger)
+        post = Post.objects.create(text='Пост', author=self.stranger)
+        TimelineEntry.objects.filter(post=post).delete()
+        with self.settings(FOLLOW_FANOUT_BATCH=2):
+            fan_out(post.pk, self.stranger.pk, post.pub_date)
+        self.assertEqual(TimelineEntry.objects.filter(post=post).count(), 5)
+
+    @override_settings(FOLLOW_CELEBRITY_THRESHOLD=1)
+    def test_celebrity_posts_are_pulled(self):
+        self.follow(self.author)
+        post = Post.objects.create(text='Пост знаменитости', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(list(self.feed()), [post, self.old_post])
+
+    def test_celebrity_transitions(self):
+        self.follow(self.author)
+        regular = Post.objects.create(text='Обычный пост', author=self.author)
+        with self.settings(FOLLOW_CELEBRITY_THRESHOLD=2):
+            Follow.objects.create(user=self.stranger, author=self.author)
+            # Автор стал знаменитостью: старые посты уже в лентах и не
+            # подмешиваются повторно, новые подмешиваются.
+            pulled = Post.objects.create(
+                text='Пост знаменитости', author=self.author
+            )
+            self.assertFalse(regular.pulled)
+            self.assertTrue(pulled.pulled)
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=pulled).exists()
+            )
+            self.assertEqual(
+                list(self.feed()), [pulled, regular, self.old_post]
+            )
+            with mock.patch(
+                'posts.timelines.submit_on_commit',
+                side_effect=lambda func, *args: func(*args)
+            ):
+                Follow.objects.filter(user=self.stranger).delete()
+            # Перестал быть знаменитостью: посты разосланы по лентам.
+            self.assertTrue(
+                TimelineEntry.objects.filter(
+                    user=self.reader, post=pulled
+                ).exists()
+            )
+            pulled.refresh_from_db()
+            self.assertFalse(pulled.pulled)
+            self.assertFalse(
+                AuthorStats.objects.get(author=self.author).has_pulled_posts
+            )
+            self.assertEqual(
+                list(self.feed()), [pulled, regular, self.old_post]
+            )
+
+    def test_feed_pagination(self):
+        self.follow(self.author)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(12)
+        ]
+        first_page = self.feed()
+        self.assertEqual(len(first_page), 10)
+        second_page = self.feed(cursor=first_page.next_cursor)
+        self.assertEqual(list(second_page), [posts[1], posts[0],
+                                             self.old_post])
@@ -0,0 +1,180 @@
+import shutil
+import tempfile
+import os
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+from PIL import Image
+
+from .. import counters, images
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+ORIENTATION = 0x0112
+
+
+def encode(image, fmt, **options):
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    buffer.seek(0)
+    return buffer
+
+
+def phone_photo():
+    """CMYK JPEG 300x200 с EXIF: «повернуть на 90°» и модель камеры."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    exif[0x0110] = 'Тестовая камера'
+    return encode(
+        Image.new('CMYK', (300, 200), (0, 255, 255, 0)), 'JPEG',
+        exif=exif.tobytes(), quality=100
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=100, IMAGE_QUALITY=80
+)
+class NormalizeTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_jpeg(self):
+        content, width, height = images.normalize(phone_photo(), 'ph.jpeg')
+        self.assertEqual(content.name, 'ph.jpeg')
+        # Повёрнуто по EXIF и уменьшено до 100 px по большей стороне.
+        self.assertEqual((width, height), (67, 100))
+        image = Image.open(content)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.mode, 'RGB')
+        self.assertEqual(image.size, (67, 100))
+        self.assertFalse(image.getexif())
+        self.assertNotIn('icc_profile', image.info)
+        red, green, blue = image.getpixel((30, 50))
+        self.assertGreater(red, 200)
+        self.assertLess(green, 60)
+
+    def test_png_keeps_transparency(self):
+        source = encode(Image.new('RGBA', (50, 40), (0, 0, 0, 0)), 'PNG')
+        content, width, height = images.normalize(source, 'icon.png')
+        image = Image.open(content)
+        self.assertEqual((image.format, image.mode), ('PNG', 'RGBA'))
+        self.assertEqual((width, height), (50, 40))
+
+    def test_other_formats_become_jpeg(self):
+        source = encode(Image.new('RGB', (20, 10), 'blue'), 'BMP')
+        content, width, height = images.normalize(source, 'scan.bmp')
+        self.assertEqual(content.name, 'scan.jpg')
+        self.assertEqual(Image.open(content).format, 'JPEG')
+
+    def test_invalid(self):
+        with self.assertRaises(images.InvalidImage):
+            images.normalize(BytesIO(b'not an image'), 'broken.jpg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=100)
+class ImageIngestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_upload(self):
+        self.authorized_client.post(reverse('posts:post_create'), data={
+            'text': 'Фото с телефона',
+            'image': SimpleUploadedFile(
+                'photo.jpg', phone_photo().getvalue(), 'image/jpeg'
+            ),
+        })
+        post = Post.objects.get(text='Фото с телефона')
+        self.assertEqual(post.image.name, 'posts/photo.jpg')
+        self.assertEqual((post.image_width, post.image_height), (67, 100))
+        self.assertEqual(Image.open(post.image).size, (67, 100))
+
+    def test_backfill(self):
+        name = default_storage.save(
+            'posts/old.jpg', ContentFile(phone_photo().getvalue())
+        )
+        post = Post.objects.create(
+            text='Старый пост', author=self.user, image=name
+        )
+        out = StringIO()
+        call_command('normalize_images', workers=1, stdout=out)
+        self.assertIn('Обработано изображений: 1, ошибок: 0', out.getvalue())
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, name)
+        self.assertEqual((post.image_width, post.image_height), (67, 100))
+        self.assertEqual(post.thumbnail_state, Post.THUMBNAIL_PENDING)
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(images.unprocessed(10), [])
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, SQLITE_WRITE_RETRIES=1, SQLITE_RETRY_DELAY=0
+)
+class UploadRetryTests(TransactionTestCase):
+    """Повтор записи при занятой базе не плодит файлы в хранилище."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='TestUser')
+        self.client.force_login(self.user)
+        self.change_author_posts = counters.change_author_posts
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def stored(self):
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'posts')
+        return os.listdir(directory) if os.path.isdir(directory) else []
+
+    def upload(self, errors):
+        calls = []
+
+        def locked(*args):
+            calls.append(args)
+            if len(calls) <= errors:
+                raise OperationalError('database is locked')
+            return self.change_author_posts(*args)
+
+        with mock.patch('posts.counters.change_author_posts', locked):
+            return self.client.post(reverse('posts:post_create'), data={
+                'text': 'Фото с телефона',
+                'image': SimpleUploadedFile(
+                    'photo.jpg', phone_photo().getvalue(), 'image/jpeg'
+                ),
+            })
+
+    def test_retry_keeps_one_file(self):
+        self.upload(errors=1)
+        post = Post.objects.get()
+        self.assertEqual(self.stored(), ['photo.jpg'])
+        self.assertEqual(post.image.name, 'posts/photo.jpg')
+        self.assertEqual(self.user.post_stats.posts_count, 1)
+
+    def test_failed_save_removes_file(self):
+        with self.assertRaises(OperationalError):
+            self.upload(errors=2)
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(self.stored(), [])
@@ -0,0 +1,142 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .. import importer
+from ..counters import author_posts_count
+from ..models import CommentModel, Group, ImportSource, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+RECORDS = [
+    {'id': 1, 'author': 'TestUser', 'group': 'test_group',
+     'text': 'Первый импортированный пост', 'date': '2020-01-02T10:00:00',
+     'image': 'photo.png'},
+    {'type': 'comment', 'post': 1, 'author': 'Reader',
+     'text': 'Комментарий к первому', 'date': '2020-01-03T10:00:00'},
+    {'id': 2, 'author': 'Nobody', 'text': 'Автора нет'},
+    {'id': 3, 'author': 'TestUser', 'text': 'Третий пост'},
+    {'type': 'comment', 'post': 99, 'author': 'Reader', 'text': 'Мимо'},
+    {'type': 'comment', 'post': 3, 'author': 'Reader', 'text': 'К третьему'},
+    {'id': 1, 'author': 'TestUser', 'text': 'Повтор первого'},
+]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        Image.new('RGB', (40, 30), 'red').save(
+            os.path.join(self.directory, 'photo.png')
+        )
+
+    def write_jsonl(self, records, name='posts.jsonl'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as output:
+            for record in records:
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return path
+
+    def import_file(self, path, **options):
+        options.setdefault('batch_size', 2)
+        call_command(
+            'import_posts', path, images=self.directory, stdout=StringIO(),
+            **options
+        )
+
+    def test_import(self):
+        path = self.write_jsonl(RECORDS)
+        with self.assertLogs('posts.importer', 'WARNING') as logs:
+            self.import_file(path)
+        self.assertEqual(len(logs.records), 2)
+
+        first = Post.objects.get(text='Первый импортированный пост')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertTrue(first.image.name.startswith('posts/photo'))
+        self.assertEqual(first.thumbnail_state, Post.THUMBNAIL_PENDING)
+        self.assertEqual(first.comments_count, 1)
+        self.assertEqual(
+            first.comments.get().created.isoformat(),
+            '2020-01-03T10:00:00+00:00'
+        )
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(CommentModel.objects.count(), 2)
+        self.assertEqual(author_posts_count(
+            User.objects.get(pk=self.user.pk)
+        ), 2)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 1)
+        self.assertEqual(
+            ImportSource.objects.get(name='posts.jsonl').position,
+            len(RECORDS)
+        )
+
+    def test_resume_after_failure(self):
+        path = self.write_jsonl(RECORDS)
+        original = importer.Importer.import_batch
+        calls = []
+
+        def failing(loader, batch, pool):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise RuntimeError('обрыв')
+            return original(loader, batch, pool)
+
+        with mock.patch.object(importer.Importer, 'import_batch', failing):
+            with self.assertRaises(RuntimeError):
+                self.import_file(path)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(
+            ImportSource.objects.get(name='posts.jsonl').position, 2
+        )
+
+        with self.assertLogs('posts.importer', 'WARNING'):
+            self.import_file(path)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(CommentModel.objects.count(), 2)
+
+    def test_csv(self):
+        path = os.path.join(self.directory, 'posts.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as output:
+            writer = csv.DictWriter(
+                output, ['type', 'id', 'post', 'author', 'group', 'text']
+            )
+            writer.writeheader()
+            writer.writerow({'type': 'post', 'id': 'a', 'author': 'New',
+                             'group': 'new_group', 'text': 'Из CSV'})
+            writer.writerow({'type': 'comment', 'post': 'a',
+                             'author': 'New', 'text': 'Ответ'})
+        self.import_file(path, create_missing=True)
+        post = Post.objects.get(text='Из CSV')
+        self.assertEqual(post.author.username, 'New')
+        self.assertEqual(post.group.slug, 'new_group')
+        self.assertEqual(post.comments.get().text, 'Ответ')
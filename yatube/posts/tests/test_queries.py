@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .. import benchmark, urls
+from ..models import CommentModel, Follow, Group, Post
+from yatube.settings import POST_PAGINATOR
+
+User = get_user_model()
+
+# Допустимое число SQL-запросов на одну страницу для авторизованного
+# пользователя (два запроса из них — сессия и пользователь). Бюджет
+# нужен каждому view из posts/urls.py.
+QUERY_BUDGETS = {
+    'posts:index': 3,
+    'posts:group_list': 4,
+    'posts:group_export': 2,
+    'posts:profile': 5,
+    'posts:profile_export': 2,
+    'posts:search': 5,
+    'posts:trending': 3,
+    'posts:follow_index': 5,
+    'posts:profile_follow': 12,
+    'posts:profile_unfollow': 8,
+    'posts:post_detail': 4,
+    'posts:post_create': 3,
+    'posts:post_comments': 2,
+    'posts:post_edit': 4,
+    'posts:add_comment': 3,
+    'posts:api_posts': 1,
+    'posts:api_post': 1,
+    'posts:api_post_comments': 2,
+    'posts:api_groups': 1,
+    'posts:api_group_posts': 2,
+    'posts:api_author_posts': 2,
+}
+
+
+class QueryBudgetMixin:
+    def assertQueryBudget(self, budget, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = benchmark.fetch(client, url)
+        queries = '\n'.join(query['sql'] for query in context)
+        self.assertLessEqual(
+            len(context), budget,
+            f'{url}: {len(context)} запросов при бюджете {budget}\n'
+            f'{queries}'
+        )
+        return response
+
+
+class PostQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы'
+        )
+        for i in range(POST_PAGINATOR + 2):
+            author = User.objects.create_user(
+                username=f'author{i}', first_name=f'Автор {i}'
+            )
+            Follow.objects.create(user=cls.user, author=author)
+            group = Group.objects.create(
+                title=f'Группа {i}',
+                slug=f'group{i}',
+                description='Тестовое описание группы'
+            )
+            Post.objects.create(text=f'Пост {i}', author=author, group=group)
+        for i in range(POST_PAGINATOR + 2):
+            cls.post = Post.objects.create(
+                text=f'Пост группы {i}', author=cls.user, group=cls.group
+            )
+        for i in range(POST_PAGINATOR):
+            commentator = User.objects.create_user(username=f'reader{i}')
+            CommentModel.objects.create(
+                post=cls.post, author=commentator, text=f'Комментарий {i}'
+            )
+        stranger = User.objects.create_user(username='Stranger')
+        cls.urls = {
+            f'{urls.app_name}:{name}': url
+            for name, url in benchmark.view_urls({
+                'post_id': cls.post.pk,
+                'username': cls.user.username,
+                'slug': cls.group.slug,
+                'stranger': stranger.username,
+                'followed': stranger.username,
+                'query': 'Пост',
+            }).items()
+        }
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_every_view_has_budget(self):
+        names = {
+            f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns
+        }
+        self.assertEqual(names - set(QUERY_BUDGETS), set())
+        self.assertEqual(set(self.urls), names)
+
+    def test_views_fit_query_budget(self):
+        for name, url in self.urls.items():
+            with self.subTest(view=name):
+                self.assertQueryBudget(
+                    QUERY_BUDGETS[name], self.authorized_client, url
+                )
+
+    def test_next_page_fits_query_budget(self):
+        for name in ('posts:index', 'posts:group_list', 'posts:profile'):
+            with self.subTest(view=name):
+                response = self.authorized_client.get(self.urls[name])
+                cursor = response.context['page_obj'].next_cursor
+                self.assertQueryBudget(
+                    QUERY_BUDGETS[name],
+                    self.authorized_client,
+                    f'{self.urls[name]}?cursor={cursor}'
+                )
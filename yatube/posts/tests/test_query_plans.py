@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import timelines
+from ..models import CommentModel, Follow, Group, Post, TrendingScore
+from yatube.settings import COMMENTS_PAGINATOR, POST_PAGINATOR
+
+User = get_user_model()
+
+# Сортировка во временном B-дереве означает, что порядок ленты не
+# берётся из индекса; SCAN без USING — полный просмотр таблицы.
+FORBIDDEN_PLAN = 'USE TEMP B-TREE'
+
+
+def plan_problems(sql):
+    """Строки EXPLAIN QUERY PLAN, указывающие на чтение мимо индекса."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        details = [row[-1] for row in cursor.fetchall()]
+    return [
+        detail for detail in details
+        if FORBIDDEN_PLAN in detail
+        or (detail.startswith('SCAN') and 'USING' not in detail)
+    ]
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for i in range(POST_PAGINATOR * 2):
+            cls.post = Post.objects.create(
+                text=f'Пост {i}', author=cls.user, group=cls.group
+            )
+            TrendingScore.objects.create(post=cls.post, score=i % 3)
+        for i in range(COMMENTS_PAGINATOR + 1):
+            CommentModel.objects.create(
+                text=f'Комментарий {i}', post=cls.post, author=cls.reader
+            )
+        cls.feeds = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+            reverse('posts:follow_index'),
+            reverse('posts:trending'),
+            reverse('posts:post_comments', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def captured(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return context.captured_queries, response
+
+    def assertIndexedPlans(self, url):
+        queries, response = self.captured(url)
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            # CaptureQueriesContext хранит SQL с подставленными
+            # параметрами, его можно передать в EXPLAIN как есть.
+            self.assertEqual(plan_problems(sql), [], f'{url}\n{sql}')
+        return response
+
+    def test_first_pages(self):
+        urls = self.feeds + (
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:api_posts'),
+            reverse('posts:api_group_posts', args=[self.group.slug]),
+            reverse('posts:api_author_posts', args=[self.user.username]),
+            reverse('posts:api_post_comments', args=[self.post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIndexedPlans(url)
+
+    def test_next_pages(self):
+        for url in self.feeds:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                page = response.context.get('page_obj')
+                if page is None:
+                    page = response.context['comments']
+                self.assertIndexedPlans(f'{url}?cursor={page.next_cursor}')
+
+    def test_pulled_posts(self):
+        # Посты знаменитостей подмешиваются в ленту подписок отдельным
+        # запросом; подписка на двух таких авторов.
+        for author in (self.user, User.objects.create_user('Star')):
+            posts = [
+                Post.objects.create(text=f'Пост {i}', author=author)
+                for i in range(POST_PAGINATOR + 1)
+            ]
+            timelines.mark_pulled(author.pk, [post.pk for post in posts])
+            Follow.objects.get_or_create(user=self.reader, author=author)
+        url = reverse('posts:follow_index')
+        response = self.assertIndexedPlans(url)
+        page = response.context['page_obj']
+        self.assertIndexedPlans(f'{url}?cursor={page.next_cursor}')
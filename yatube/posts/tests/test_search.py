@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+from io import StringIO
+
+from ..models import CommentModel, Post
+from ..search import SEARCH_TABLE, build_match, search_post_ids
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.first_post = Post.objects.create(
+            text='Рецепт борща со сметаной', author=cls.user
+        )
+        cls.second_post = Post.objects.create(
+            text='Заметки о путешествии', author=cls.user
+        )
+        CommentModel.objects.create(
+            text='А я варю борщ без сметаны',
+            post=cls.second_post,
+            author=cls.user
+        )
+        cls.url = reverse('posts:search')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_build_match(self):
+        self.assertEqual(build_match('Борщ, "OR" сметана*'),
+                         '"борщ"* "or"* "сметана"*')
+        self.assertEqual(build_match('  ,.;  '), '')
+
+    def test_search_posts_and_comments(self):
+        response = self.client.get(self.url, {'q': 'борщ'})
+        found = list(response.context['page_obj'])
+        self.assertEqual(set(found), {self.first_post, self.second_post})
+        response = self.client.get(self.url, {'q': 'путешествие'})
+        self.assertEqual(list(response.context['page_obj']), [])
+
+    def test_index_follows_writes(self):
+        post = Post.objects.create(text='Первая версия', author=self.user)
+        self.assertEqual(search_post_ids('версия', 10), [post.pk])
+        Post.objects.filter(pk=post.pk).update(text='Новый текст')
+        self.assertEqual(search_post_ids('версия', 10), [])
+        self.assertEqual(search_post_ids('текст', 10), [post.pk])
+        post.delete()
+        self.assertEqual(search_post_ids('текст', 10), [])
+
+    def test_search_pagination(self):
+        posts = [
+            Post.objects.create(text=f'Кактус номер {i}', author=self.user)
+            for i in range(12)
+        ]
+        response = self.client.get(self.url, {'q': 'кактус'})
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        response = self.client.get(
+            self.url, {'q': 'кактус', 'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 2)
+        self.assertEqual(
+            {post.pk for post in list(first_page) + list(second_page)},
+            {post.pk for post in posts}
+        )
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        self.assertEqual(search_post_ids('борщ', 10), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search_post_ids('борщ', 10)), 2)
+
+    def test_pages_list_each_post_once(self):
+        posts = [
+            Post.objects.create(text=f'Ёжик номер {i}', author=self.user)
+            for i in range(12)
+        ]
+        # Документов у поста больше, чем постов на странице.
+        for i in range(30):
+            CommentModel.objects.create(
+                text=f'ёжик ёжик {i}', post=posts[0], author=self.user
+            )
+        pages, cursor = [], None
+        while True:
+            params = {'q': 'ёжик'}
+            if cursor:
+                params['cursor'] = cursor
+            page = self.client.get(self.url, params).context['page_obj']
+            pages.append([post.pk for post in page])
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        found = [pk for page in pages for pk in page]
+        self.assertEqual(sorted(found), sorted(post.pk for post in posts))
+        self.assertEqual(found, search_post_ids('ёжик', 20))
+        response = self.client.get(
+            self.url, {'q': 'ёжик', 'cursor': page.previous_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']], pages[0]
+        )
+
+    def test_admin_search_keeps_rank(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'password')
+        for text in ('борщ', 'борщ и ещё много других слов про обед'):
+            Post.objects.create(text=text, author=self.user)
+        expected = search_post_ids('борщ', 10)
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'борщ'}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['cl'].result_list],
+            expected
+        )
@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name='photo.png'):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), 'red').save(buffer, format='PNG')
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type='image/png'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self):
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': make_image()}
+        )
+        return Post.objects.latest('pk')
+
+    def test_create_enqueues_thumbnail(self):
+        post = self.create_post()
+        self.assertEqual(post.thumbnail_state, Post.THUMBNAIL_PENDING)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, post.image.url)
+        text_post = Post.objects.create(text='Без картинки', author=self.user)
+        self.assertNotEqual(
+            text_post.thumbnail_state, Post.THUMBNAIL_PENDING
+        )
+        self.assertEqual(
+            thumbnails.pending(10), [(post.pk, post.image.name)]
+        )
+
+    def test_new_image_resets_thumbnail(self):
+        post = self.create_post()
+        thumbnails.complete({(post.pk, post.image.name): True})
+        post = Post.objects.get(pk=post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail_ready)
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            data={'text': 'Новая картинка', 'image': make_image('new.png')}
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_state, Post.THUMBNAIL_PENDING)
+        self.assertEqual(
+            thumbnails.pending(10), [(post.pk, post.image.name)]
+        )
+
+    def test_stale_copy_keeps_ready_state(self):
+        post = self.create_post()
+        stale = Post.objects.get(pk=post.pk)
+        # Пока пост редактировали, миниатюра достроилась.
+        thumbnails.complete({(post.pk, post.image.name): True})
+        stale.text = 'Правка без новой картинки'
+        stale.save()
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail_ready)
+        self.assertEqual(post.text, 'Правка без новой картинки')
+
+    @override_settings(THUMBNAIL_QUEUE='thread')
+    def test_thread_queue(self):
+        with mock.patch('posts.thumbnails.submit_on_commit') as submit:
+            post = self.create_post()
+            post.text = 'Без новой картинки'
+            post.save()
+        submit.assert_called_once_with(
+            thumbnails._render_in_background, post.pk, post.image.name
+        )
+
+    def test_complete_marks_ready(self):
+        post = self.create_post()
+        thumbnails.complete({(post.pk, post.image.name): True})
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail_ready)
+
+    def test_complete_ignores_replaced_image(self):
+        post = self.create_post()
+        thumbnails.complete({(post.pk, 'posts/old.png'): True})
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_state, Post.THUMBNAIL_PENDING)
+
+    def test_render_creates_thumbnail(self):
+        post = self.create_post()
+        self.assertTrue(thumbnails.render(post.image.name))
+        self.assertEqual(
+            thumbnails.pending(10), [(post.pk, post.image.name)]
+        )
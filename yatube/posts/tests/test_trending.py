@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from yatube.settings import POST_PAGINATOR
+from ..models import CommentModel, Post, TrendingScore, TrendingState
+
+User = get_user_model()
+
+
+@override_settings(TRENDING_HALF_LIFE=3600)
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {index}')
+            for index in range(POST_PAGINATOR + 1)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, hours_ago=0):
+        comment = CommentModel.objects.create(
+            post=post, author=self.user, text='Текст'
+        )
+        CommentModel.objects.filter(pk=comment.pk).update(
+            created=timezone.now() - timedelta(hours=hours_ago)
+        )
+
+    def ranking(self):
+        return list(
+            TrendingScore.objects.order_by('-score', '-post_id')
+            .values_list('post_id', flat=True)
+        )
+
+    def test_recent_comments_outweigh_old(self):
+        first, second, third = self.posts[:3]
+        self.comment(first, hours_ago=3)
+        self.comment(first, hours_ago=3)
+        self.comment(first, hours_ago=3)
+        self.comment(second)
+        self.comment(second)
+        trending.update()
+        # Три комментария трёхчасовой давности весят 3/8 свежего.
+        self.assertEqual(self.ranking(), [second.pk, first.pk])
+        self.assertEqual(trending.update()['comments'], 0)
+        self.comment(third)
+        self.comment(third)
+        self.comment(third)
+        report = trending.update(batch_size=2)
+        self.assertEqual(report['comments'], 3)
+        self.assertEqual(self.ranking(), [third.pk, second.pk, first.pk])
+
+    def test_rebase_keeps_order(self):
+        self.comment(self.posts[0])
+        self.comment(self.posts[1])
+        self.comment(self.posts[1])
+        trending.update()
+        # Как если бы эпоха была на 200 периодов полураспада раньше.
+        state = TrendingState.objects.get()
+        TrendingState.objects.update(epoch=state.epoch - timedelta(hours=200))
+        TrendingScore.objects.update(score=F('score') * 2.0 ** 200)
+        self.assertTrue(trending.update()['rebased'])
+        self.assertEqual(self.ranking(), [self.posts[1].pk, self.posts[0].pk])
+        self.assertAlmostEqual(
+            TrendingScore.objects.get(post=self.posts[1]).score, 2, places=3
+        )
+
+    @override_settings(TRENDING_WINDOW=24 * 3600)
+    def test_prune(self):
+        self.comment(self.posts[0], hours_ago=48)
+        self.comment(self.posts[1])
+        self.assertEqual(trending.update()['pruned'], 1)
+        self.assertEqual(self.ranking(), [self.posts[1].pk])
+
+    def test_view(self):
+        for index, post in enumerate(self.posts):
+            for _ in range(index + 1):
+                self.comment(post)
+        url = reverse('posts:trending')
+        trending.update()
+        page = self.client.get(url).context['page_obj']
+        self.assertEqual([entry.post for entry in page], self.posts[:0:-1])
+        page = self.client.get(
+            url, {'cursor': page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual([entry.post for entry in page], self.posts[:1])
+        # Новый расчёт меняет версию ленты и сбрасывает кеш страниц.
+        self.assertNotContains(self.client.get(url), 'Пост 0<')
+        for _ in range(POST_PAGINATOR + 1):
+            self.comment(self.posts[0])
+        trending.update()
+        response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'][0].post, self.posts[0])
+        self.assertContains(response, 'Пост 0<')
@@ -5,12 +5,20 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import transaction
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
 from django.urls import reverse
 from django import forms
 from time import sleep
+from unittest import mock
 
+from ..cache import (
+    INDEX_FEED, author_feed, bump_feed_version, get_feed_version
+)
 from ..models import CommentModel, Group, Post
+from ..paginators import encode_token
 from yatube.settings import POST_PAGINATOR
 
 User = get_user_model()
@@ -81,6 +89,14 @@ class PostPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
+        # TestCase не коммитит транзакции, и on_commit не срабатывает:
+        # здесь версии лент сбрасываются сразу.
+        patcher = mock.patch(
+            'posts.signals.bump_on_commit', bump_feed_version
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -112,6 +128,66 @@ class PostPagesTests(TestCase):
         response = self.authorized_client.get(page + '?page=2')
         self.assertEqual(len(response.context['page_obj']), 4)
 
+    def test_cursor_pagination(self):
+        for page in list(self.templates_pages.keys())[:3]:
+            with self.subTest(page=page):
+                response = self.authorized_client.get(page)
+                first_page = response.context['page_obj']
+                self.assertEqual(len(first_page), POST_PAGINATOR)
+                self.assertFalse(first_page.has_previous())
+
+                response = self.authorized_client.get(
+                    f'{page}?cursor={first_page.next_cursor}'
+                )
+                second_page = response.context['page_obj']
+                self.assertEqual(len(second_page), 4)
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(second_page[0].pk, self.new_posts[4].pk)
+
+                response = self.authorized_client.get(
+                    f'{page}?cursor={second_page.previous_cursor}'
+                )
+                self.assertEqual(list(response.context['page_obj']),
+                                 list(first_page))
+
+    def test_invalid_cursor(self):
+        tokens = [
+            'broken',
+            encode_token('next', [{}, 1]),
+            encode_token('next', [1.5, '1']),
+            encode_token('next', ['2020-01-01T00:00:00', 10 ** 23]),
+            encode_token('next', ['2020-01-01T00:00:00', str(10 ** 23)]),
+            encode_token('next', ['2020-01-01T00:00:00']),
+            encode_token('sideways', ['2020-01-01T00:00:00', '1']),
+            encode_token('next', [None, None]),
+            encode_token('next', [[1], 1]),
+            'WyJuZXh0Il0',
+            'eyJhIjogMSwgImIiOiAyfQ',
+        ]
+        post = self.new_posts[14]
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.new_group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_comments', args=[post.pk]),
+            reverse('posts:follow_index'),
+            reverse('posts:trending'),
+            reverse('posts:search') + '?q=пост&',
+            reverse('posts:api_posts'),
+            reverse('posts:api_groups'),
+            reverse('posts:api_post_comments', args=[post.pk]),
+            reverse('posts:api_group_posts', args=[self.new_group.slug]),
+            reverse('posts:api_author_posts', args=[self.user.username]),
+        ]
+        for url in urls:
+            separator = '' if url.endswith('&') else '?'
+            for token in tokens:
+                with self.subTest(url=url, token=token):
+                    response = self.authorized_client.get(
+                        f'{url}{separator}cursor={token}'
+                    )
+                    self.assertEqual(response.status_code, 404)
+
     def test_homepage(self):
         page = list(self.templates_pages.keys())[0]
         self.paginator_page1_test(page)
@@ -121,15 +197,80 @@ class PostPagesTests(TestCase):
         page = list(self.templates_pages.keys())[0]
         response = self.authorized_client.get(page)
         content_before = response.content
+        Post.objects.filter(pk=self.new_posts[14].pk).update(
+            text='Изменено в обход сигналов'
+        )
+        response = self.authorized_client.get(page)
+        self.assertEqual(content_before, response.content)
         post = Post.objects.latest('pub_date')
         post.delete()
         response = self.authorized_client.get(page)
-        content_now = response.content
-        self.assertEqual(content_before, content_now)
-        sleep(21)
+        self.assertNotEqual(content_before, response.content)
+
+    def test_cache_invalidation(self):
+        pages = list(self.templates_pages.keys())[:3]
+        for page in pages:
+            self.authorized_client.get(page)
+        post = Post.objects.get(pk=self.new_posts[14].pk)
+        post.text = 'Отредактированный пост'
+        post.save()
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.authorized_client.get(page)
+                self.assertContains(response, 'Отредактированный пост')
+        response = self.authorized_client.get(pages[0])
+        version_before = response.context['feed_version']
+        CommentModel.objects.create(text='random', post=post,
+                                    author=self.user)
+        response = self.authorized_client.get(pages[0])
+        self.assertGreater(response.context['feed_version'], version_before)
+
+    def test_post_card_cache(self):
+        page = list(self.templates_pages.keys())[0]
+        self.authorized_client.get(page)
+        Post.objects.filter(pk=self.new_posts[13].pk).update(
+            text='Изменено в обход сигналов'
+        )
+        post = Post.objects.get(pk=self.new_posts[14].pk)
+        post.text = 'Отредактированный пост'
+        post.save()
+        # Правка сбросила кеш страницы, но из карточек перерисована
+        # только карточка изменённого поста.
         response = self.authorized_client.get(page)
-        content_now = response.content
-        self.assertNotEqual(content_before, content_now)
+        self.assertContains(response, 'Отредактированный пост')
+        self.assertContains(response, 'Тестовый пост 13')
+        self.assertNotContains(response, 'Изменено в обход сигналов')
+
+    def test_post_card_follows_group_slug(self):
+        page = reverse('posts:index')
+        self.authorized_client.get(page)
+        group = Group.objects.get(pk=self.new_group.pk)
+        group.slug = 'renamed_group'
+        group.save()
+        # Поля поста не менялись, но ссылка на группу в карточке новая.
+        response = self.authorized_client.get(page)
+        self.assertContains(
+            response, reverse('posts:group_list', args=['renamed_group'])
+        )
+
+    def test_post_card_follows_author_name(self):
+        page = reverse('posts:index')
+        self.authorized_client.get(page)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name, user.last_name = 'Новое', 'Имя'
+        user.save()
+        self.assertContains(self.authorized_client.get(page), 'Новое Имя')
+
+    def test_group_delete_resets_author_feeds(self):
+        page = reverse('posts:profile', args=[self.user.username])
+        link = reverse('posts:group_list', args=['test_group'])
+        self.assertContains(self.authorized_client.get(page), link)
+        feed = author_feed(self.user.pk)
+        version = get_feed_version(feed)
+        Group.objects.get(pk=self.new_group.pk).delete()
+        self.assertGreater(get_feed_version(feed), version)
+        response = self.authorized_client.get(page)
+        self.assertNotContains(response, link)
 
     def test_group_posts(self):
         page = list(self.templates_pages.keys())[1]
@@ -241,3 +382,28 @@ class PostPagesTests(TestCase):
             new_comment in response.context.get('post').comments.all()
         )
 
+
+
+class FeedVersionCommitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Author')
+
+    def test_bumped_after_commit(self):
+        version = get_feed_version(INDEX_FEED)
+        with transaction.atomic():
+            Post.objects.create(text='Пост', author=self.user)
+            # До коммита читатели видят старые строки, и кешировать
+            # их под новой версией нельзя.
+            self.assertEqual(get_feed_version(INDEX_FEED), version)
+        self.assertGreater(get_feed_version(INDEX_FEED), version)
+
+    def test_author_rename(self):
+        feed = author_feed(self.user.pk)
+        version = get_feed_version(feed)
+        self.user.last_login = self.user.date_joined
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(get_feed_version(feed), version)
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        self.assertGreater(get_feed_version(feed), version)
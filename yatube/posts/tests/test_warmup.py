@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import thumbnails, warmup
+from ..models import Group, Post
+from .test_thumbnails import make_image
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+# Общий для процессов кеш, с которым работает команда warmup.
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(TEMP_MEDIA_ROOT, 'shared_cache'),
+    }
+}
+
+
+# Пул потоков ходит в БД своими соединениями, поэтому данные должны быть
+# закоммичены: TestCase держал бы их в незавершённой транзакции.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class WarmupTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.writer = User.objects.create_user(username='Writer')
+        self.reader = User.objects.create_user(username='Reader')
+        User.objects.create_user(username='Silent')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test_group', description='Описание'
+        )
+        for i in range(24):
+            Post.objects.create(
+                text=f'Пост {i}', author=self.writer,
+                group=self.group if i % 2 else None
+            )
+        self.post = Post.objects.create(
+            text='Пост с картинкой', author=self.reader, image=make_image()
+        )
+        thumbnails.complete({(self.post.pk, self.post.image.name): True})
+
+    def test_plan(self):
+        top_groups, top_authors = warmup.targets(10, 10)
+        self.assertEqual(top_groups, [(self.group.pk, self.group.slug)])
+        self.assertEqual(
+            top_authors,
+            [(self.writer.pk, 'Writer'), (self.reader.pk, 'Reader')]
+        )
+        urls = warmup.plan(5, top_groups, top_authors)
+        # 25 постов — три страницы главной, хотя просили пять.
+        index = reverse('posts:index')
+        self.assertEqual(urls[0], index)
+        self.assertTrue(urls[1].startswith(index + '?cursor='))
+        self.assertTrue(urls[2].startswith(index + '?cursor='))
+        self.assertEqual(urls[3:], [
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=['Writer']),
+            reverse('posts:profile', args=['Reader']),
+        ])
+        self.assertEqual(
+            warmup.images(1, top_groups, top_authors), [self.post.image.name]
+        )
+
+    def test_request_host(self):
+        cases = (
+            (['*', '.example.com', 'www.example.com'], 'example.com'),
+            (['www.example.com'], 'www.example.com'),
+            (['*'], 'localhost'),
+            ([], 'localhost'),
+        )
+        for hosts, host in cases:
+            with self.subTest(hosts=hosts):
+                with self.settings(ALLOWED_HOSTS=hosts):
+                    self.assertEqual(warmup.request_host(), host)
+
+    @override_settings(ALLOWED_HOSTS=['.example.com'])
+    def test_pages_use_allowed_host(self):
+        report = warmup.run(pages=1, groups=1, profiles=1, workers=2)
+        self.assertTrue(report['pages'])
+        self.assertEqual(warmup.failures(report), [])
+
+    def test_command_requires_shared_cache(self):
+        self.assertFalse(warmup.shared_cache())
+        with self.assertRaisesMessage(CommandError, 'WARMUP_ON_START'):
+            call_command('warmup', stdout=StringIO())
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_command(self):
+        self.assertTrue(warmup.shared_cache())
+        out = StringIO()
+        call_command('warmup', pages=2, workers=2, verbosity=2, stdout=out)
+        output = out.getvalue()
+        self.assertIn('Прогрето страниц: 5, миниатюр: 1', output)
+        self.assertIn(reverse('posts:profile', args=['Reader']), output)
+        self.assertNotIn(reverse('posts:profile', args=['Silent']), output)
+        cache_dir = os.path.join(TEMP_MEDIA_ROOT, 'cache')
+        self.assertTrue(any(files for _, _, files in os.walk(cache_dir)))
@@ -0,0 +1,87 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from sorl.thumbnail import get_thumbnail
+
+from .background import submit_on_commit
+from .cache import bump_feed_version, post_feeds
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+# Должны совпадать с параметрами тега {% thumbnail %} в
+# posts/includes/post_image.html, иначе sorl построит другой ключ.
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def render(image_name):
+    """Генерирует миниатюру; выполняется в процессе-воркере."""
+    try:
+        get_thumbnail(image_name, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', image_name)
+        return False
+    return True
+
+
+def complete(done):
+    """Сохраняет результаты генерации: {(pk, имя файла): успех}."""
+    feeds = []
+    for (pk, image_name), success in done.items():
+        state = Post.THUMBNAIL_READY if success else Post.THUMBNAIL_FAILED
+        # Условие на имя файла не даёт пометить готовой миниатюру, если
+        # пока шла генерация, к посту загрузили другое изображение.
+        updated = Post.objects.filter(
+            pk=pk, image=image_name, thumbnail_state=Post.THUMBNAIL_PENDING
+        ).update(thumbnail_state=state)
+        if updated and success:
+            post = Post.objects.values('author_id', 'group_id').get(pk=pk)
+            feeds += post_feeds(post['author_id'], post['group_id'])
+    if feeds:
+        bump_feed_version(*feeds)
+
+
+def _render_in_background(pk, image_name):
+    complete({(pk, image_name): render(image_name)})
+
+
+def enqueue(post):
+    """Ставит генерацию миниатюры поста в очередь.
+
+    Очередь — это посты в состоянии THUMBNAIL_PENDING; его выставляет
+    при смене изображения сигнал pre_save, а разбирает очередь команда
+    generate_thumbnails. В режиме THUMBNAIL_QUEUE = 'thread' миниатюра
+    строится в пуле потоков текущего процесса после коммита.
+    """
+    if post.image and settings.THUMBNAIL_QUEUE == 'thread':
+        submit_on_commit(_render_in_background, post.pk, post.image.name)
+
+
+def pending(batch_size, after=0):
+    return list(
+        Post.objects.filter(
+            thumbnail_state=Post.THUMBNAIL_PENDING, pk__gt=after
+        ).exclude(image='').order_by('pk')
+        .values_list('pk', 'image')[:batch_size]
+    )
+
+
+def process_pending(batch_size, workers):
+    """Обрабатывает очередь пулом процессов, возвращает число постов."""
+    processed = 0
+    batch = pending(batch_size)
+    if not batch:
+        return processed
+    # Дочерние процессы не должны наследовать открытые соединения с БД.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while batch:
+            results = pool.map(render, [name for pk, name in batch])
+            complete(dict(zip(batch, results)))
+            processed += len(batch)
+            batch = pending(batch_size, after=batch[-1][0])
+    return processed
@@ -0,0 +1,193 @@
+import heapq
+
+from django.conf import settings
+from django.db import transaction
+
+from .background import submit_on_commit
+from .counters import author_followers_count
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginators import CursorPaginator
+
+
+def is_celebrity(followers_count):
+    return followers_count >= settings.FOLLOW_CELEBRITY_THRESHOLD
+
+
+def fan_out(post_id, author_id, pub_date):
+    """Раскладывает пост по лентам подписчиков автора пакетами."""
+    batch_size = settings.FOLLOW_FANOUT_BATCH
+    followers = Follow.objects.filter(author_id=author_id).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(
+            followers.filter(pk__gt=last_pk)
+            .values_list('pk', 'user_id')[:batch_size]
+        )
+        if not batch:
+            return
+        with transaction.atomic():
+            TimelineEntry.objects.bulk_create(
+                [
+                    TimelineEntry(
+                        user_id=user_id, post_id=post_id, pub_date=pub_date
+                    )
+                    for pk, user_id in batch
+                ],
+                ignore_conflicts=True
+            )
+        last_pk = batch[-1][0]
+
+
+def prepare(post):
+    """Перед вставкой поста решает, рассылать ли его по лентам.
+
+    Решение записывается в сам пост: пост, опубликованный знаменитостью,
+    подмешивается в ленты при чтении, даже когда автор перестанет ею
+    быть, пока unpull его не разошлёт.
+    """
+    post._followers_count = author_followers_count(post.author_id)
+    post.pulled = is_celebrity(post._followers_count)
+
+
+def mark_pulled(author_id, post_ids):
+    """Отмечает посты, созданные без сигналов, как подмешиваемые."""
+    Post.objects.filter(pk__in=post_ids).update(pulled=True)
+    AuthorStats.objects.filter(
+        author_id=author_id, has_pulled_posts=False
+    ).update(has_pulled_posts=True)
+
+
+def schedule_fan_out(post):
+    """Рассылка нового поста: в запросе, в фоне или никак (pull-режим)."""
+    if post.pulled:
+        mark_pulled(post.author_id, [post.pk])
+        return
+    followers = getattr(post, '_followers_count', None)
+    if followers is None:
+        followers = author_followers_count(post.author_id)
+    if not followers:
+        return
+    args = (post.pk, post.author_id, post.pub_date)
+    if followers <= settings.FOLLOW_FANOUT_SYNC_LIMIT:
+        fan_out(*args)
+    else:
+        submit_on_commit(fan_out, *args)
+
+
+def unpull(author_id):
+    """Рассылает подмешиваемые посты автора, который перестал быть
+    знаменитостью, и снимает с них отметку.
+
+    Пока пост не разослан, он подмешивается при чтении; разосланный и
+    ещё отмеченный пост слияние источников показывает один раз.
+    """
+    posts = Post.objects.filter(author_id=author_id, pulled=True)
+    while True:
+        if is_celebrity(author_followers_count(author_id)):
+            return
+        batch = list(
+            posts.order_by('pk')
+            .values_list('pk', 'pub_date')[:settings.FOLLOW_FANOUT_BATCH]
+        )
+        if not batch:
+            break
+        for post_id, pub_date in batch:
+            fan_out(post_id, author_id, pub_date)
+        Post.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+            pulled=False
+        )
+    # Одним UPDATE: если за это время появился новый отмеченный пост,
+    # признак останется.
+    AuthorStats.objects.filter(author_id=author_id).exclude(
+        author_id__in=posts.values('author_id')
+    ).update(has_pulled_posts=False)
+
+
+def followers_decreased(author_id):
+    """После отписки: автор, ставший обычным, рассылает свои
+    подмешиваемые посты в фоне."""
+    stats = (
+        AuthorStats.objects.filter(author_id=author_id)
+        .values_list('followers_count', 'has_pulled_posts').first()
+    )
+    if stats is None:
+        return
+    followers, has_pulled_posts = stats
+    if not has_pulled_posts or is_celebrity(followers):
+        return
+    if followers:
+        submit_on_commit(unpull, author_id)
+    else:
+        # Рассылать некому — достаточно снять отметки.
+        unpull(author_id)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние посты автора.
+
+    Подмешиваемые посты в ленту не пишутся, они приходят при чтении.
+    """
+    recent = (
+        Post.objects.filter(author_id=author_id, pulled=False)
+        .order_by('-pub_date', '-id')
+        .values_list('pk', 'pub_date')[:settings.FOLLOW_BACKFILL]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in recent
+        ],
+        ignore_conflicts=True
+    )
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+class TimelinePaginator(CursorPaginator):
+    """Keyset-пагинация ленты подписок по (pub_date, id поста).
+
+    Основной источник — материализованная лента пользователя, одно
+    индексированное чтение на страницу. Посты, опубликованные
+    знаменитостями (Post.pulled), в ленты не рассылаются и подмешиваются
+    отдельным запросом на каждого такого автора: у каждого это одно
+    чтение диапазона индекса, а запрос с author_id IN (...) SQLite
+    досортировывал бы во временном B-дереве.
+    """
+
+    def __init__(self, user, per_page):
+        super().__init__(Post.objects.for_feed(), per_page)
+        self.user = user
+
+    def _sources(self):
+        yield TimelineEntry.objects.filter(
+            user=self.user
+        ).values_list('pub_date', 'post_id'), ('-pub_date', '-post_id')
+        authors = Follow.objects.filter(
+            user=self.user, author__post_stats__has_pulled_posts=True
+        ).values_list('author_id', flat=True)
+        for author_id in authors:
+            yield Post.objects.filter(
+                pulled=True, author_id=author_id
+            ).values_list('pub_date', 'id'), ('-pub_date', '-id')
+
+    def fetch(self, direction, values, limit):
+        streams = [
+            list(CursorPaginator(source, limit, ordering).fetch(
+                direction, values, limit
+            ))
+            for source, ordering in self._sources()
+        ]
+        ids, seen = [], set()
+        merged = heapq.merge(*streams, reverse=direction == 'next')
+        for pub_date, post_id in merged:
+            if post_id not in seen:
+                seen.add(post_id)
+                ids.append(post_id)
+            if len(ids) == limit:
+                break
+        posts = self.queryset.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,119 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import TRENDING_FEED, bump_feed_version
+from .models import CommentModel, TrendingScore, TrendingState
+
+
+logger = logging.getLogger(__name__)
+
+
+def weight(moment, epoch):
+    """Вклад события в момент moment: удваивается каждые
+    TRENDING_HALF_LIFE секунд от epoch."""
+    age = (moment - epoch).total_seconds()
+    return 2 ** (age / settings.TRENDING_HALF_LIFE)
+
+
+def get_state():
+    state = TrendingState.objects.first()
+    if state is None:
+        state = TrendingState.objects.create(epoch=timezone.now())
+    return state
+
+
+def aggregate(state, batch_size):
+    """Добавляет к рейтингам следующую пачку новых комментариев.
+
+    Новые комментарии — с id больше last_comment_id. SQLite выдаёт id
+    под блокировкой записи, поэтому комментарии коммитятся в порядке
+    id и отметка ничего не пропускает. Удалённые позже комментарии из
+    рейтинга не вычитаются. Рейтинги и отметка меняются в одной
+    транзакции: прерванный расчёт ничего не учтёт дважды. Возвращает
+    число учтённых комментариев.
+    """
+    comments = list(
+        CommentModel.objects.filter(id__gt=state.last_comment_id)
+        .order_by('id').values_list('id', 'post_id', 'created')[:batch_size]
+    )
+    if not comments:
+        return 0
+    deltas = defaultdict(float)
+    for comment_id, post_id, created in comments:
+        deltas[post_id] += weight(created, state.epoch)
+    with transaction.atomic():
+        scores = TrendingScore.objects.in_bulk(list(deltas))
+        for post_id, score in scores.items():
+            score.score += deltas[post_id]
+        TrendingScore.objects.bulk_update(scores.values(), ['score'])
+        TrendingScore.objects.bulk_create(
+            TrendingScore(post_id=post_id, score=delta)
+            for post_id, delta in deltas.items() if post_id not in scores
+        )
+        state.last_comment_id = comments[-1][0]
+        state.save(update_fields=['last_comment_id', 'updated'])
+    return len(comments)
+
+
+def rebase(state, now):
+    """Переносит эпоху на now, пока веса не переполнили float.
+
+    Все рейтинги умножаются на один множитель, порядок не меняется.
+    """
+    if (now - state.epoch).total_seconds() < (
+            settings.TRENDING_HALF_LIFE * settings.TRENDING_REBASE_HALF_LIVES):
+        return False
+    factor = 1 / weight(now, state.epoch)
+    with transaction.atomic():
+        TrendingScore.objects.update(score=F('score') * factor)
+        state.epoch = now
+        state.save(update_fields=['epoch', 'updated'])
+    return True
+
+
+def prune(state, now):
+    """Удаляет рейтинги меньше одного комментария TRENDING_WINDOW назад:
+    в ленту они уже не попадают, а таблица не растёт без предела."""
+    floor = weight(
+        now - timedelta(seconds=settings.TRENDING_WINDOW),
+        state.epoch
+    )
+    return TrendingScore.objects.filter(score__lt=floor).delete()[0]
+
+
+def update(batch_size=None):
+    """Учитывает все новые комментарии и обновляет ленту популярного.
+
+    Возвращает словарь с числом учтённых комментариев и удалённых
+    рейтингов.
+    """
+    batch_size = batch_size or settings.TRENDING_BATCH_SIZE
+    state = get_state()
+    processed = 0
+    while True:
+        count = aggregate(state, batch_size)
+        processed += count
+        if count < batch_size:
+            break
+    now = timezone.now()
+    rebased = rebase(state, now)
+    pruned = prune(state, now)
+    if processed or rebased or pruned:
+        bump_feed_version(TRENDING_FEED)
+    report = {
+        'comments': processed,
+        'pruned': pruned,
+        'rebased': rebased,
+        'last_comment_id': state.last_comment_id,
+    }
+    logger.info(
+        'Рейтинги: учтено комментариев %s, удалено %s',
+        processed, pruned
+    )
+    return report
@@ -1,59 +1,177 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.core.paginator import Paginator
+from django.http import (
+    Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 
+from . import export, search as post_search
+from .cache import (
+    INDEX_FEED, TRENDING_FEED, author_feed, get_feed_version, group_feed
+)
+from .counters import author_posts_count
 from .forms import CommentForm, PostForm
-from .models import CommentModel, Group, Post
-from yatube.settings import POST_PAGINATOR
+from .models import CommentModel, Follow, Group, Post, TrendingScore
+from .paginators import CURSOR_PARAM, CursorPaginator, paginate
+from .timelines import TimelinePaginator
+from core.db import retry_on_lock
+from core.throttle import throttle
+from yatube.settings import (
+    COMMENTS_PAGINATOR, FEED_CACHE_TIMEOUT, POST_PAGINATOR
+)
 
 
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, POST_PAGINATOR)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.for_feed()
+    page_obj = paginate(request, posts, POST_PAGINATOR)
     context = {
         'page_obj': page_obj,
+        'feed_version': get_feed_version(INDEX_FEED),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/index.html', context)
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.group_posts.all()
-    paginator = Paginator(posts, POST_PAGINATOR)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.for_feed().filter(group=group)
+    page_obj = paginate(request, posts, POST_PAGINATOR)
     context = {
         'group': group,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'feed_version': get_feed_version(group_feed(group.pk)),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    posts = user.author_posts.all()
-    paginator = Paginator(posts, POST_PAGINATOR)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    user = get_object_or_404(
+        User.objects.select_related('post_stats'), username=username
+    )
+    posts = Post.objects.for_feed().filter(author=user)
+    page_obj = paginate(request, posts, POST_PAGINATOR)
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author=user
+    ).exists()
     context = {
         'page_obj': page_obj,
         'author': user,
-        'amount': posts.count(),
+        'following': following,
+        'amount': author_posts_count(user),
+        'feed_version': get_feed_version(author_feed(user.pk)),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def export_posts(posts, fmt, filename):
+    if fmt not in export.FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки')
+    response = StreamingHttpResponse(
+        export.stream(posts, fmt), content_type=export.FORMATS[fmt]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{fmt}"'
+    )
+    return response
+
+
+def profile_export(request, username):
+    user = get_object_or_404(User, username=username)
+    return export_posts(
+        Post.objects.filter(author=user),
+        request.GET.get('format', 'csv'),
+        f'posts-{user.pk}'
+    )
+
+
+def group_export(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return export_posts(
+        Post.objects.filter(group=group),
+        request.GET.get('format', 'csv'),
+        f'group-{group.slug}'
+    )
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    if post_search.is_available():
+        paginator = post_search.SearchPaginator(query, POST_PAGINATOR)
+    else:
+        posts = Post.objects.for_feed()
+        if query:
+            posts = posts.filter(text__icontains=query)
+        else:
+            posts = posts.none()
+        paginator = CursorPaginator(posts, POST_PAGINATOR)
+    context = {
+        'query': query,
+        'page_params': urlencode({'q': query}) + '&',
+        'page_obj': paginator.get_page(request.GET.get(CURSOR_PARAM)),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def trending(request):
+    """Посты по рейтингу posts.trending: страница — чтение диапазона
+    индекса trending_score_idx, рейтинги считает update_trending."""
+    paginator = CursorPaginator(
+        TrendingScore.objects.for_feed(), POST_PAGINATOR,
+        ordering=('-score', '-post_id')
+    )
+    context = {
+        'page_obj': paginator.get_page(request.GET.get(CURSOR_PARAM)),
+        'feed_version': get_feed_version(TRENDING_FEED),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+def comment_page(post_id, cursor):
+    paginator = CursorPaginator(
+        CommentModel.objects.for_thread().filter(post_id=post_id),
+        COMMENTS_PAGINATOR,
+        ordering=('created', 'id')
+    )
+    return paginator.get_page(cursor)
+
+
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = comment_page(post_id, request.GET.get(CURSOR_PARAM))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
     comment_form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = comment_page(post.pk, None)
     correct_user = False
-    if request.user.pk == post.author.pk:
+    if request.user.pk == post.author_id:
         correct_user = True
-    posts_amount = Post.objects.filter(author=post.author.pk).count()
+    posts_amount = author_posts_count(post.author)
     context = {
         'post': post,
         'amount': posts_amount,
@@ -64,13 +182,40 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def save_post(post):
+    """Сохраняет пост, повторяя запись, если SQLite занят.
+
+    Повторяется только сохранение: изображение уже нормализовано
+    формой, а файл пишется в хранилище при первой попытке и при
+    повторах не перезаписывается. Если все попытки не удались,
+    записанный файл удаляется, чтобы не оставлять его без поста.
+    """
+    image = post.image
+    uploaded = bool(image) and not image._committed
+    pk, adding = post.pk, post._state.adding
+
+    @retry_on_lock
+    def save():
+        # Откаченная попытка могла успеть выдать посту id.
+        post.pk, post._state.adding = pk, adding
+        post.save()
+
+    try:
+        save()
+    except Exception:
+        if uploaded and image._committed:
+            image.delete(save=False)
+        raise
+
+
 @login_required
+@throttle('post')
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None,)
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
-        new_post.save()
+        save_post(new_post)
         return redirect('posts:profile', username=request.user.username)
     context = {
         'form': form
@@ -79,16 +224,17 @@ def post_create(request):
 
 
 @login_required
+@throttle('post')
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if request.user.pk != post.author.pk:
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
         instance=post)
     if form.is_valid():
-        form.save()
+        save_post(form.save(commit=False))
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -99,6 +245,8 @@ def post_edit(request, post_id):
 
 
 @login_required
+@throttle('comment')
+@retry_on_lock
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -108,3 +256,32 @@ def add_comment(request, post_id):
         comment.post = post
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+def follow_index(request):
+    paginator = TimelinePaginator(request.user, POST_PAGINATOR)
+    context = {
+        'page_obj': paginator.get_page(request.GET.get(CURSOR_PARAM)),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@login_required
+@retry_on_lock
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+@retry_on_lock
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    follow = Follow.objects.filter(user=request.user, author=author).first()
+    if follow is not None:
+        follow.delete()
+    return redirect('posts:profile', username=username)
@@ -0,0 +1,221 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import close_old_connections
+from django.template.loader import get_template
+from django.test import Client
+from django.urls import reverse
+from django.utils.http import urlencode
+from sorl.thumbnail import get_thumbnail
+
+from .models import Group, Post
+from .paginators import CURSOR_PARAM, CursorPaginator
+from .thumbnails import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS
+from yatube.settings import POST_PAGINATOR
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+# Шаблоны страниц, которые не прогреваются запросами: их достаточно
+# загрузить, чтобы кеширующий загрузчик скомпилировал их заранее.
+TEMPLATES = (
+    'posts/post_detail.html',
+    'posts/create_post.html',
+    'posts/follow.html',
+    'posts/search.html',
+    'core/404.html',
+)
+
+
+def shared_cache():
+    """Виден ли кеш по умолчанию другим процессам.
+
+    LocMemCache у каждого процесса свой: прогрев отдельной командой
+    заполнил бы только её собственную память.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def request_host():
+    """Хост из ALLOWED_HOSTS для запросов прогрева.
+
+    Шаблоны вида '.example.com' принимают и сам домен, '*' — любой хост.
+    """
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip('.')
+        if host and host != '*':
+            return host
+    # Пустой ALLOWED_HOSTS при DEBUG пропускает localhost.
+    return 'localhost'
+
+
+def feed_pages(queryset, pages):
+    """URL-параметры первых pages страниц ленты: курсор каждой страницы.
+
+    Курсоры считаются keyset-запросами только по ключу ленты, без
+    загрузки самих постов.
+    """
+    paginator = CursorPaginator(
+        queryset.order_by().values('pub_date', 'id'), POST_PAGINATOR
+    )
+    params, page = [''], paginator.get_page()
+    while len(params) < pages and page.next_cursor:
+        params.append('?' + urlencode({CURSOR_PARAM: page.next_cursor}))
+        page = paginator.get_page(page.next_cursor)
+    return params
+
+
+def targets(groups, profiles):
+    """Крупнейшие группы (pk, slug) и самые активные авторы
+    (pk, username)."""
+    top_groups = list(
+        Group.objects.order_by('-posts_count', 'pk')
+        .values_list('pk', 'slug')[:groups]
+    )
+    top_authors = list(
+        User.objects.filter(post_stats__posts_count__gt=0)
+        .order_by('-post_stats__posts_count', 'pk')
+        .values_list('pk', 'username')[:profiles]
+    )
+    return top_groups, top_authors
+
+
+def plan(pages, top_groups, top_authors):
+    """URL для прогрева: первые страницы главной и первые страницы
+    групп и авторов."""
+    urls = [
+        reverse('posts:index') + params
+        for params in feed_pages(Post.objects.all(), pages)
+    ]
+    urls += [
+        reverse('posts:group_list', args=[slug]) for pk, slug in top_groups
+    ]
+    urls += [
+        reverse('posts:profile', args=[username])
+        for pk, username in top_authors
+    ]
+    return urls
+
+
+def images(pages, top_groups, top_authors):
+    """Изображения с готовыми миниатюрами на прогреваемых страницах."""
+    feeds = [(Post.objects.all(), pages)]
+    feeds += [
+        (Post.objects.filter(group_id=pk), 1) for pk, slug in top_groups
+    ]
+    feeds += [
+        (Post.objects.filter(author_id=pk), 1) for pk, name in top_authors
+    ]
+    names = set()
+    for feed, count in feeds:
+        names.update(
+            feed.filter(thumbnail_state=Post.THUMBNAIL_READY)
+            .exclude(image='').order_by('-pub_date', '-id')
+            .values_list('image', flat=True)[:POST_PAGINATOR * count]
+        )
+    return sorted(names)
+
+
+class Warmup:
+    """Прогрев кешей процесса перед приёмом трафика.
+
+    Страницы запрашиваются тестовым клиентом через весь стек
+    middleware, поэтому заполняются те же фрагменты кеша, метаданные
+    миниатюр sorl и скомпилированные шаблоны, что и при настоящем
+    запросе. Сначала в пуле потоков разрешаются миниатюры, затем
+    рендерятся страницы: при рендере они уже берутся из хранилища
+    ключей sorl.
+    """
+
+    def __init__(self, pages, groups, profiles, workers):
+        self.pages = pages
+        self.groups = groups
+        self.profiles = profiles
+        self.workers = max(1, workers)
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client(
+                HTTP_HOST=request_host()
+            )
+        return client
+
+    def _task(self, func, argument):
+        started = time.perf_counter()
+        try:
+            result = func(argument)
+        except Exception:
+            logger.exception('Прогрев %s не удался', argument)
+            result = None
+        finally:
+            close_old_connections()
+        return argument, result, (time.perf_counter() - started) * 1000
+
+    def _thumbnail(self, name):
+        get_thumbnail(name, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+        return True
+
+    def _page(self, url):
+        return self._client().get(url).status_code
+
+    def run(self):
+        """Прогревает кеши; возвращает отчёт со временем каждого шага."""
+        started = time.perf_counter()
+        for name in TEMPLATES:
+            get_template(name)
+        top_groups, top_authors = targets(self.groups, self.profiles)
+        urls = plan(self.pages, top_groups, top_authors)
+        names = images(self.pages, top_groups, top_authors)
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix='posts-warmup'
+        ) as pool:
+            thumbnails = list(pool.map(
+                lambda name: self._task(self._thumbnail, name), names
+            ))
+            pages = list(pool.map(
+                lambda url: self._task(self._page, url), urls
+            ))
+        return {
+            'seconds': round(time.perf_counter() - started, 3),
+            'thumbnails': {
+                name: {'ok': ok is True, 'ms': round(ms, 2)}
+                for name, ok, ms in thumbnails
+            },
+            'pages': {
+                url: {'status': status, 'ms': round(ms, 2)}
+                for url, status, ms in pages
+            },
+        }
+
+
+def failures(report):
+    """URL страниц и имена изображений, которые прогреть не удалось."""
+    failed = [
+        url for url, result in report['pages'].items()
+        if result['status'] != 200
+    ]
+    failed += [
+        name for name, result in report['thumbnails'].items()
+        if not result['ok']
+    ]
+    return failed
+
+
+def run(pages, groups, profiles, workers):
+    report = Warmup(pages, groups, profiles, workers).run()
+    logger.info(
+        'Прогрев: %s страниц, %s миниатюр за %.3f с, ошибок: %s',
+        len(report['pages']), len(report['thumbnails']), report['seconds'],
+        len(failures(report))
+    )
+    return report
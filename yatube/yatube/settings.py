@@ -24,6 +24,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -36,13 +38,31 @@ MIDDLEWARE = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Раздавать MEDIA_ROOT самим Django (core.media.serve) и при DEBUG = False
+# — для развёртываний без отдельного веб-сервера.
+SERVE_MEDIA = False
+
+# Сколько секунд браузер может не перепроверять загруженные файлы.
+# Файлы под префиксами MEDIA_IMMUTABLE_PREFIXES (миниатюры sorl) не
+# меняются и кешируются на год.
+MEDIA_CACHE_MAX_AGE = 60 * 60
+
+MEDIA_IMMUTABLE_PREFIXES = ('cache/',)
+
+# None — файл отдаёт Django; 'x-accel-redirect' (nginx) или 'x-sendfile'
+# (Apache, lighttpd) — передачу выполняет фронтовой прокси. Для nginx
+# MEDIA_ACCEL_PREFIX — internal-location, указывающий на MEDIA_ROOT.
+MEDIA_SENDFILE = None
+
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.timing.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -50,7 +70,8 @@ TEMPLATES = [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages'
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.replica',
             ],
         },
     },
@@ -62,6 +83,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами: открывать его и заново
+        # выполнять SQLITE_PRAGMAS на каждый запрос дорого.
+        'CONN_MAX_AGE': 600,
         'TEST': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
@@ -71,6 +95,51 @@ DATABASES = {
 
 if 'test' in sys.argv:
     DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3'}
+    # Реплика для тестов маршрутизации (DATABASE_REPLICAS пуст).
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Настройки каждого соединения с SQLite (core.db.configure_sqlite);
+# пустой словарь — оставить настройки SQLite по умолчанию. WAL позволяет
+# читать во время записи; synchronous=NORMAL в режиме WAL не теряет
+# целостности, только последние транзакции при отключении питания.
+# cache_size отрицательный — в КиБ.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
+# Сколько раз повторять запись, получившую «database is locked», и
+# начальная пауза между попытками в секундах (core.db.retry_on_lock).
+SQLITE_WRITE_RETRIES = 5
+
+SQLITE_RETRY_DELAY = 0.05
+
+# Реплики для чтения: алиасы из DATABASES. Запись и чтение после записи
+# идут в default, остальные чтения из запросов — на случайную реплику.
+# SQLite-реплики обновляет команда sync_replicas, например:
+#
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': os.path.join(BASE_DIR, 'db-replica.sqlite3'),
+#     'CONN_MAX_AGE': 600,
+# }
+# DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# После записи клиент столько секунд читает с основной базы; должно
+# быть больше интервала синхронизации реплик.
+REPLICA_STICKY_COOKIE = 'primary_db'
+
+REPLICA_STICKY_SECONDS = 30
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,16 +174,157 @@ LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма не отправляются в запросе, а ставятся в очередь core.mail.
+# Команда send_queued_mail отправляет их пачками через
+# OUTBOX_EMAIL_BACKEND.
+EMAIL_BACKEND = 'core.mail.OutboxBackend'
+
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+OUTBOX_BATCH_SIZE = 50
+
+# После OUTBOX_MAX_ATTEMPTS неудачных попыток письмо помечается
+# неотправленным; пауза между попытками удваивается, начиная с
+# OUTBOX_RETRY_DELAY секунд.
+OUTBOX_MAX_ATTEMPTS = 5
+
+OUTBOX_RETRY_DELAY = 60
+
+# Сколько секунд письмо, взятое воркером, недоступно другим воркерам.
+OUTBOX_LEASE = 300
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POST_PAGINATOR = 10
 
+COMMENTS_PAGINATOR = 20
+
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Сколько постов выгрузка читает одним запросом и отдаёт одним куском.
+EXPORT_CHUNK_SIZE = 2000
+
+BACKGROUND_WORKERS = 4
+
+# 'worker' — миниатюры строит команда generate_thumbnails,
+# 'thread' — пул потоков внутри процесса веб-сервера.
+THUMBNAIL_QUEUE = 'worker'
+
+THUMBNAIL_WORKERS = 2
+
+# Загружаемые изображения уменьшаются до IMAGE_MAX_SIZE пикселей по
+# большей стороне, JPEG пересохраняется с качеством IMAGE_QUALITY.
+IMAGE_MAX_SIZE = 2048
+
+IMAGE_QUALITY = 85
+
+# Число процессов команды normalize_images.
+IMAGE_WORKERS = 2
+
+# Авторы, у которых подписчиков не меньше порога, не рассылают посты по
+# лентам подписчиков: их посты подмешиваются в ленту при чтении.
+FOLLOW_CELEBRITY_THRESHOLD = 10000
+
+# До этого числа подписчиков рассылка идёт прямо в запросе, больше —
+# в фоне после коммита.
+FOLLOW_FANOUT_SYNC_LIMIT = 200
+
+FOLLOW_FANOUT_BATCH = 1000
+
+FOLLOW_BACKFILL = 50
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Сколько секунд списки изменений в админке используют закешированное
+# число строк вместо COUNT(*) (core.admin.CachedCountPaginator).
+ADMIN_COUNT_CACHE_TIMEOUT = 60
+
+# Ограничение записи (core.throttle): для каждого scope — лимиты на
+# пользователя и на IP. '10/m' — не больше 10 запросов за скользящую
+# минуту. Счётчики лежат в кеше default: с несколькими процессами
+# LocMemCache нужно заменить общим бэкендом, иначе лимит умножается на
+# число процессов.
+THROTTLE_RATES = {
+    'post': {'user': '10/m', 'ip': '30/m'},
+    'comment': {'user': '20/m', 'ip': '60/m'},
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.timing.LocMemCache',
     }
 }
+
+# Лента популярного (posts.trending): вес комментария вдвое меньше
+# каждые TRENDING_HALF_LIFE секунд; рейтинги, которые меньше одного
+# комментария TRENDING_WINDOW секунд назад, удаляются.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+
+TRENDING_WINDOW = 7 * 24 * 60 * 60
+
+TRENDING_BATCH_SIZE = 5000
+
+# Интервал update_trending --loop в секундах.
+TRENDING_INTERVAL = 60
+
+# Через сколько периодов полураспада эпоха переносится, чтобы веса
+# не переполнили float (предел — около 1000).
+TRENDING_REBASE_HALF_LIVES = 100
+
+# Двухуровневый кеш core.cache: сколько записей и сколько секунд
+# держать в памяти процесса, сколько ждать чужого пересчёта и насколько
+# рано (beta) начинать пересчёт до истечения срока.
+CACHE_LOCAL_ENTRIES = 500
+
+CACHE_LOCAL_TIMEOUT = 5
+
+CACHE_LOCK_TIMEOUT = 10
+
+CACHE_EARLY_BETA = 1.0
+
+# Бэкенды из core.timing считают время шаблонов, кеша и миниатюр для
+# заголовка Server-Timing.
+THUMBNAIL_BACKEND = 'core.timing.ThumbnailBackend'
+
+SERVER_TIMING = True
+
+# Запросы медленнее порога (в секундах) пишутся в лог как WARNING.
+SERVER_TIMING_SLOW = 1.0
+
+# Прогрев кешей после деплоя: сколько страниц главной, сколько
+# крупнейших групп и самых активных авторов и в сколько потоков.
+# Команда warmup работает только с общим для процессов кешем.
+WARMUP_PAGES = 3
+
+WARMUP_GROUPS = 10
+
+WARMUP_PROFILES = 10
+
+WARMUP_WORKERS = 4
+
+# Прогревать каждый процесс в yatube/wsgi.py до того, как он начнёт
+# принимать запросы: LocMemCache у каждого процесса свой, и прогреть
+# его можно только изнутри процесса.
+WARMUP_ON_START = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': 'WARNING' if 'test' in sys.argv else 'INFO',
+        },
+        'posts.trending': {
+            'handlers': ['console'],
+            'level': 'WARNING' if 'test' in sys.argv else 'INFO',
+        },
+        'posts.warmup': {
+            'handlers': ['console'],
+            'level': 'WARNING' if 'test' in sys.argv else 'INFO',
+        },
+    },
+}
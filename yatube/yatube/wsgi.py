@@ -14,3 +14,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Процесс прогревает свои кеши до того, как сервер отдаст ему первый
+# запрос: без --preload модуль импортируется в каждом воркере.
+from django.conf import settings  # noqa: E402
+
+if settings.WARMUP_ON_START:
+    from posts import warmup
+
+    warmup.run(
+        settings.WARMUP_PAGES, settings.WARMUP_GROUPS,
+        settings.WARMUP_PROFILES, settings.WARMUP_WORKERS
+    )